@@ -1,8 +1,51 @@
-from flask import Flask, render_template, request
-from voter_election_report import voter_election_report
+import os
+from flask import Flask, jsonify, render_template, request
+from connection_pool import ReadOnlyConnectionPool
+from lookup_api import batch_lookups, cached_batch, fuzzy_status, is_fuzzy, lookup_params, store_batch
+from lookup_cache import LookupCache, lookup_key
+from voter_election_report import (LOOKUP_TRACE, MISSING_PARAMS_ERROR, TRACE_OFF_ERROR, voter_election_report,
+                                   voter_election_reports)
 
 app = Flask(__name__)
 
+# Read-only connections shared by all requests, so each lookup reuses a warm
+# connection instead of opening the database. Connections are opened on first
+# use, so gunicorn workers forked after import each get their own.
+# Set VOTERS_DB_IMMUTABLE=1 to skip SQLite's file locking when voters.db is never
+# written while the app runs (restart the app after re-importing).
+db_pool = ReadOnlyConnectionPool(
+    os.environ.get("VOTERS_DB", "voters.db"),
+    size=int(os.environ.get("VOTERS_DB_POOL_SIZE", "8")),
+    immutable=os.environ.get("VOTERS_DB_IMMUTABLE") == "1",
+)
+
+# Recent reports, keyed on the normalized name/zip and the database file's
+# mtime/size so a re-import invalidates them. VOTERS_CACHE_SIZE=0 disables it.
+lookup_cache = LookupCache(
+    maxsize=int(os.environ.get("VOTERS_CACHE_SIZE", "4096")),
+    ttl=int(os.environ.get("VOTERS_CACHE_TTL", "3600")),
+)
+
+def cached_report(first_name, last_name, zip_code):
+    if not all([first_name, last_name, zip_code]):
+        return voter_election_report(db_pool, first_name=first_name, last_name=last_name, zip_code=zip_code)
+    key = lookup_key(db_pool.db_name, first_name, last_name, zip_code)
+    report = lookup_cache.get(key)
+    if report is None:
+        report = voter_election_report(db_pool, first_name=first_name, last_name=last_name, zip_code=zip_code)
+        # "No voters found" errors echo the input as typed, and are cheap anyway
+        if "results" in report:
+            lookup_cache.put(key, report)
+    return report
+
+def cached_reports(lookups):
+    """cached_report() for many triples; the cache misses are resolved as one batch."""
+    reports, missed = cached_batch(lookup_cache, db_pool.db_name, lookups)
+    if not missed:
+        return reports
+    fresh = voter_election_reports(db_pool, [lookups[i] for i in missed])
+    return store_batch(lookup_cache, db_pool.db_name, lookups, reports, missed, fresh)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     results = None
@@ -13,7 +56,7 @@ def index():
         zip_code = request.form.get('zip_code')
         
         # Call the modified function
-        report = voter_election_report(first_name=first_name, last_name=last_name, zip_code=zip_code)
+        report = cached_report(first_name, last_name, zip_code)
         
         if "error" in report:
             error = report["error"]
@@ -22,5 +65,51 @@ def index():
     
     return render_template('index.html', results=results, error=error)
 
+# ==================== JSON API ====================
+# Parameters and batches are handled as in async_server.py; see lookup_api.py.
+
+@app.route('/api/lookup', methods=['GET', 'POST'])
+def api_lookup():
+    """
+    Same structure as voter_election_report(); 400 for missing parameters, 404
+    when nobody matches, 501 for fuzzy=1 on a database without name search.
+    """
+    data = request.get_json(silent=True) if request.is_json else request.values
+    if not hasattr(data, "get"):
+        return jsonify({"error": MISSING_PARAMS_ERROR}), 400
+    first_name, last_name, zip_code = lookup_params(data)
+    if is_fuzzy(data):
+        # Not cached: a handful of index searches, and rarely repeated as typed
+        report = voter_election_report(db_pool, first_name, last_name, zip_code, fuzzy=True)
+        return jsonify(report), fuzzy_status(report)
+    if not all([first_name, last_name, zip_code]):
+        return jsonify({"error": MISSING_PARAMS_ERROR}), 400
+    report = cached_report(first_name, last_name, zip_code)
+    return jsonify(report), (404 if "error" in report else 200)
+
+@app.route('/api/lookup/batch', methods=['POST'])
+def api_lookup_batch():
+    """
+    POST {"lookups": [{"first_name": ..., "last_name": ..., "zip_code": ...}, ...]}
+    and get {"reports": [...]} back, one voter_election_report() result per
+    lookup in the same order.
+    """
+    lookups, error = batch_lookups(request.get_json(silent=True))
+    if error:
+        status, payload = error
+        return jsonify(payload), status
+    return jsonify({"reports": cached_reports(lookups)})
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(lookup_cache.stats())
+
+@app.route('/trace/stats')
+def trace_stats():
+    """Lookup SQL timings by statement when started with VOTERS_TRACE=1 (see instrumentation.py)."""
+    if LOOKUP_TRACE is None:
+        return jsonify({"error": TRACE_OFF_ERROR}), 404
+    return jsonify(LOOKUP_TRACE.to_dict())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
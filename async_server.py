@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Asyncio serving mode for the voter lookup JSON API (no Flask needed).
+
+Serves the same endpoints as app.py's API:
+
+    GET|POST /api/lookup          first_name, last_name, zip_code[, fuzzy=1]
+    POST     /api/lookup/batch    {"lookups": [{...}, ...]}
+    GET      /cache/stats
+    GET      /server/stats
+    GET      /trace/stats         lookup SQL timings, with VOTERS_TRACE=1
+
+The event loop only parses HTTP and answers cache hits. SQLite queries run in
+a thread pool with one read-only connection per thread.
+
+- Backpressure: at most --max-pending requests may be queued or running.
+  Beyond that the server answers 503 with Retry-After instead of queueing
+  without bound.
+- Timeouts: a request that takes longer than --timeout seconds gets a 504.
+  Its query is interrupted, so the worker thread is freed. If it was still
+  queued, it never starts.
+
+Usage:
+    python3 async_server.py [--db-name voters.db] [--port 8080] [--workers 8] [--max-pending 64] [--timeout 5]
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from connection_pool import ReadOnlyConnectionPool
+from lookup_api import batch_lookups, cached_batch, fuzzy_status, is_fuzzy, lookup_params, store_batch
+from lookup_cache import CACHE_SIZE, CACHE_TTL, LookupCache, lookup_key
+from voter_election_report import (LOOKUP_TRACE, MISSING_PARAMS_ERROR, TRACE_OFF_ERROR, voter_election_report,
+                                   voter_election_reports)
+
+WORKERS = 8
+MAX_PENDING = 64
+REQUEST_TIMEOUT = 5.0
+KEEPALIVE_TIMEOUT = 15.0
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+
+class Job:
+    """
+    One unit of database work; lets a timed-out request stop its query. `conn`
+    is only set while the job holds the pooled connection, under `lock`, so a
+    late cancel() can't interrupt the connection's next user.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.conn is not None:
+                self.conn.interrupt()
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = list(headers)
+
+class LookupServer:
+    def __init__(self, db_name="voters.db", workers=WORKERS, max_pending=MAX_PENDING, timeout=REQUEST_TIMEOUT,
+                 immutable=False, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL):
+        self.pool = ReadOnlyConnectionPool(db_name, size=workers, immutable=immutable)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup")
+        self.cache = LookupCache(maxsize=cache_size, ttl=cache_ttl)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        self.counters = {"requests": 0, "rejected": 0, "timed_out": 0, "errors": 0}
+
+    # ==================== DATABASE WORK ====================
+
+    def run_job(self, job, fn, *args):
+        """Runs in a worker thread."""
+        if job.cancelled:
+            return None
+        with self.pool.connection() as conn:
+            with job.lock:
+                if job.cancelled:
+                    return None
+                job.conn = conn
+            try:
+                return fn(conn, *args)
+            finally:
+                with job.lock:
+                    job.conn = None
+
+    def job_done(self, work):
+        """Runs when a job's worker is done with it (or it was cancelled while queued)."""
+        with self.pending_lock:
+            self.pending -= 1
+
+    async def query(self, fn, *args):
+        """
+        Run fn(conn, *args) in the thread pool under the pending limit and
+        timeout. A job counts as pending until its worker thread is done with
+        it, not until the request gives up on it.
+        """
+        with self.pending_lock:
+            if self.pending >= self.max_pending:
+                self.counters["rejected"] += 1
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server is busy, retry shortly.",
+                                [("Retry-After", "1")])
+            self.pending += 1
+        job = Job()
+        work = self.executor.submit(self.run_job, job, fn, *args)
+        work.add_done_callback(self.job_done)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(work), self.timeout)
+        except asyncio.TimeoutError:
+            job.cancel()
+            self.counters["timed_out"] += 1
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, f"Lookup did not finish within {self.timeout:g}s.") from None
+
+    # ==================== ENDPOINTS ====================
+
+    async def lookup(self, params):
+        first_name, last_name, zip_code = lookup_params(params)
+        if is_fuzzy(params):
+            # Not cached: a handful of index searches, and rarely repeated as typed
+            report = await self.query(voter_election_report, first_name, last_name, zip_code, True)
+            return fuzzy_status(report), report
+        if not all([first_name, last_name, zip_code]):
+            return HTTPStatus.BAD_REQUEST, {"error": MISSING_PARAMS_ERROR}
+        key = lookup_key(self.pool.db_name, first_name, last_name, zip_code)
+        report = self.cache.get(key)
+        if report is None:
+            report = await self.query(voter_election_report, first_name, last_name, zip_code)
+            # "No voters found" errors echo the input as typed, and are cheap anyway
+            if "results" in report:
+                self.cache.put(key, report)
+        return (HTTPStatus.NOT_FOUND if "error" in report else HTTPStatus.OK), report
+
+    async def lookup_batch(self, body):
+        lookups, error = batch_lookups(body)
+        if error:
+            return error
+        reports, missed = cached_batch(self.cache, self.pool.db_name, lookups)
+        if missed:
+            fresh = await self.query(voter_election_reports, [lookups[i] for i in missed])
+            store_batch(self.cache, self.pool.db_name, lookups, reports, missed, fresh)
+        return HTTPStatus.OK, {"reports": reports}
+
+    def server_stats(self):
+        return {"workers": self.pool.size, "max_pending": self.max_pending, "pending": self.pending,
+                "timeout": self.timeout, **self.counters}
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == "/api/lookup" and method in ("GET", "POST"):
+            params = dict(parse_qsl(url.query))
+            if method == "POST":
+                params.update(parse_body(headers, body))
+            return await self.lookup(params)
+        if url.path == "/api/lookup/batch" and method == "POST":
+            return await self.lookup_batch(parse_body(headers, body, form=False))
+        if url.path == "/cache/stats" and method == "GET":
+            return HTTPStatus.OK, self.cache.stats()
+        if url.path == "/server/stats" and method == "GET":
+            return HTTPStatus.OK, self.server_stats()
+        if url.path == "/trace/stats" and method == "GET":
+            if LOOKUP_TRACE is None:
+                return HTTPStatus.NOT_FOUND, {"error": TRACE_OFF_ERROR}
+            return HTTPStatus.OK, LOOKUP_TRACE.to_dict()
+        if url.path in ("/api/lookup", "/api/lookup/batch", "/cache/stats", "/server/stats", "/trace/stats"):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {url.path}.")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+
+    # ==================== HTTP ====================
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                keep_alive = False
+                extra_headers = []
+                try:
+                    method, target, version, headers, body = await read_request(reader, request_line)
+                    keep_alive = wants_keep_alive(version, headers)
+                    self.counters["requests"] += 1
+                    status, payload = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload, extra_headers = e.status, {"error": str(e)}, e.headers
+                except (sqlite3.Error, TimeoutError) as e:
+                    self.counters["errors"] += 1
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Database error: {e}"}
+                write_response(writer, status, payload, keep_alive, extra_headers)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Client went away, or sent a line longer than the stream limit
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving voter lookups on http://{host}:{port} "
+              f"({self.pool.size} workers, {self.max_pending} pending max, {self.timeout:g}s timeout)")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+def parse_body(headers, body, form=True):
+    """Decode a JSON body, or a urlencoded form unless `form` is False (JSON only)."""
+    if not body:
+        return {}
+    content_type = headers.get("content-type", "")
+    try:
+        if not form:
+            return json.loads(body)
+        if content_type.startswith("application/json"):
+            data = json.loads(body)
+            return data if isinstance(data, dict) else {}
+        return dict(parse_qsl(body.decode("utf-8")))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body could not be parsed.") from None
+
+async def read_request(reader, request_line):
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers.")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, "Chunked request bodies are not supported.")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.") from None
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request body over {MAX_BODY_BYTES:,} bytes.")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, version, headers, body
+
+def wants_keep_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        return connection != "close"
+    return connection == "keep-alive"
+
+def write_response(writer, status, payload, keep_alive, extra_headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    head = [f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{name}: {value}" for name, value in extra_headers]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the voter lookup JSON API with asyncio.")
+    parser.add_argument("--db-name", default="voters.db", help="Database name (default: voters.db)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"Query threads, each with its own read-only connection (default: {WORKERS})")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help=f"Requests queued or running before answering 503 (default: {MAX_PENDING})")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT,
+                        help=f"Seconds before a lookup is interrupted with a 504 (default: {REQUEST_TIMEOUT:g})")
+    parser.add_argument("--immutable", action="store_true",
+                        help="Open the database with immutable=1 (only if it is not re-imported while serving)")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                        help=f"Cached reports, 0 to disable (default: {CACHE_SIZE})")
+    parser.add_argument("--cache-ttl", type=int, default=CACHE_TTL,
+                        help=f"Seconds a cached report is kept (default: {CACHE_TTL})")
+    args = parser.parse_args()
+
+    lookup_server = LookupServer(args.db_name, workers=args.workers, max_pending=args.max_pending,
+                                 timeout=args.timeout, immutable=args.immutable,
+                                 cache_size=args.cache_size, cache_ttl=args.cache_ttl)
+    started = time.perf_counter()
+    try:
+        asyncio.run(lookup_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\nStopped after {time.perf_counter() - started:.0f}s: "
+              + ", ".join(f"{k} {v:,}" for k, v in lookup_server.counters.items()))
+    finally:
+        lookup_server.close()
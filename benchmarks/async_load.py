@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Load generator for the lookup JSON API (async_server.py, or app.py's /api/lookup).
+
+Opens --connections keep-alive connections and sends GET /api/lookup requests
+as fast as the server answers for --duration seconds. Prints requests/sec,
+the status codes seen and latency percentiles. Lookups are real
+(first, last, zip) triples sampled from the database, plus a share of names
+that match nobody (--miss-rate).
+
+With --synthetic N it builds a synthetic database of N voters in a temporary
+directory, starts async_server.py on it and loads that; extra server options
+can be passed with --server-args.
+
+Usage:
+    python3 benchmarks/async_load.py --synthetic 200000 [--connections 64] [--duration 10]
+    python3 benchmarks/async_load.py --db-name voters.db --url http://127.0.0.1:8080
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import shlex
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import import_to_sqlite3 as importer  # noqa: E402
+
+SYLLABLES = ["an", "ber", "son", "ka", "li", "mar", "to", "ra", "en", "gus", "hal", "vor", "mi", "sta", "del"]
+ELECTIONS = [(f"{year}-11-0{day}", f"{year} STATE GENERAL") for year, day in
+             [(2016, 8), (2018, 6), (2020, 3), (2022, 8), (2024, 5)]] + \
+            [(f"{year}-08-{day}", f"{year} STATE PRIMARY") for year, day in
+             [(2016, 9), (2018, 14), (2020, 11), (2022, 9), (2024, 13)]]
+
+def build_synthetic_db(db_name, voters, seed):
+    """Voters with Zipf-distributed names over 900 zip codes, each with up to 10 elections."""
+    rnd = random.Random(seed)
+
+    def name(parts):
+        return "".join(rnd.choice(SYLLABLES) for _ in range(parts)).upper()
+
+    firsts = [name(2) for _ in range(3000)]
+    lasts = [name(3) for _ in range(20000)]
+    first_weights = [1 / (i + 1) for i in range(len(firsts))]
+    last_weights = [1 / (i + 1) ** 0.8 for i in range(len(lasts))]
+
+    conn = sqlite3.connect(db_name)
+    importer.apply_bulk_pragmas(conn, 64)
+    importer.create_tables(conn.cursor())
+    interner = importer.ElectionInterner(conn)
+    columns = {name: i for i, name in enumerate(importer.VOTER_COLUMNS)}
+
+    rows, history = [], []
+    for voter_id, first, last in zip(range(100000, 100000 + voters),
+                                     rnd.choices(firsts, first_weights, k=voters),
+                                     rnd.choices(lasts, last_weights, k=voters)):
+        row = [None] * len(importer.VOTER_COLUMNS)
+        zip_code = str(55000 + rnd.randrange(900))
+        row[columns["VoterId"]] = voter_id
+        row[columns["FirstName"]] = first
+        row[columns["LastName"]] = last
+        row[columns["ZipCode"]] = zip_code
+        row[columns["City"]] = f"CITY{zip_code}"
+        row[columns["State"]] = "MN"
+        row[columns["DOBYear"]] = rnd.randint(1930, 2005)
+        rows.append(row)
+        for date, description in rnd.sample(ELECTIONS, rnd.randint(0, len(ELECTIONS))):
+            history.append((voter_id, date, description, rnd.choice("AMP")))
+
+    conn.executemany(importer.INSERT_SQL["voters"].format(table="voters"), rows)
+    conn.executemany(importer.INSERT_SQL["elections"].format(table="election_votes"), interner.encode(history))
+    conn.commit()
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.build_indexes(conn)
+    conn.close()
+
+def sample_lookups(db_name, samples, miss_rate, seed):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    low, high = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM voters").fetchone()
+    lookups = []
+    for _ in range(samples if low is not None else 0):
+        row = conn.execute("SELECT FirstName, LastName, ZipCode FROM voters WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+                           (rnd.randint(low, high),)).fetchone()
+        if row and all(row):
+            first, last, zip_code = row
+            if rnd.random() < miss_rate:
+                last += "QX"
+            lookups.append((first.lower(), last, zip_code))
+    conn.close()
+    return lookups
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(db_name, port, server_args):
+    command = [sys.executable, os.path.join(ROOT, "async_server.py"), "--db-name", db_name,
+               "--port", str(port)] + shlex.split(server_args)
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    print(server.stdout.readline().rstrip())
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=1):
+            return server
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("async_server.py did not start")
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            close = value.strip().lower() == "close"
+    await reader.readexactly(length)
+    return status, close
+
+async def client(host, port, path, lookups, deadline, latencies, statuses, seed):
+    rnd = random.Random(seed)
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        first, last, zip_code = rnd.choice(lookups)
+        query = urlencode({"first_name": first, "last_name": last, "zip_code": zip_code})
+        started = time.perf_counter()
+        writer.write(f"GET {path}?{query} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+        try:
+            status, close = await read_response(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            statuses["conn-error"] += 1
+            writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - started)
+        statuses[status] += 1
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+async def run_load(url, lookups, connections, duration):
+    target = urlsplit(url)
+    path = (target.path.rstrip("/") or "") + "/api/lookup"
+    latencies, statuses = [], Counter()
+    started = time.perf_counter()
+    await asyncio.gather(*(client(target.hostname, target.port or 80, path, lookups, started + duration,
+                                  latencies, statuses, i) for i in range(connections)))
+    return sorted(latencies), statuses, time.perf_counter() - started
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(latencies, statuses, elapsed, connections):
+    print(f"{connections} connections, {elapsed:.1f}s: {len(latencies):,} responses, "
+          f"{len(latencies) / elapsed:,.0f} requests/sec")
+    print("   status  : " + ", ".join(f"{status} x {count:,}" for status, count in sorted(statuses.items(), key=str)))
+    if latencies:
+        print("   latency : " + "   ".join(f"p{pct:g} {percentile(latencies, pct) * 1000:.2f} ms"
+                                         for pct in (50, 90, 99, 99.9)) + f"   max {latencies[-1] * 1000:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the voter lookup JSON API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Server base URL (default: http://127.0.0.1:8080)")
+    parser.add_argument("--db-name", default="voters.db", help="Database to sample lookups from (default: voters.db)")
+    parser.add_argument("--synthetic", type=int, metavar="VOTERS",
+                        help="Build a synthetic database with this many voters and serve it with async_server.py")
+    parser.add_argument("--server-args", default="", help='Extra async_server.py options, e.g. "--workers 4 --cache-size 0"')
+    parser.add_argument("--connections", default="1,16,64",
+                        help="Comma-separated concurrent connection counts (default: 1,16,64)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run (default: 10)")
+    parser.add_argument("--samples", type=int, default=20000, help="Distinct lookups to sample (default: 20000)")
+    parser.add_argument("--miss-rate", type=float, default=0.1, help="Share of lookups matching nobody (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        db_name = args.db_name
+        url = args.url
+        if args.synthetic:
+            db_name = os.path.join(tmp, "synthetic_voters.db")
+            started = time.perf_counter()
+            build_synthetic_db(db_name, args.synthetic, args.seed)
+            print(f"Built synthetic database with {args.synthetic:,} voters ({time.perf_counter() - started:.1f}s)")
+            port = free_port()
+            server = start_server(db_name, port, args.server_args)
+            url = f"http://127.0.0.1:{port}"
+
+        try:
+            lookups = sample_lookups(db_name, args.samples, args.miss_rate, args.seed)
+            if not lookups:
+                print("No voters to sample.")
+                sys.exit(1)
+            for connections in [int(c) for c in args.connections.split(",")]:
+                report(*asyncio.run(run_load(url, lookups, connections, args.duration)), connections)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-lookup cost of voter_election_reports() (set-based batch, one
+read transaction) against calling voter_election_report() once per lookup,
+both on the same ReadOnlyConnectionPool. Checks the reports are identical.
+
+With --url, compares one POST /api/lookup per lookup with POST /api/lookup/batch
+against a running app instead (each mode gets its own lookups, so the app's
+cache does not favour the second one).
+
+Usage:
+    python3 benchmarks/bench_batch_lookup.py [--db-name voters.db] [--batch-sizes 10,100,500]
+    python3 benchmarks/bench_batch_lookup.py --db-name voters.db --url http://127.0.0.1:5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connection_pool import ReadOnlyConnectionPool  # noqa: E402
+from voter_election_report import voter_election_report, voter_election_reports  # noqa: E402
+
+def sample_lookups(db_name, samples, seed):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    low, high = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM voters").fetchone()
+    lookups = []
+    for _ in range(samples if low is not None else 0):
+        row = conn.execute("SELECT FirstName, LastName, ZipCode FROM voters WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+                           (rnd.randint(low, high),)).fetchone()
+        if row and all(row):
+            lookups.append(row)
+    conn.close()
+    return lookups
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        # /api/lookup answers 404 when nobody matches
+        return json.load(e)
+
+def as_params(lookup):
+    return dict(zip(("first_name", "last_name", "zip_code"), lookup))
+
+def http_single(url, batch):
+    return [post_json(f"{url}/api/lookup", as_params(lookup)) for lookup in batch]
+
+def http_batch(url, batch):
+    return post_json(f"{url}/api/lookup/batch", {"lookups": [as_params(lookup) for lookup in batch]})["reports"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch voter lookups against one call per lookup.")
+    parser.add_argument("--db-name", default="voters.db", help="Database name (default: voters.db)")
+    parser.add_argument("--batch-sizes", default="10,100,500", help="Comma-separated batch sizes (default: 10,100,500)")
+    parser.add_argument("--rounds", type=int, default=20, help="Batches per size (default: 20)")
+    parser.add_argument("--url", help="Base URL of a running app to benchmark over HTTP instead")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    lookups = sample_lookups(args.db_name, max(batch_sizes) * args.rounds * (2 if args.url else 1), args.seed)
+    if not lookups:
+        print("No voters to sample.")
+        sys.exit(1)
+
+    if args.url:
+        url = args.url.rstrip("/")
+        print(f"{'batch':>6}   {'/api/lookup each':>16}   {'/api/lookup/batch':>17}   {'speedup':>7}")
+        for size in batch_sizes:
+            count = size * args.rounds
+            single_lookups, batch_lookups = lookups[:count], lookups[count:count * 2]
+            started = time.perf_counter()
+            for i in range(0, count, size):
+                http_single(url, single_lookups[i:i + size])
+            single_time = time.perf_counter() - started
+            started = time.perf_counter()
+            for i in range(0, count, size):
+                http_batch(url, batch_lookups[i:i + size])
+            batch_time = time.perf_counter() - started
+            print(f"{size:>6}   {single_time / count * 1e6:10.1f} µs/ea   {batch_time / count * 1e6:11.1f} µs/ea   "
+                  f"{single_time / batch_time:6.1f}x")
+        return
+
+    pool = ReadOnlyConnectionPool(args.db_name, size=1)
+
+    print(f"{'batch':>6}   {'one call each':>15}   {'batched':>15}   {'speedup':>7}")
+    for size in batch_sizes:
+        batches = [lookups[i:i + size] for i in range(0, size * args.rounds, size)]
+        started = time.perf_counter()
+        single = [[voter_election_report(pool, *lookup) for lookup in batch] for batch in batches]
+        single_time = time.perf_counter() - started
+        started = time.perf_counter()
+        batched = [voter_election_reports(pool, batch) for batch in batches]
+        batch_time = time.perf_counter() - started
+        if single != batched:
+            print(f"MISMATCH for batch size {size}")
+            sys.exit(1)
+        count = sum(len(batch) for batch in batches)
+        print(f"{size:>6}   {single_time / count * 1e6:9.1f} µs/ea   {batch_time / count * 1e6:9.1f} µs/ea   "
+              f"{single_time / batch_time:6.1f}x")
+    pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Peak memory of writing one big county's diff CSV in compare_voters_history.py.
+
+Builds an old/new pair of synthetic databases with every voter in one county
+(HENNEPIN): the new snapshot adds an election for 70% of the voters, moves 5%
+and drops 2%, so the county's diff has roughly 0.8 rows per voter. Each writer
+then runs in a fresh child process, which builds the diff tables and writes the
+CSV:
+
+    stream     write_csv(): rows fetched from the cursor in --batch-rows batches
+    dataframe  the previous writer: read_sql_query() for the history and MOVED
+               rows, pd.concat(), DataFrame.to_csv()
+
+and reports the child's peak RSS and how much it grew while writing.
+
+Usage:
+    python3 benchmarks/bench_diff_memory.py [--voters 100000,400000] [--batch-rows 10000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "data_analysis_tools"))
+import history_digest  # noqa: E402
+from async_load import build_synthetic_db  # noqa: E402
+
+COUNTY = ("27", "HENNEPIN")
+
+def build_pair(tmp, voters, seed):
+    old_db, new_db = os.path.join(tmp, "old.db"), os.path.join(tmp, "new.db")
+    build_synthetic_db(old_db, voters, seed)
+    conn = sqlite3.connect(old_db)
+    conn.execute("UPDATE voters SET CountyCode = ?, HouseNumber = CAST(VoterId % 9000 AS TEXT), StreetName = 'MAIN ST'",
+                 (COUNTY[0],))
+    conn.commit()
+    conn.close()
+
+    shutil.copyfile(old_db, new_db)
+    conn = sqlite3.connect(new_db)
+    election_id = conn.execute("INSERT INTO elections (ElectionDate, ElectionDescription) "
+                               "VALUES ('2025-11-04', '11/04/2025 - SPECIAL')").lastrowid
+    conn.execute("INSERT INTO election_votes SELECT VoterId, ?, 1 FROM voters WHERE VoterId % 10 < 7", (election_id,))
+    conn.execute("UPDATE voters SET HouseNumber = '12', StreetName = 'OAK AVE' WHERE VoterId % 20 = 0")
+    conn.execute("DELETE FROM election_votes WHERE VoterId % 50 = 1")
+    conn.execute("DELETE FROM voters WHERE VoterId % 50 = 1")
+    conn.commit()
+    conn.close()
+
+    for db_name in (old_db, new_db):
+        conn = sqlite3.connect(db_name)
+        history_digest.build_history_digests(conn)
+        conn.commit()
+        conn.close()
+    return new_db, old_db
+
+def peak_rss_mb():
+    # Linux carries ru_maxrss over from the parent across fork/exec, so prefer
+    # this process's own high-water mark
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def child(mode, new_db, old_db, out_dir, batch_rows):
+    import pandas as pd
+    import compare_voters_history as compare
+
+    code, county_name = COUNTY
+    conn = compare.open_databases(new_db, old_db)
+    compare.build_diff_tables(conn, [code])
+    before = peak_rss_mb()
+    params = (code, county_name, code)
+    path = os.path.join(out_dir, f"diff_{mode}.csv")
+
+    started = time.perf_counter()
+    if mode == "stream":
+        rows = sum(compare.write_csv(path, [compare.query_batches(conn, compare.CSV_HISTORY_SQL, params, batch_rows),
+                                            compare.query_batches(conn, compare.MOVED_SQL, params, batch_rows)]))
+    else:
+        history_out = pd.read_sql_query(compare.CSV_HISTORY_SQL, conn, params=params)
+        move_out = pd.read_sql_query(compare.MOVED_SQL, conn, params=params)
+        full_df = pd.concat([history_out, move_out], ignore_index=True)
+        full_df.to_csv(path, index=False)
+        rows = len(full_df)
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({"rows": rows, "seconds": elapsed, "before_mb": before, "peak_mb": peak_rss_mb(),
+                      "bytes": os.path.getsize(path)}))
+
+def run_child(mode, new_db, old_db, out_dir, batch_rows):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--new-db", new_db,
+                             "--old-db", old_db, "--out-dir", out_dir, "--batch-rows", str(batch_rows)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of the compare tool's diff CSV writers.")
+    parser.add_argument("--voters", default="100000,400000",
+                        help="Comma-separated voter counts for the synthetic county (default: 100000,400000)")
+    parser.add_argument("--batch-rows", type=int, default=10000, help="Rows per fetchmany() batch (default: 10000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child", choices=["stream", "dataframe"], help=argparse.SUPPRESS)
+    parser.add_argument("--new-db", help=argparse.SUPPRESS)
+    parser.add_argument("--old-db", help=argparse.SUPPRESS)
+    parser.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.new_db, args.old_db, args.out_dir, args.batch_rows)
+        return
+
+    for voters in [int(v) for v in args.voters.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.perf_counter()
+            new_db, old_db = build_pair(tmp, voters, args.seed)
+            print(f"{voters:,} voters in {COUNTY[1]} (pair built in {time.perf_counter() - started:.1f}s)")
+            results = {mode: run_child(mode, new_db, old_db, tmp, args.batch_rows) for mode in ("stream", "dataframe")}
+            for mode, r in results.items():
+                print(f"   {mode:<10} {r['rows']:>9,} rows  {r['bytes'] / 1e6:7.1f} MB csv  {r['seconds']:6.2f}s   "
+                      f"peak RSS {r['peak_mb']:7.1f} MB  (+{r['peak_mb'] - r['before_mb']:.1f} MB while writing)")
+            with open(os.path.join(tmp, "diff_stream.csv"), "rb") as a, open(os.path.join(tmp, "diff_dataframe.csv"), "rb") as b:
+                print(f"   outputs identical: {a.read() == b.read()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the voter lookup by first name, last name and zip code, with the
+old `LOWER(col) = LOWER(?)` predicate against the `COLLATE NOCASE` predicate
+served by idx_name_nocase.
+
+Samples real (first, last, zip) triples from the database, re-cases some of
+them the way people type into the web form, checks both queries return the
+same voters, prints EXPLAIN QUERY PLAN for each and per-lookup latency.
+
+Usage:
+    python3 benchmarks/bench_name_lookup.py [--db-name voters.db] [--samples 2000]
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+
+LOWER_SQL = '''
+    SELECT DISTINCT v.VoterId
+    FROM voters v
+    WHERE
+        LOWER(v.FirstName) = LOWER(?)
+        AND LOWER(v.LastName) = LOWER(?)
+        AND v.ZipCode = ?
+'''
+
+NOCASE_SQL = '''
+    SELECT DISTINCT v.VoterId
+    FROM voters v
+    WHERE
+        v.LastName = ? COLLATE NOCASE
+        AND v.FirstName = ? COLLATE NOCASE
+        AND v.ZipCode = ?
+'''
+
+def lower_params(first, last, zip_code):
+    return (first, last, zip_code)
+
+def nocase_params(first, last, zip_code):
+    return (last, first, zip_code)
+
+def sample_triples(conn, samples, seed):
+    rnd = random.Random(seed)
+    low, high = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM voters").fetchone()
+    if low is None:
+        return []
+    triples = []
+    for _ in range(samples):
+        row = conn.execute("SELECT FirstName, LastName, ZipCode FROM voters WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+                           (rnd.randint(low, high),)).fetchone()
+        if row and all(row):
+            first, last, zip_code = row
+            recase = rnd.choice([str.lower, str.upper, str.title, str])
+            triples.append((recase(first), recase(last), zip_code))
+    return triples
+
+def explain(conn, sql, params):
+    return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def time_lookups(conn, sql, make_params, triples):
+    latencies = []
+    results = []
+    for triple in triples:
+        started = time.perf_counter()
+        rows = conn.execute(sql, make_params(*triple)).fetchall()
+        latencies.append(time.perf_counter() - started)
+        results.append(sorted(rows))
+    return latencies, results
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(label, latencies):
+    total = sum(latencies)
+    print(f"   {label:<7}: mean {total / len(latencies) * 1000:8.3f} ms   "
+          f"p50 {percentile(latencies, 50) * 1000:8.3f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:8.3f} ms   "
+          f"({len(latencies) / total:,.0f} lookups/sec)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LOWER() and COLLATE NOCASE voter lookups.")
+    parser.add_argument("--db-name", default="voters.db", help="Database name (default: voters.db)")
+    parser.add_argument("--samples", type=int, default=2000, help="Name/zip triples to look up (default: 2000)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{args.db_name}?mode=ro", uri=True)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_name_nocase'").fetchone():
+        print("idx_name_nocase is missing; build it with: python3 import_to_sqlite3.py --indexes-only")
+        sys.exit(1)
+
+    triples = sample_triples(conn, args.samples, args.seed)
+    if not triples:
+        print("No voters to sample.")
+        sys.exit(1)
+
+    example = triples[0]
+    print("EXPLAIN QUERY PLAN, LOWER():")
+    for line in explain(conn, LOWER_SQL, lower_params(*example)):
+        print("   " + line)
+    print("EXPLAIN QUERY PLAN, COLLATE NOCASE:")
+    for line in explain(conn, NOCASE_SQL, nocase_params(*example)):
+        print("   " + line)
+    print()
+
+    # Warm the page cache so both queries are measured against the same state
+    time_lookups(conn, NOCASE_SQL, nocase_params, triples)
+    slow, slow_results = time_lookups(conn, LOWER_SQL, lower_params, triples)
+    fast, fast_results = time_lookups(conn, NOCASE_SQL, nocase_params, triples)
+    conn.close()
+
+    if slow_results != fast_results:
+        mismatches = sum(a != b for a, b in zip(slow_results, fast_results))
+        print(f"MISMATCH on {mismatches} of {len(triples)} lookups")
+        sys.exit(1)
+
+    print(f"{len(triples):,} lookups — results identical")
+    report("LOWER()", slow)
+    report("NOCASE", fast)
+    print(f"   speedup: {sum(slow) / sum(fast):.1f}x")
+
+if __name__ == "__main__":
+    main()
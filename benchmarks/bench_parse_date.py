@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: date_utils.parse_date (fast path + memoization) against the
+original strptime loop, on a workload shaped like the MN SOS files (a few
+thousand distinct dates repeated millions of times).
+
+Usage:
+    python3 benchmarks/bench_parse_date.py [--values 1000000] [--distinct 3000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from date_utils import parse_date, parse_date_strptime  # noqa: E402
+
+EDGE_CASES = [
+    None, "", "   ", "01/15/2020", " 01/15/2020 ", "1/5/2020", "01/5/2020", "2020-01-15",
+    "2020-1-5", "02/29/2020", "02/29/2019", "2019-02-29", "02/30/2020", "13/01/2020",
+    "00/10/2020", "10/00/2020", "01/15/0999", "0999-01-15", "2020-01-15 10:30:00",
+    "2020-01-15 10:30:00.123456", "2020-01-15 25:00:00", "2020-01-15T10:30:00",
+    "15/01/2020", "2020/01/15", "01-15-2020", "abcdefghij", "1/ 5/2020",
+    "٠١/١٥/٢٠٢٠", "01/15/2020\n", "12/31/9999",
+]
+
+def make_workload(values, distinct, seed):
+    rnd = random.Random(seed)
+    start = date(1950, 1, 1)
+    pool = []
+    for _ in range(distinct):
+        d = start + timedelta(days=rnd.randrange(365 * 75))
+        if rnd.random() < 0.9:
+            pool.append(d.strftime('%m/%d/%Y'))
+        else:
+            pool.append(d.strftime('%Y-%m-%d'))
+    pool.extend(e for e in EDGE_CASES if e is not None)
+    # A handful of election dates dominate the election files
+    weights = [1.0 / (i + 1) for i in range(len(pool))]
+    return rnd.choices(pool, weights=weights, k=values)
+
+def run(fn, workload):
+    started = time.perf_counter()
+    for s in workload:
+        fn(s)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark date_utils.parse_date against the strptime loop.")
+    parser.add_argument("--values", type=int, default=1000000, help="Date strings to parse (default: 1000000)")
+    parser.add_argument("--distinct", type=int, default=3000, help="Distinct date strings (default: 3000)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    workload = make_workload(args.values, args.distinct, args.seed)
+
+    mismatches = [s for s in set(workload) | set(EDGE_CASES) if parse_date(s) != parse_date_strptime(s)]
+    if mismatches:
+        print(f"MISMATCH on {len(mismatches)} inputs, e.g. {mismatches[:5]!r}")
+        sys.exit(1)
+
+    parse_date.cache_clear()
+    slow = run(parse_date_strptime, workload)
+    fast = run(parse_date, workload)
+    info = parse_date.cache_info()
+
+    print(f"{args.values:,} values, {len(set(workload)):,} distinct — outputs identical")
+    print(f"   strptime loop : {slow:7.2f}s ({args.values / slow:>12,.0f} values/sec)")
+    print(f"   parse_date    : {fast:7.2f}s ({args.values / fast:>12,.0f} values/sec)  {slow / fast:.1f}x")
+    print(f"   cache         : {info.hits:,} hits, {info.misses:,} misses, {info.currsize:,}/{info.maxsize:,} entries")
+
+    parse_date.cache_clear()
+    uncached = run(parse_date.__wrapped__, workload)
+    print(f"   fast path only: {uncached:7.2f}s ({args.values / uncached:>12,.0f} values/sec)  {slow / uncached:.1f}x")
+
+if __name__ == "__main__":
+    main()
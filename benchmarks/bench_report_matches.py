@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: voter_election_report latency against the number of voters a
+name/zip lookup matches, for the set-based report (one voter query and one
+history query) and the original per-voter loop (two queries per match).
+
+Builds a synthetic database with the importer's schema and indexes, where a
+name/zip group exists for each requested match count, checks both reports
+return identical results and prints p50/p99 per match count.
+
+Usage:
+    python3 benchmarks/bench_report_matches.py [--matches 1,2,5,10,25,50,100] [--repeat 300]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import import_to_sqlite3 as importer  # noqa: E402
+from voter_election_report import voter_election_report  # noqa: E402
+
+ELECTIONS = [(f"{year}-11-0{day}", f"{year} STATE GENERAL") for year, day in
+             [(2016, 8), (2018, 6), (2020, 3), (2022, 8), (2024, 5)]] + \
+            [(f"{year}-08-{day}", f"{year} STATE PRIMARY") for year, day in
+             [(2016, 9), (2018, 14), (2020, 11), (2022, 9), (2024, 13)]]
+
+def voter_election_report_per_voter(db_name, first_name, last_name, zip_code):
+    """The report as it was before: one voter query and one history query per match."""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT DISTINCT v.VoterId
+        FROM voters v
+        WHERE v.LastName = ? COLLATE NOCASE AND v.FirstName = ? COLLATE NOCASE AND v.ZipCode = ?
+    ''', (last_name, first_name, zip_code))
+    voter_ids = cursor.fetchall()
+    results = []
+    for (voter_id,) in voter_ids:
+        cursor.execute(f"SELECT {', '.join(importer.VOTER_COLUMNS)} FROM voters WHERE VoterId = ?", (voter_id,))
+        voter_data = cursor.fetchone()
+        all_headers = [description[0] for description in cursor.description]
+        voter_dict = dict(zip(all_headers, voter_data)) if voter_data else {}
+        primary_fields = ["VoterId", "FirstName", "MiddleName", "LastName", "ZipCode",
+                          "RegistrationDate", "DOBYear", "City", "State"]
+        cursor.execute('''
+            SELECT VoterId AS "Voter ID", ElectionDate AS "Election Date",
+                   ElectionDescription AS "Election Description", VotingMethod AS "Voting Method"
+            FROM election_history WHERE VoterId = ? ORDER BY ElectionDate DESC
+        ''', (voter_id,))
+        election_headers = [description[0] for description in cursor.description]
+        results.append({
+            "voter_info": {k: voter_dict[k] for k in primary_fields if k in voter_dict},
+            "additional_details": {k: v for k, v in voter_dict.items() if k not in primary_fields},
+            "election_history": [dict(zip(election_headers, row)) for row in cursor.fetchall()],
+        })
+    conn.close()
+    return {"results": results}
+
+def build_database(db_name, match_counts, filler, seed):
+    """Returns the (first, last, zip) lookup for each match count."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(db_name)
+    importer.apply_bulk_pragmas(conn, 64)
+    importer.create_tables(conn.cursor())
+    interner = importer.ElectionInterner(conn)
+
+    lookups = {}
+    people = []
+    for count in match_counts:
+        lookups[count] = (f"FIRST{count}", f"LAST{count}", "55999")
+        people.extend([lookups[count]] * count)
+    for i in range(filler):
+        people.append((f"FIRST{rnd.randrange(2000)}X", f"LAST{rnd.randrange(20000)}X", str(55000 + rnd.randrange(900))))
+
+    voters, history = [], []
+    for voter_id, (first, last, zip_code) in enumerate(people, start=1):
+        row = [voter_id] + [None] * (len(importer.VOTER_COLUMNS) - 1)
+        row[importer.VOTER_COLUMNS.index("FirstName")] = first
+        row[importer.VOTER_COLUMNS.index("LastName")] = last
+        row[importer.VOTER_COLUMNS.index("ZipCode")] = zip_code
+        voters.append(row)
+        for date, description in rnd.sample(ELECTIONS, rnd.randint(0, len(ELECTIONS))):
+            history.append((voter_id, date, description, rnd.choice("AMP")))
+
+    conn.executemany(importer.INSERT_SQL["voters"].format(table="voters"), voters)
+    conn.executemany(importer.INSERT_SQL["elections"].format(table="election_votes"), interner.encode(history))
+    conn.commit()
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.build_indexes(conn)
+    conn.close()
+    return lookups
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def measure(report, db_name, lookup, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        report(db_name, *lookup)
+        latencies.append(time.perf_counter() - started)
+    return percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark voter_election_report latency against match count.")
+    parser.add_argument("--matches", default="1,2,5,10,25,50,100",
+                        help="Comma-separated match counts (default: 1,2,5,10,25,50,100)")
+    parser.add_argument("--filler", type=int, default=200000, help="Other voters in the database (default: 200000)")
+    parser.add_argument("--repeat", type=int, default=300, help="Lookups per match count (default: 300)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    match_counts = [int(m) for m in args.matches.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench_voters.db")
+        print(f"Building synthetic database ({args.filler:,} voters + match groups)...")
+        lookups = build_database(db_name, match_counts, args.filler, args.seed)
+
+        for count in match_counts:
+            if voter_election_report(db_name, *lookups[count]) != voter_election_report_per_voter(db_name, *lookups[count]):
+                print(f"MISMATCH for {count} matches")
+                sys.exit(1)
+        print("Results identical\n")
+
+        print(f"{'matches':>7}   {'per-voter p50':>13} {'p99':>11}   {'set-based p50':>13} {'p99':>11}   {'p50 speedup':>11}")
+        for count in match_counts:
+            old50, old99 = measure(voter_election_report_per_voter, db_name, lookups[count], args.repeat)
+            new50, new99 = measure(voter_election_report, db_name, lookups[count], args.repeat)
+            print(f"{count:>7}   {old50:10.3f} ms {old99:8.3f} ms   {new50:10.3f} ms {new99:8.3f} ms   {old50 / new50:10.1f}x")
+
+if __name__ == "__main__":
+    main()
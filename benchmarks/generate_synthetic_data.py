@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Writes synthetic Minnesota SOS snapshots (Voter01..08.txt and
+Election01..08.txt, quoted CSV with a header, split by congressional district
+like the real export) for benchmarks and for trying the tools without real
+data.
+
+The data is shaped like the real files where it matters for performance:
+  - the 38-column voter layout and 4-column election layout the importer reads
+  - voters spread over counties by population, and over each county's zip
+    codes and precincts with a long tail, so a few zip codes are large
+  - common Minnesota names repeated the way real names are (Zipf), plus a
+    tail of rare generated surnames
+  - state primaries and generals every even year and local elections in odd
+    years, each voter voting with their own propensity, by A/M/P method
+  - month-over-month churn between snapshots: removals, new registrations,
+    moves, name changes, history corrections and that month's elections
+
+Every voter is generated from (--seed, VoterId), and each snapshot's changes
+from (--seed, VoterId, snapshot), so any scale streams in constant memory and
+the same arguments always write the same files.
+
+Writes <out_dir>/snap01, snap02, ... one month apart, the first for --start.
+
+Usage:
+    python3 benchmarks/generate_synthetic_data.py /tmp/synth [--voters 100000] [--snapshots 2] [--seed 1]
+"""
+
+import argparse
+import calendar
+import csv
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from import_to_sqlite3 import VOTER_COLUMNS  # noqa: E402
+
+ELECTION_COLUMNS = ["VoterId", "ElectionDate", "ElectionDescription", "VotingMethod"]
+
+FIRST_VOTER_ID = 1000001
+FIRST_ELECTION_YEAR = 2012
+
+# Share of voters by county code; the other counties split the rest evenly
+COUNTY_WEIGHTS = {
+    "27": 22.0, "62": 9.5, "19": 7.6, "02": 6.3, "82": 4.6, "69": 3.6, "73": 2.8, "55": 2.8,
+    "70": 2.6, "86": 2.5, "10": 1.9, "71": 1.7, "07": 1.2, "13": 1.0, "66": 1.2, "18": 1.2,
+}
+OTHER_COUNTIES_WEIGHT = 27.5
+
+# Congressional district of each county; Hennepin is split between 3 and 5
+COUNTY_DISTRICTS = {
+    "27": ("03", "05"), "62": ("04",), "82": ("04",), "19": ("02",), "70": ("02",), "25": ("02",),
+    "66": ("02",), "02": ("06",), "71": ("06",), "86": ("06",), "73": ("06",), "10": ("06",),
+    "69": ("08",), "09": ("08",), "31": ("08",), "36": ("08",), "38": ("08",), "58": ("08",),
+    "01": ("08",), "18": ("08",), "33": ("08",), "55": ("01",), "07": ("01",), "50": ("01",),
+    "85": ("01",), "24": ("01",), "74": ("01",), "81": ("01",), "20": ("01",), "79": ("01",),
+}
+DEFAULT_DISTRICT = "07"
+
+FIRST_NAMES = [
+    "JOHN", "MARY", "MICHAEL", "JENNIFER", "DAVID", "LINDA", "JAMES", "SUSAN", "ROBERT", "PATRICIA",
+    "THOMAS", "BARBARA", "WILLIAM", "KAREN", "DANIEL", "LISA", "MARK", "NANCY", "PAUL", "ELIZABETH",
+    "STEVEN", "SARAH", "RICHARD", "JESSICA", "JOSEPH", "AMY", "MATTHEW", "KIMBERLY", "BRIAN", "MICHELLE",
+    "CHRISTOPHER", "JULIE", "ANDREW", "ANGELA", "JASON", "HEATHER", "ERIC", "LAURA", "SCOTT", "EMILY",
+    "TIMOTHY", "SANDRA", "GARY", "DEBORAH", "JEFFREY", "DONNA", "KEVIN", "CAROL", "RYAN", "REBECCA",
+    "GREGORY", "KATHLEEN", "ANTHONY", "ANNA", "PETER", "MARGARET", "KYLE", "HANNAH", "NICHOLAS", "EMMA",
+    "MOHAMED", "FARTUN", "ABDI", "HODAN", "TOU", "MAI", "PAO", "KA", "JOSÉ", "MARÍA", "LUIS", "ANA",
+    "OLAF", "INGRID", "SVEN", "GRETA", "DYLAN", "OLIVIA", "LOGAN", "AVA", "ETHAN", "SOPHIA",
+]
+
+LAST_NAMES = [
+    "JOHNSON", "ANDERSON", "NELSON", "OLSON", "PETERSON", "LARSON", "SMITH", "MILLER", "SWANSON", "HANSON",
+    "ERICKSON", "CARLSON", "JOHNSTON", "SCHMIDT", "MEYER", "THOMPSON", "MARTIN", "BROWN", "LEE", "JOHNSEN",
+    "HANSEN", "JACOBSON", "LUND", "NGUYEN", "YANG", "VANG", "XIONG", "LOR", "HER", "THAO", "MOUA", "KHANG",
+    "MOHAMED", "ALI", "HASSAN", "AHMED", "WARSAME", "GARCIA", "HERNANDEZ", "MARTÍNEZ", "MUÑOZ", "LOPEZ",
+    "WILSON", "MOORE", "TAYLOR", "WHITE", "SCHULTZ", "WAGNER", "BECKER", "HOFFMAN", "KOCH", "WEBER",
+    "LINDQUIST", "BERGSTROM", "SUNDBERG", "GUSTAFSON", "HALVORSON", "SORENSON", "CHRISTENSEN", "DAHL",
+    "KOWALSKI", "NOVAK", "WALSH", "MURPHY", "OBRIEN", "KELLY", "RYAN", "DUFFY", "BAKER", "CLARK",
+    "LEWIS", "WALKER", "HALL", "YOUNG", "KING", "WRIGHT", "SCOTT", "GREEN", "ADAMS", "HILL",
+]
+
+# Rare surnames are made of these; about a third of voters get one
+SYLLABLES = ["BER", "LIN", "STR", "OM", "KA", "VI", "NEN", "HOL", "GAARD", "SKI", "MAN", "DOR",
+             "WEN", "TRO", "QUIST", "ER", "AS", "EL", "MO", "RU", "ZEK", "BACH", "FELD", "HAUG"]
+RARE_SURNAME_SHARE = 0.33
+
+STREET_NAMES = ["MAIN", "OAK", "MAPLE", "PINE", "ELM", "LAKE", "PARK", "CEDAR", "WASHINGTON", "2ND",
+                "3RD", "4TH", "5TH", "HIGHLAND", "RIVER", "SUMMIT", "GRAND", "UNIVERSITY", "COUNTY ROAD 10",
+                "BIRCH", "ASPEN", "WILLOW", "PROSPECT", "VICTORY", "HENNEPIN", "SNELLING", "LYNDALE", "FRANCE"]
+STREET_TYPES = ["ST", "AVE", "DR", "LN", "RD", "BLVD", "CT", "CIR", "WAY", "PL"]
+DIRECTIONS = ["", "", "", "", "N", "S", "E", "W", "NE", "SE"]
+
+# (share of votes) by method: 2020 was mostly absentee
+METHODS = {"default": [("P", 0.72), ("A", 0.24), ("M", 0.04)],
+           2020: [("P", 0.40), ("A", 0.54), ("M", 0.06)]}
+
+# -------------------------------------------------
+def zipf_weights(count, exponent=1.0):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+FIRST_WEIGHTS = zipf_weights(len(FIRST_NAMES), 0.8)
+LAST_WEIGHTS = zipf_weights(len(LAST_NAMES), 0.9)
+
+def seeded(*parts):
+    return random.Random(":".join(str(part) for part in parts))
+
+def build_geography(seed):
+    """
+    Counties, each with zip codes (Zipf-weighted), and per zip code precincts
+    carrying their districts, all fixed by `seed`.
+    """
+    rnd = seeded(seed, "geography")
+    codes = [f"{n:02d}" for n in range(1, 88)]
+    others = OTHER_COUNTIES_WEIGHT / (len(codes) - len(COUNTY_WEIGHTS))
+    weights = [COUNTY_WEIGHTS.get(code, others) for code in codes]
+
+    # Zip codes and state senate districts are handed out in proportion to size
+    zip_pool = rnd.sample(range(55001, 56764), 800)
+    senate_pool = list(range(1, 68))
+    counties, next_zip, next_senate = {}, 0, 0
+    for code, weight in zip(codes, weights):
+        zip_count = max(2, round(weight / 100 * len(zip_pool) * 0.9))
+        senate_count = max(1, round(weight / 100 * len(senate_pool)))
+        senates = [senate_pool[(next_senate + i) % len(senate_pool)] for i in range(senate_count)]
+        next_senate += max(1, senate_count - 1)
+        districts = COUNTY_DISTRICTS.get(code, (DEFAULT_DISTRICT,))
+        zips = []
+        for zip_index in range(zip_count):
+            zip_code = str(zip_pool[next_zip % len(zip_pool)])
+            next_zip += 1
+            city = (rnd.choice(["NORTH ", "SOUTH ", "EAST ", "WEST ", "", "", ""])
+                    + rnd.choice(SYLLABLES) + rnd.choice(SYLLABLES)
+                    + rnd.choice(["", " CITY", " FALLS", " LAKE", " PARK", " HEIGHTS", "VILLE"]))
+            mcd = f"{rnd.randint(1000, 9999)}"
+            precincts = []
+            for p in range(rnd.randint(2, 12)):
+                senate = rnd.choice(senates)
+                precincts.append({
+                    "PrecinctCode": f"{zip_index * 20 + p + 5:04d}",
+                    "PrecinctName": f"{city} P-{p + 1}",
+                    "WardCode": f"{p // 3 + 1:02d}" if p < 9 else "",
+                    "School": f"{rnd.randint(1, 2900):04d}", "SchSub": str(rnd.randint(1, 7)),
+                    "Judicial": f"{rnd.randint(1, 10):02d}",
+                    "Legislative": f"{senate:02d}{rnd.choice('AB')}", "StateSen": f"{senate:02d}",
+                    "Congressional": rnd.choice(districts),
+                    "Commissioner": str(rnd.randint(1, 7)),
+                    "Park": rnd.choice(["", "", str(rnd.randint(1, 9))]),
+                    "SoilWater": str(rnd.randint(1, 5)), "Hospital": rnd.choice(["", "", "", "1"]),
+                })
+            zips.append((zip_code, city, mcd, precincts))
+        counties[code] = (zips, zipf_weights(len(zips), 1.1))
+    return codes, weights, counties
+
+def build_elections(seed, end_date):
+    """[(date, description, turnout)] up to `end_date`, oldest first."""
+    rnd = seeded(seed, "elections")
+    elections = []
+    for year in range(FIRST_ELECTION_YEAR, end_date.year + 1):
+        if year % 2 == 0:
+            # Second Tuesday of August, and the Tuesday after the first Monday of November
+            august = datetime.date(year, 8, 1)
+            primary = august + datetime.timedelta(days=(1 - august.weekday()) % 7 + 7)
+            november = datetime.date(year, 11, 1)
+            general = november + datetime.timedelta(days=(0 - november.weekday()) % 7 + 1)
+            elections.append((primary, "STATE PRIMARY", 0.25))
+            elections.append((general, "STATE GENERAL", 0.80 if year % 4 == 0 else 0.62))
+        else:
+            november = datetime.date(year, 11, 1)
+            elections.append((november + datetime.timedelta(days=(0 - november.weekday()) % 7 + 1),
+                              "GENERAL ELECTION", 0.18))
+        for _ in range(rnd.randint(1, 3)):
+            day = datetime.date(year, rnd.choice([2, 4, 5, 8]), rnd.randint(1, 28))
+            elections.append((day, "SPECIAL ELECTION", 0.08))
+    return sorted(e for e in elections if e[0] <= end_date)
+
+def month_end(start, months):
+    """Last day of the month `months` after `start`."""
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    return datetime.date(year, month + 1, calendar.monthrange(year, month + 1)[1])
+
+def month_start(start, months):
+    end = month_end(start, months)
+    return end.replace(day=1)
+
+def mdy(day):
+    return day.strftime("%m/%d/%Y")
+
+# -------------------------------------------------
+class Generator:
+    def __init__(self, seed, voters, snapshots, start, churn):
+        self.seed, self.voters, self.snapshots, self.start = seed, voters, snapshots, start
+        self.churn = churn
+        self.codes, self.weights, self.counties = build_geography(seed)
+        self.end_dates = [month_end(start, n) for n in range(snapshots)]
+        self.elections = build_elections(seed, self.end_dates[-1])
+        # New registrations get VoterIds after the base voters, a block per snapshot
+        self.new_per_snapshot = int(voters * churn["added"]) + 1
+
+    def surname(self, rnd):
+        if rnd.random() < RARE_SURNAME_SHARE:
+            return "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 3)))
+        return rnd.choices(LAST_NAMES, LAST_WEIGHTS)[0]
+
+    def address(self, rnd, county=None):
+        county = county or rnd.choices(self.codes, self.weights)[0]
+        zips, zip_weights = self.counties[county]
+        zip_code, city, mcd, precincts = rnd.choices(zips, zip_weights)[0]
+        street = f"{rnd.choice(DIRECTIONS)} {rnd.choice(STREET_NAMES)} {rnd.choice(STREET_TYPES)}".strip()
+        # Everyone on a street votes in the same precinct (str hash() is salted per process)
+        precinct = precincts[sum(map(ord, street)) % len(precincts)]
+        apartment = rnd.random() < 0.2
+        return {
+            "CountyCode": county, "HouseNumber": str(rnd.randint(1, 19999)), "StreetName": street,
+            "UnitType": "APT" if apartment else "", "UnitNumber": str(rnd.randint(1, 420)) if apartment else "",
+            "City": city, "State": "MN", "ZipCode": zip_code, "StateMcdCode": mcd, "McdName": city,
+            **precinct,
+        }
+
+    def base_voter(self, voter_id, registered_after=None, registered_before=None):
+        rnd = seeded(self.seed, voter_id)
+        dob_year = int(rnd.triangular(1925, 2007, 1962))
+        first_registered = max(datetime.date(dob_year + 18, 1, 1), datetime.date(1995, 1, 1))
+        low = registered_after or first_registered
+        high = registered_before or self.start - datetime.timedelta(days=1)
+        registered = low + datetime.timedelta(days=rnd.randint(0, max(0, (high - low).days)))
+        voter = {name: "" for name in VOTER_COLUMNS}
+        voter.update({
+            "VoterId": str(voter_id),
+            "FirstName": rnd.choices(FIRST_NAMES, FIRST_WEIGHTS)[0],
+            "MiddleName": rnd.choice("ABCDEFGHJKLMNPRSTW") if rnd.random() < 0.75 else "",
+            "LastName": self.surname(rnd),
+            "NameSuffix": rnd.choice(["JR", "SR", "II", "III"]) if rnd.random() < 0.02 else "",
+            "PhoneNumber": f"{rnd.choice(['612', '651', '763', '952', '218', '320', '507'])}-"
+                           f"{rnd.randint(200, 999)}-{rnd.randint(0, 9999):04d}" if rnd.random() < 0.3 else "",
+            "RegistrationDate": mdy(registered),
+            "DOBYear": str(dob_year),
+            "LegacyId": str(rnd.randint(10 ** 6, 10 ** 7)) if rnd.random() < 0.4 else "",
+            "PermanentAbsentee": "Y" if rnd.random() < 0.07 else "",
+        })
+        voter.update(self.address(rnd))
+        if rnd.random() < 0.03:
+            voter.update({"MailAddress": f"PO BOX {rnd.randint(1, 9999)}", "MailCity": voter["City"],
+                          "MailState": "MN", "MailZipCode": voter["ZipCode"]})
+        propensity = rnd.betavariate(2.2, 1.3)
+        # One draw per election in the whole schedule, so adding elections or
+        # snapshots never changes the history of earlier ones
+        votes = []
+        for index, (day, description, turnout) in enumerate(self.elections):
+            year_methods = METHODS.get(day.year, METHODS["default"])
+            draw, method_draw = rnd.random(), rnd.random()
+            if day < registered or draw >= min(1.0, turnout * propensity * 1.6):
+                continue
+            for method, share in year_methods:
+                method_draw -= share
+                if method_draw < 0:
+                    break
+            votes.append([index, method])
+        return voter, votes
+
+    def voter_at(self, voter_id, snapshot, born):
+        """
+        (voter, votes) as of `snapshot` for a voter first registered in
+        snapshot `born`, or None once removed.
+        """
+        registered_after = month_start(self.start, born) if born else None
+        registered_before = self.end_dates[born] if born else None
+        voter, votes = self.base_voter(voter_id, registered_after, registered_before)
+        for n in range(born + 1, snapshot + 1):
+            rnd = seeded(self.seed, voter_id, n)
+            draw = rnd.random()
+            churn = self.churn
+            if draw < churn["removed"]:
+                return None
+            draw -= churn["removed"]
+            if draw < churn["moved"]:
+                # Most moves stay in the county
+                voter.update(self.address(rnd, voter["CountyCode"] if rnd.random() < 0.7 else None))
+            elif draw - churn["moved"] < churn["renamed"]:
+                voter["LastName"] = self.surname(rnd)
+            elif draw - churn["moved"] - churn["renamed"] < churn["corrected"] and votes:
+                vote = rnd.choice(votes)
+                vote[1] = rnd.choice([m for m in "APM" if m != vote[1]])
+        last_day = self.end_dates[snapshot]
+        return voter, [(index, method) for index, method in votes if self.elections[index][0] <= last_day]
+
+    def voter_ids(self, snapshot):
+        """(VoterId, snapshot registered in) of everyone who may be on `snapshot`."""
+        for voter_id in range(FIRST_VOTER_ID, FIRST_VOTER_ID + self.voters):
+            yield voter_id, 0
+        for born in range(1, snapshot + 1):
+            first = FIRST_VOTER_ID + self.voters + (born - 1) * self.new_per_snapshot
+            for voter_id in range(first, first + self.new_per_snapshot):
+                yield voter_id, born
+
+    def write_snapshot(self, snapshot, out_dir, encoding):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        files, writers = [], {}
+        for district in range(1, 9):
+            for kind, columns in (("Voter", VOTER_COLUMNS), ("Election", ELECTION_COLUMNS)):
+                f = open(out_dir / f"{kind}{district:02d}.txt", "w", newline="", encoding=encoding)
+                files.append(f)
+                writers[kind, f"{district:02d}"] = csv.writer(f, quoting=csv.QUOTE_ALL)
+                writers[kind, f"{district:02d}"].writerow(columns)
+
+        labels = [(mdy(day), f"{mdy(day)} - {description}") for day, description, _ in self.elections]
+        voters = votes_written = 0
+        for voter_id, born in self.voter_ids(snapshot):
+            record = self.voter_at(voter_id, snapshot, born)
+            if record is None:
+                continue
+            voter, votes = record
+            district = voter["Congressional"]
+            writers["Voter", district].writerow([voter[name] for name in VOTER_COLUMNS])
+            history = writers["Election", district]
+            for index, method in votes:
+                history.writerow([voter["VoterId"], *labels[index], method])
+            voters += 1
+            votes_written += len(votes)
+        for f in files:
+            f.close()
+        return voters, votes_written
+
+# -------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic MN SOS voter snapshots.")
+    parser.add_argument("out_dir", help="Directory for snap01, snap02, ...")
+    parser.add_argument("--voters", type=int, default=100000, help="Voters on the first snapshot (default: 100000)")
+    parser.add_argument("--snapshots", type=int, default=2, help="Monthly snapshots to write (default: 2)")
+    parser.add_argument("--start", default="2025-10", metavar="YYYY-MM", help="Month of the first snapshot (default: 2025-10)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--removed", type=float, default=0.006, help="Share of voters removed per month (default: 0.006)")
+    parser.add_argument("--added", type=float, default=0.008, help="New registrations per month, as a share (default: 0.008)")
+    parser.add_argument("--moved", type=float, default=0.01, help="Share of voters who move per month (default: 0.01)")
+    parser.add_argument("--renamed", type=float, default=0.001, help="Share of last-name changes per month (default: 0.001)")
+    parser.add_argument("--corrected", type=float, default=0.0005,
+                        help="Share of voters with a history record corrected per month (default: 0.0005)")
+    parser.add_argument("--encoding", default="utf-8", help="File encoding, e.g. latin-1 (default: utf-8)")
+    args = parser.parse_args()
+
+    try:
+        start = datetime.datetime.strptime(args.start, "%Y-%m").date()
+    except ValueError:
+        print(f"Error: --start must look like 2025-10, got {args.start}")
+        sys.exit(1)
+    churn = {name: getattr(args, name) for name in ("removed", "added", "moved", "renamed", "corrected")}
+    generator = Generator(args.seed, args.voters, args.snapshots, start, churn)
+
+    for snapshot in range(args.snapshots):
+        out_dir = Path(args.out_dir) / f"snap{snapshot + 1:02d}"
+        started = time.perf_counter()
+        voters, votes = generator.write_snapshot(snapshot, out_dir, args.encoding)
+        print(f"→ {out_dir} ({generator.end_dates[snapshot]:%Y-%m}): {voters:,} voters, "
+              f"{votes:,} election records in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
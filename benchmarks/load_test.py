@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Load test for voter lookups under concurrent threads.
+
+In-process (default), it runs voter_election_report from N threads, opening
+the database on every call (as the app used to), through a shared
+ReadOnlyConnectionPool, and through the pool behind a LookupCache smaller than
+the set of lookups. It prints throughput and p50/p99 latency for each thread
+count.
+
+With --url it POSTs the web form to a running server instead, e.g.
+
+    gunicorn -w 4 --threads 8 app:app                # or: python3 app.py
+    python3 benchmarks/load_test.py --db-name voters.db --url http://127.0.0.1:8000/
+
+Lookups are real (first, last, zip) triples sampled from --db-name.
+
+Usage:
+    python3 benchmarks/load_test.py [--db-name voters.db] [--threads 1,4,8,16] [--duration 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connection_pool import ReadOnlyConnectionPool  # noqa: E402
+from lookup_cache import LookupCache, lookup_key  # noqa: E402
+from voter_election_report import voter_election_report  # noqa: E402
+
+def sample_lookups(db_name, samples, seed):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    low, high = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM voters").fetchone()
+    lookups = []
+    for _ in range(samples if low is not None else 0):
+        row = conn.execute("SELECT FirstName, LastName, ZipCode FROM voters WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+                           (rnd.randint(low, high),)).fetchone()
+        if row and all(row):
+            lookups.append(row)
+    conn.close()
+    return lookups
+
+def http_lookup(url):
+    def lookup(first_name, last_name, zip_code):
+        data = urllib.parse.urlencode({"first_name": first_name, "last_name": last_name,
+                                       "zip_code": zip_code}).encode()
+        with urllib.request.urlopen(url, data=data, timeout=30) as response:
+            response.read()
+    return lookup
+
+def run_load(lookup, lookups, threads, duration):
+    """Call lookup(first, last, zip) from `threads` threads for `duration` seconds."""
+    latencies = [[] for _ in range(threads)]
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rnd = random.Random(index)
+        mine = latencies[index]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                lookup(*rnd.choice(lookups))
+            except Exception as e:
+                errors.append(e)
+                continue
+            mine.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return sorted(x for mine in latencies for x in mine), errors, elapsed
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(label, threads, latencies, errors, elapsed):
+    if not latencies:
+        print(f"   {label:<8} {threads:>3} threads: no successful lookups ({len(errors)} errors, e.g. {errors[:1]})")
+        return
+    print(f"   {label:<8} {threads:>3} threads: {len(latencies) / elapsed:9,.0f} lookups/sec   "
+          f"p50 {percentile(latencies, 50) * 1000:7.2f} ms   p99 {percentile(latencies, 99) * 1000:7.2f} ms"
+          + (f"   {len(errors)} errors" if errors else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for voter lookups.")
+    parser.add_argument("--db-name", default="voters.db", help="Database to sample lookups from (default: voters.db)")
+    parser.add_argument("--threads", default="1,4,8,16", help="Comma-separated thread counts (default: 1,4,8,16)")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per run (default: 5)")
+    parser.add_argument("--samples", type=int, default=2000, help="Distinct lookups to sample (default: 2000)")
+    parser.add_argument("--pool-size", type=int, default=8, help="Connections in the pool (default: 8)")
+    parser.add_argument("--immutable", action="store_true", help="Open pooled connections with immutable=1")
+    parser.add_argument("--cache-size", type=int, default=1000,
+                        help="Entries in the LookupCache used by the 'cached' runs (default: 1000)")
+    parser.add_argument("--url", help="POST to this running app instead of calling the report in-process")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    lookups = sample_lookups(args.db_name, args.samples, args.seed)
+    if not lookups:
+        print("No voters to sample.")
+        sys.exit(1)
+    thread_counts = [int(t) for t in args.threads.split(",")]
+
+    if args.url:
+        print(f"HTTP POST {args.url}, {len(lookups):,} distinct lookups, {args.duration:g}s per run")
+        for threads in thread_counts:
+            report("http", threads, *run_load(http_lookup(args.url), lookups, threads, args.duration))
+        return
+
+    pool = ReadOnlyConnectionPool(args.db_name, size=args.pool_size, immutable=args.immutable)
+    cache = LookupCache(maxsize=args.cache_size)
+
+    def cached(first, last, zip_code):
+        key = lookup_key(args.db_name, first, last, zip_code)
+        if cache.get(key) is None:
+            cache.put(key, voter_election_report(pool, first, last, zip_code))
+
+    modes = [
+        ("connect", lambda first, last, zip_code: voter_election_report(args.db_name, first, last, zip_code)),
+        ("pool", lambda first, last, zip_code: voter_election_report(pool, first, last, zip_code)),
+        ("cached", cached),
+    ]
+    print(f"In-process, {len(lookups):,} distinct lookups, pool of {args.pool_size}"
+          f"{' (immutable)' if args.immutable else ''}, {args.duration:g}s per run")
+    for threads in thread_counts:
+        for label, lookup in modes:
+            report(label, threads, *run_load(lookup, lookups, threads, args.duration))
+    pool.close()
+    print("   cache:", ", ".join(f"{k} {v:,}" if isinstance(v, int) else f"{k} {v}" for k, v in cache.stats().items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark on synthetic data: generates two monthly snapshots (see
+generate_synthetic_data.py), then times
+
+  import          full import of each snapshot (import_to_sqlite3.py)
+  delta import    the second snapshot applied to a copy of the first (--delta)
+  lookup          voter_election_report p50/p99 on warm pooled connections,
+                  for names on the roll and a share of misses
+  fuzzy lookup    the same with fuzzy=True and misspelt names
+  diff            compare_voters_history.py new.db old.db
+
+Each run appends one JSON line (metrics, scale, seed, git commit, Python and
+SQLite versions) to --results and is printed next to the previous run with the
+same --voters, --seed and --workers, so a change can be checked against the
+last baseline.
+
+The snapshots are kept in --work-dir and reused while the scale and seed
+don't change; the imports and the diff run in subprocesses like the real tools.
+
+Usage:
+    python3 benchmarks/run_benchmarks.py [--voters 100000] [--seed 1] [--work-dir bench_data] [--label "after fix"]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from connection_pool import ReadOnlyConnectionPool  # noqa: E402
+from voter_election_report import voter_election_report  # noqa: E402
+
+MISS_SHARE = 0.1   # share of lookups for names that are not on the roll
+
+# (metric, unit, lower is better)
+METRICS = [
+    ("generate_s", "s", True),
+    ("import_old_s", "s", True),
+    ("import_new_s", "s", True),
+    ("import_rows_per_s", "rows/s", False),
+    ("delta_import_s", "s", True),
+    ("lookup_p50_ms", "ms", True),
+    ("lookup_p99_ms", "ms", True),
+    ("fuzzy_p50_ms", "ms", True),
+    ("fuzzy_p99_ms", "ms", True),
+    ("diff_s", "s", True),
+    ("new_db_mb", "MB", True),
+]
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(command, cwd, log):
+    """Run a tool, its output going to `log`; returns the wall time."""
+    started = time.perf_counter()
+    with open(log, "w") as out:
+        result = subprocess.run([sys.executable, *map(str, command)], cwd=cwd, stdout=out, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        print(f"Error: {' '.join(map(str, command))} failed; see {log}")
+        sys.exit(1)
+    return time.perf_counter() - started
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def snapshot_rows(snap_dir):
+    """Data rows in a snapshot's files (each has a header line)."""
+    rows = 0
+    for path in snap_dir.glob("*.txt"):
+        with open(path, "rb") as f:
+            rows += sum(1 for _ in f) - 1
+    return rows
+
+# -------------------------------------------------
+def generate(args, data_dir, metrics):
+    manifest = data_dir / "manifest.json"
+    wanted = {"voters": args.voters, "seed": args.seed}
+    if manifest.exists() and json.loads(manifest.read_text()) == wanted:
+        print(f"Reusing the snapshots in {data_dir}")
+        return
+    shutil.rmtree(data_dir, ignore_errors=True)
+    data_dir.mkdir(parents=True)
+    print(f"Generating two snapshots of {args.voters:,} voters...")
+    metrics["generate_s"] = run([ROOT / "benchmarks" / "generate_synthetic_data.py", data_dir,
+                                 "--voters", args.voters, "--seed", args.seed],
+                                data_dir, data_dir / "generate.log")
+    manifest.write_text(json.dumps(wanted))
+
+def import_snapshots(args, work_dir, data_dir, metrics):
+    importer = ROOT / "import_to_sqlite3.py"
+    old_db, new_db, delta_db = work_dir / "old.db", work_dir / "new.db", work_dir / "delta.db"
+    for db_name in (old_db, new_db, delta_db):
+        db_name.unlink(missing_ok=True)
+
+    for name, db_name, snap in (("old", old_db, "snap01"), ("new", new_db, "snap02")):
+        print(f"Importing {snap}...")
+        metrics[f"import_{name}_s"] = run([importer, "--db-name", db_name, "--workers", args.workers],
+                                          data_dir / snap, work_dir / f"import_{name}.log")
+    metrics["import_rows_per_s"] = round(snapshot_rows(data_dir / "snap02") / metrics["import_new_s"])
+    metrics["new_db_mb"] = round(new_db.stat().st_size / 2 ** 20, 1)
+
+    print("Applying snap02 to a copy of old.db with --delta...")
+    shutil.copyfile(old_db, delta_db)
+    metrics["delta_import_s"] = run([importer, "--db-name", delta_db, "--delta", "--workers", args.workers],
+                                    data_dir / "snap02", work_dir / "import_delta.log")
+    delta_db.unlink()
+    return new_db, old_db
+
+def sample_lookups(db_name, count, rnd):
+    """(first, last, zip) triples for voters on the roll, and a share that match nobody."""
+    conn = sqlite3.connect(db_name)
+    max_id = conn.execute("SELECT MAX(VoterId) FROM voters").fetchone()[0]
+    min_id = conn.execute("SELECT MIN(VoterId) FROM voters").fetchone()[0]
+    lookups = []
+    while len(lookups) < count:
+        row = conn.execute("SELECT FirstName, LastName, ZipCode FROM voters WHERE VoterId >= ? LIMIT 1",
+                           (rnd.randint(min_id, max_id),)).fetchone()
+        if rnd.random() < MISS_SHARE:
+            row = (row[0], row[1] + "X", row[2])
+        lookups.append(row)
+    conn.close()
+    return lookups
+
+def misspelt(name, rnd):
+    """`name` with one letter dropped or two swapped, the way names get typed."""
+    if len(name) < 4:
+        return name
+    i = rnd.randrange(1, len(name) - 1)
+    if rnd.random() < 0.5:
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+def time_lookups(pool, lookups, fuzzy=False):
+    latencies = []
+    for first_name, last_name, zip_code in lookups:
+        started = time.perf_counter()
+        voter_election_report(pool, first_name, last_name, zip_code, fuzzy=fuzzy)
+        latencies.append(time.perf_counter() - started)
+    return round(percentile(latencies, 50) * 1000, 3), round(percentile(latencies, 99) * 1000, 3)
+
+def measure_lookups(args, new_db, metrics):
+    rnd = random.Random(args.seed)
+    lookups = sample_lookups(new_db, args.lookups, rnd)
+    pool = ReadOnlyConnectionPool(str(new_db), size=1)
+    print(f"Timing {len(lookups):,} lookups...")
+    # One pass to warm the page cache, as a running app would be
+    time_lookups(pool, lookups[:200])
+    metrics["lookup_p50_ms"], metrics["lookup_p99_ms"] = time_lookups(pool, lookups)
+
+    fuzzy = [(misspelt(first, rnd), misspelt(last, rnd), zip_code)
+             for first, last, zip_code in lookups[:args.fuzzy_lookups]]
+    print(f"Timing {len(fuzzy):,} fuzzy lookups...")
+    metrics["fuzzy_p50_ms"], metrics["fuzzy_p99_ms"] = time_lookups(pool, fuzzy, fuzzy=True)
+    pool.close()
+
+def measure_diff(args, work_dir, new_db, old_db, metrics):
+    diff_dir = work_dir / "diff"
+    shutil.rmtree(diff_dir, ignore_errors=True)
+    diff_dir.mkdir()
+    print("Diffing new.db against old.db...")
+    metrics["diff_s"] = run([ROOT / "data_analysis_tools" / "compare_voters_history.py", new_db, old_db,
+                             "--jobs", args.workers], diff_dir, work_dir / "diff.log")
+
+# -------------------------------------------------
+def previous_run(results, record):
+    """The last run in `results` at the same scale, seed and worker count."""
+    if not results.exists():
+        return None
+    previous = None
+    with open(results) as f:
+        for line in f:
+            run_record = json.loads(line)
+            if all(run_record.get(key) == record[key] for key in ("voters", "seed", "workers")):
+                previous = run_record
+    return previous
+
+def print_comparison(record, previous):
+    if previous:
+        print(f"\nCompared with {previous['timestamp']} ({previous.get('commit') or 'no commit'}"
+              + (f", {previous['label']}" if previous.get("label") else "") + "):")
+    print(f"{'metric':<20} {'previous':>12} {'current':>12} {'change':>9}")
+    for name, unit, lower_is_better in METRICS:
+        current = record["metrics"].get(name)
+        if current is None:
+            continue
+        before = (previous or {}).get("metrics", {}).get(name)
+        change = ""
+        if before:
+            delta = (current - before) / before * 100
+            # Flag moves of more than 10% either way
+            worse = delta > 10 if lower_is_better else delta < -10
+            better = delta < -10 if lower_is_better else delta > 10
+            change = f"{delta:+.0f}%" + (" !" if worse else " ✓" if better else "")
+        before_text = "-" if before is None else f"{before:,}"
+        print(f"{name:<20} {before_text:>12} {current:>12,} {change:>9}  {unit}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time import, lookups and diff on synthetic snapshots.")
+    parser.add_argument("--voters", type=int, default=100000, help="Voters per snapshot (default: 100000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--work-dir", default="bench_data", help="Snapshots, databases and logs (default: bench_data)")
+    parser.add_argument("--results", help="JSON lines file the runs are appended to (default: <work-dir>/results.jsonl)")
+    parser.add_argument("--label", help="Note stored with the run, e.g. the change being measured")
+    parser.add_argument("--workers", type=int, default=1, help="--workers for the importer, --jobs for the diff (default: 1)")
+    parser.add_argument("--lookups", type=int, default=2000, help="Exact lookups to time (default: 2000)")
+    parser.add_argument("--fuzzy-lookups", type=int, default=300, help="Fuzzy lookups to time (default: 300)")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work_dir).resolve()
+    data_dir = work_dir / f"data_{args.voters}_{args.seed}"
+    results = Path(args.results) if args.results else work_dir / "results.jsonl"
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    metrics = {}
+    generate(args, data_dir, metrics)
+    new_db, old_db = import_snapshots(args, work_dir, data_dir, metrics)
+    measure_lookups(args, new_db, metrics)
+    measure_diff(args, work_dir, new_db, old_db, metrics)
+    metrics = {name: round(value, 2) if isinstance(value, float) and not name.endswith("_ms") else value
+               for name, value in metrics.items()}
+
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "voters": args.voters,
+        "seed": args.seed,
+        "workers": args.workers,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "metrics": metrics,
+    }
+    previous = previous_run(results, record)
+    with open(results, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    print_comparison(record, previous)
+    print(f"→ {results}")
+
+if __name__ == "__main__":
+    main()
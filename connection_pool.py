@@ -0,0 +1,125 @@
+"""
+Read-only SQLite connections for the lookup side of the project (app.py and
+voter_election_report).
+
+Opening a connection per request pays for the open, the schema parse and a
+cold page cache every time. ReadOnlyConnectionPool keeps a bounded set of
+tuned read-only connections and hands them out to threads, so the page cache,
+the mmap and each connection's prepared statement cache stay warm between
+requests.
+
+    pool = ReadOnlyConnectionPool("voters.db")
+    report = voter_election_report(pool, first_name, last_name, zip_code)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+POOL_SIZE = 8
+CACHE_MB = 64
+MMAP_MB = 256
+CACHED_STATEMENTS = 128
+CHECKOUT_TIMEOUT = 30
+
+def read_only_uri(db_name, immutable=False):
+    """file: URI that opens `db_name` read-only (and, optionally, as immutable)."""
+    uri = Path(os.path.abspath(db_name)).as_uri() + "?mode=ro"
+    if immutable:
+        # SQLite skips locking and change detection entirely; only safe while
+        # nothing writes the file (i.e. between imports).
+        uri += "&immutable=1"
+    return uri
+
+def connect_read_only(db_name, immutable=False, cache_mb=CACHE_MB, mmap_mb=MMAP_MB,
+                      cached_statements=CACHED_STATEMENTS):
+    """Open one tuned read-only connection that may be used from any thread (one at a time)."""
+    conn = sqlite3.connect(read_only_uri(db_name, immutable), uri=True, check_same_thread=False,
+                           cached_statements=cached_statements)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA cache_size = -{cache_mb * 1024}")
+    conn.execute(f"PRAGMA mmap_size = {mmap_mb * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+class ReadOnlyConnectionPool:
+    """
+    Bounded pool of read-only connections to one database. Connections are opened
+    lazily, up to `size`; a thread that finds none idle waits up to `timeout`
+    seconds for one to be returned. The most recently returned connection is
+    handed out first, so a lightly loaded server keeps reusing its warmest one.
+    """
+
+    def __init__(self, db_name="voters.db", size=POOL_SIZE, immutable=False, cache_mb=CACHE_MB,
+                 mmap_mb=MMAP_MB, cached_statements=CACHED_STATEMENTS, timeout=CHECKOUT_TIMEOUT):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.connect_args = dict(immutable=immutable, cache_mb=cache_mb, mmap_mb=mmap_mb,
+                                 cached_statements=cached_statements)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                try:
+                    return connect_read_only(self.db_name, **self.connect_args)
+                except Exception:
+                    self.opened -= 1
+                    raise
+        try:
+            return self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection became free within {self.timeout}s") from None
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self.idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close the idle connections; connections still checked out are closed by their users' GC."""
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.opened -= 1
+
+@contextmanager
+def connection(source):
+    """
+    Yield a connection for `source`, which may be a database filename, an open
+    sqlite3.Connection (used as-is and left open) or a ReadOnlyConnectionPool.
+    """
+    if isinstance(source, ReadOnlyConnectionPool):
+        with source.connection() as conn:
+            yield conn
+    elif isinstance(source, sqlite3.Connection):
+        yield source
+    else:
+        conn = sqlite3.connect(source)
+        try:
+            yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+columnar_diff.py
+The compare_voters_history.py diff computed from two export_columnar.py exports
+instead of two attached SQLite databases (compare_voters_history.py --columnar).
+
+Each county reads only its own CountyCode=XX partitions, and the comparison is
+done with vectorized pyarrow operations (is_in, hash anti-join, group_by)
+rather than per-voter SQL lookups. The result is the same as the SQL diff
+tables in compare_voters_history.py, row for row and in the same order.
+
+Requires pyarrow (pip install pyarrow).
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from export_columnar import dataset
+
+HISTORY_COLUMNS = ["VoterId", "ElectionDate", "ElectionDescription", "VotingMethod"]
+NAME_COLUMNS = ["FirstName", "MiddleName", "LastName"]
+ADDRESS_COLUMNS = ["HouseNumber", "StreetName", "UnitType", "UnitNumber", "City", "ZipCode"]
+ELECTION_COLUMNS = ["ElectionDate", "ElectionDescription", "VotingMethod"]
+
+# diff rows in the CSV column order, after CountyCode and CountyName
+DIFF_COLUMNS = ["VoterId", "FullName", "diff_type",
+                "ElectionDate_new", "ElectionDescription_new", "VotingMethod_new",
+                "ElectionDate_old", "ElectionDescription_old", "VotingMethod_old",
+                "Address_new", "Address_old"]
+
+def open_exports(new_dir, old_dir):
+    """{'new'|'old': {'voters'|'election_history': dataset}} for two export directories."""
+    return {side: {table: dataset(out_dir, table) for table in ("voters", "election_history")}
+            for side, out_dir in (("new", new_dir), ("old", old_dir))}
+
+def decoded(table):
+    """Dictionary columns as plain strings, so they can be joined across files."""
+    return table.cast(pa.schema([
+        pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f for f in table.schema
+    ]))
+
+def read_county(data, table, code, columns):
+    return decoded(data[table].to_table(columns=columns, filter=ds.field("CountyCode") == code))
+
+def full_name(t, suffix="", separator=" "):
+    """FirstName || ' ' || COALESCE(MiddleName, '') || ' ' || LastName (NULL without a first or last name)."""
+    return pc.binary_join_element_wise(t["FirstName" + suffix], pc.fill_null(t["MiddleName" + suffix], ""),
+                                       t["LastName" + suffix], separator)
+
+def address(t, suffix):
+    """compare_voters_history.ADDRESS_SQL for the columns named <field><suffix>."""
+    def spaced(name):
+        value = pc.fill_null(t[name + suffix], "")
+        return pc.if_else(pc.equal(value, ""), "", pc.binary_join_element_wise(" ", value, ""))
+
+    street = pc.binary_join_element_wise(pc.fill_null(t["HouseNumber" + suffix], ""), spaced("StreetName"),
+                                         spaced("UnitType"), spaced("UnitNumber"), "")
+    return pc.binary_join_element_wise(pc.utf8_trim(street, characters=" "), pc.fill_null(t["City" + suffix], ""),
+                                       pc.fill_null(t["ZipCode" + suffix], ""), ", ")
+
+def new_full_names(data, voter_ids):
+    """
+    FullName in the new export of each of `voter_ids`, whatever their county
+    there, and a mask of which ones are in it at all. The names of all new
+    voters are loaded once, sorted by VoterId, and kept in `data`.
+    """
+    if "names" not in data:
+        voters = decoded(data["new"]["voters"].to_table(columns=["VoterId"] + NAME_COLUMNS))
+        voters = voters.take(pc.sort_indices(voters["VoterId"]))
+        data["names"] = (voters["VoterId"].to_numpy(), full_name(voters))
+    sorted_ids, full_names = data["names"]
+    wanted = voter_ids.to_numpy()
+    if not len(sorted_ids):
+        return pa.nulls(len(wanted), pa.string()), np.zeros(len(wanted), dtype=bool)
+    positions = np.searchsorted(sorted_ids, wanted).clip(max=len(sorted_ids) - 1)
+    return full_names.take(positions), sorted_ids[positions] == wanted
+
+def diff_rows(voter_ids, diff_type, new=None, old=None, **columns):
+    """Diff rows with the election columns of `new` / `old` and the given columns (the others NULL)."""
+    n = len(voter_ids)
+    values = {"VoterId": voter_ids, "diff_type": pa.array([diff_type] * n, pa.string())}
+    for side, source in (("new", new), ("old", old)):
+        for name in ELECTION_COLUMNS:
+            values[f"{name}_{side}"] = source[name] if source is not None else pa.nulls(n, pa.string())
+    for name in DIFF_COLUMNS:
+        values.setdefault(name, columns.get(name, pa.nulls(n, pa.string())))
+    return pa.table(values).select(DIFF_COLUMNS)
+
+def county_diff(data, code):
+    """
+    Compare one county. Returns a dict with the county totals, removed and
+    changed counts, the last 5 elections (DataFrame), and the history and
+    MOVED rows (DIFF_COLUMNS, in CSV order).
+    """
+    new_voters = read_county(data["new"], "voters", code, ["VoterId"] + NAME_COLUMNS + ADDRESS_COLUMNS)
+    old_voters = read_county(data["old"], "voters", code, ["VoterId"] + NAME_COLUMNS + ADDRESS_COLUMNS)
+    new_history = read_county(data["new"], "election_history", code, HISTORY_COLUMNS)
+    old_history = read_county(data["old"], "election_history", code, HISTORY_COLUMNS)
+
+    # Voters in both exports, in this county in both
+    common_ids = pc.filter(new_voters["VoterId"], pc.is_in(new_voters["VoterId"], value_set=old_voters["VoterId"]))
+
+    # Common voters without history in the new export: one MISSING_IN_NEW row
+    missing = diff_rows(pc.filter(common_ids, pc.invert(pc.is_in(common_ids, value_set=new_history["VoterId"]))),
+                        "MISSING_IN_NEW")
+
+    # New records of common voters without an identical old record
+    common_new = new_history.filter(pc.is_in(new_history["VoterId"], value_set=common_ids))
+    added = common_new.join(old_history, keys=HISTORY_COLUMNS, join_type="left anti")
+    added = diff_rows(added["VoterId"], "NEW_ELECTION", new=added)
+
+    # Records of old voters of this county that are not common voters, in export order
+    old_only = old_history.filter(pc.invert(pc.is_in(old_history["VoterId"], value_set=common_ids)))
+    removed_count = pc.count_distinct(old_only["VoterId"]).as_py()
+    old_only = diff_rows(old_only["VoterId"], "MISSING_IN_NEW", old=old_only)
+
+    # Full names from the new export. Old-only voters are in another county
+    # there, or gone, which drops their rows as the SQL join does.
+    names = pa.table({"VoterId": new_voters["VoterId"], "FullName": full_name(new_voters)})
+    common_rows = pa.concat_tables([missing, added]).drop_columns(["FullName"])
+    common_rows = common_rows.join(names, keys="VoterId", join_type="inner").select(DIFF_COLUMNS)
+    if old_only.num_rows:
+        old_names, found = new_full_names(data, old_only["VoterId"])
+        old_only = old_only.set_column(DIFF_COLUMNS.index("FullName"), "FullName", old_names).filter(found)
+
+    # seq only breaks ties between identical records, as rowid does in SQL
+    history = pa.concat_tables([common_rows, old_only])
+    history = history.append_column("seq", pa.array(range(history.num_rows), pa.int64()))
+    history = history.append_column("date_key", pc.fill_null(history["ElectionDate_new"], "9999-99-99"))
+    # NULLs sort first, as in SQLite
+    order = pc.sort_indices(history, sort_keys=[
+        ("VoterId", "ascending", "at_start"), ("date_key", "ascending", "at_start"),
+        ("ElectionDate_old", "ascending", "at_start"),
+        ("ElectionDescription_new", "ascending", "at_start"), ("VotingMethod_new", "ascending", "at_start"),
+        ("ElectionDescription_old", "ascending", "at_start"), ("VotingMethod_old", "ascending", "at_start"),
+        ("seq", "ascending", "at_start")])
+    history = history.take(order).select(DIFF_COLUMNS)
+
+    # Common voters with the same name and a changed address (SQL NULL semantics)
+    pairs = new_voters.join(old_voters, keys="VoterId", join_type="inner", left_suffix="_n", right_suffix="_o")
+    changed = None
+    for name in ADDRESS_COLUMNS:
+        new_value, old_value = pairs[name + "_n"], pairs[name + "_o"]
+        if name in ("UnitType", "UnitNumber"):
+            new_value, old_value = pc.fill_null(new_value, ""), pc.fill_null(old_value, "")
+        differs = pc.not_equal(new_value, old_value)
+        changed = differs if changed is None else pc.or_kleene(changed, differs)
+    same_name = pc.equal(full_name(pairs, "_n", ""), full_name(pairs, "_o", ""))
+    pairs = pairs.filter(pc.and_kleene(changed, same_name))
+    pairs = pairs.take(pc.sort_indices(pairs["VoterId"]))
+    moved = diff_rows(pairs["VoterId"], "MOVED", FullName=full_name(pairs, "_n"),
+                      Address_new=address(pairs, "_n"), Address_old=address(pairs, "_o"))
+
+    # Turnout per election in the new export; most recent first, same-day by description
+    turnout = new_history.group_by(["ElectionDate", "ElectionDescription"]).aggregate([("VoterId", "count_distinct")])
+    turnout = turnout.rename_columns(["ElectionDate", "ElectionDescription", "VotersWhoVoted"])
+    last_5 = turnout.take(pc.sort_indices(turnout, sort_keys=[("ElectionDate", "descending"),
+                                                              ("ElectionDescription", "ascending")])[:5])
+
+    return {
+        "total_new": new_voters.num_rows,
+        "total_old": old_voters.num_rows,
+        "removed": removed_count,
+        # matched records are identical, so as in the SQL diff nothing is DIFFERENT
+        "changed": 0,
+        "last_5": last_5.to_pandas(),
+        "history": history,
+        "moved": moved,
+    }
@@ -7,14 +7,27 @@ Tracks:
   • histories changed
   • voters who moved
 Usage:
-    python3 compare_voters_history.py ems251109.db ems251005.db
+    python3 compare_voters_history.py ems251109.db ems251005.db [--jobs 4] [--gzip]
+    python3 compare_voters_history.py --columnar ems251109_parquet ems251005_parquet
+    python3 compare_voters_history.py ems251109.db ems251005.db --trace [--trace-json trace.json] [--profile diff.prof]
 """
 
+import argparse
+import csv
+import gzip
+import os
 import sqlite3
 import pandas as pd
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import history_digest  # noqa: E402
+import instrumentation  # noqa: E402
+import turnout  # noqa: E402
+from connection_pool import read_only_uri  # noqa: E402
+
 # -------------------------------------------------
 COUNTY_LIST = [
     ('01', 'AITKIN'), ('02', 'ANOKA'), ('03', 'BECKER'), ('04', 'BELTRAMI'),
@@ -122,16 +135,446 @@ def write_county_md(code, county_name, stats, total_new, last_5_elections):
         f.write("  → Counts as 1 \"moved\"\n")
         f.write("  ```\n")
 
-    print(f"  → {md_path}")
+    return md_path
 
 # -------------------------------------------------
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python3 compare_voters_history.py <new_db> <old_db>")
-        sys.exit(1)
+# Diff CSVs are streamed from the cursor this many rows at a time, so memory
+# doesn't grow with the size of the county.
+CSV_BATCH_ROWS = 10000
+
+CSV_COLUMNS = ["CountyCode", "CountyName", "VoterId", "FullName", "diff_type",
+               "ElectionDate_new", "ElectionDescription_new", "VotingMethod_new",
+               "ElectionDate_old", "ElectionDescription_old", "VotingMethod_old",
+               "Address_new", "Address_old"]
+
+def query_batches(conn, sql, params, batch_rows=CSV_BATCH_ROWS):
+    """The rows of a query, `batch_rows` at a time."""
+    cur = conn.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield rows
+
+def table_batches(table, prefix=(), batch_rows=CSV_BATCH_ROWS):
+    """The rows of a pyarrow table, `batch_rows` at a time, after the constant `prefix` columns."""
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        columns = [column.to_pylist() for column in batch.columns]
+        yield [prefix + row for row in zip(*columns)]
+
+def write_csv(path, sources, compress=False, header=CSV_COLUMNS):
+    """
+    Write `header` and the row batches of each source to one CSV
+    (gzip-compressed if `compress`). The format is the same as
+    DataFrame.to_csv(index=False). Returns the row count of each source.
+    """
+    counts = []
+    with (gzip.open(path, 'wt', newline='', compresslevel=6) if compress else open(path, 'w', newline='')) as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(header)
+        for batches in sources:
+            count = 0
+            for rows in batches:
+                writer.writerows(rows)
+                count += len(rows)
+            counts.append(count)
+    return counts
+
+# -------------------------------------------------
+# With --trace, the SQL timings of this process by section (see instrumentation.py)
+_trace = None
+
+def section(name):
+    return _trace.section(name) if _trace else instrumentation.NOT_TRACED
+
+def open_databases(new_db, old_db):
+    """Read-only connection to the new DB with the old one attached as db_old."""
+    conn = sqlite3.connect(read_only_uri(new_db), uri=True)
+    conn.execute("ATTACH DATABASE ? AS db_old", (read_only_uri(old_db),))
+    if _trace:
+        _trace.attach(conn)
+    return conn
+
+def close_databases(conn):
+    """Close an open_databases() connection; its last statement is counted in its own section."""
+    if _trace:
+        _trace.detach(conn)
+    conn.close()
+
+# -------------------------------------------------
+# "123 MAIN ST APT 4, AITKIN, 56431" from a voters row aliased {t}; empty parts are left out
+ADDRESS_SQL = ("TRIM(COALESCE({t}.HouseNumber, '') || COALESCE(' ' || NULLIF({t}.StreetName, ''), '') "
+               "|| COALESCE(' ' || NULLIF({t}.UnitType, ''), '') || COALESCE(' ' || NULLIF({t}.UnitNumber, ''), '')) "
+               "|| ', ' || COALESCE({t}.City, '') || ', ' || COALESCE({t}.ZipCode, '')")
+
+# Diff engine: the old/new comparison is computed once for a set of counties
+# (the whole state, or one --jobs shard) into TEMP tables keyed by CountyCode,
+# and every county's CSV, MD and stats are read back from them.
+#
+# {codes} is a placeholder list for the counties; each statement binds the
+# county codes once. {new_digests} / {old_digests} are the per-voter history
+# digest tables (see history_digest.py): voters whose digest is the same in both
+# DBs have identical histories and skip the record-level comparison.
+DIFF_TABLES_SQL = [
+    "DROP TABLE IF EXISTS temp.common_voters",
+    "DROP TABLE IF EXISTS temp.history_diff",
+    "DROP TABLE IF EXISTS temp.election_turnout",
+    "DROP TABLE IF EXISTS temp.moved_voters",
+
+    # Voters in both DBs, in the same county in both
+    """
+    CREATE TEMP TABLE common_voters AS
+    SELECT n.VoterId AS VoterId, n.CountyCode AS CountyCode,
+           d_new.Digest AS NewDigest, d_old.Digest AS OldDigest
+    FROM voters n
+    JOIN db_old.voters o ON o.VoterId = n.VoterId
+    LEFT JOIN {new_digests} d_new ON d_new.VoterId = n.VoterId
+    LEFT JOIN {old_digests} d_old ON d_old.VoterId = n.VoterId
+    WHERE n.CountyCode IN ({codes}) AND o.CountyCode = n.CountyCode
+    ORDER BY n.VoterId
+    """,
+    "CREATE UNIQUE INDEX temp.idx_common_voters ON common_voters(VoterId)",
+
+    # Every non-matching history row, classified as in the CSV. OldOnly marks the
+    # rows of old-DB voters that are not common voters of their old county.
+    """
+    CREATE TEMP TABLE history_diff (
+        CountyCode TEXT, VoterId INTEGER, OldOnly INTEGER, diff_type TEXT,
+        ElectionDate_new TEXT, ElectionDescription_new TEXT, VotingMethod_new TEXT,
+        ElectionDate_old TEXT, ElectionDescription_old TEXT, VotingMethod_old TEXT
+    )
+    """,
+    # Common voters without history in the new DB get a single row
+    """
+    INSERT INTO history_diff
+    SELECT CountyCode, VoterId, 0, 'MISSING_IN_NEW', NULL, NULL, NULL, NULL, NULL, NULL
+    FROM common_voters
+    WHERE NewDigest IS NULL
+    """,
+    # New records without an identical old record, looked up only for voters
+    # whose digest changed; CROSS JOIN keeps common_voters as the outer loop so
+    # that is one primary key probe per changed voter. An old record matched on
+    # all three columns can't differ, so these are all NEW_ELECTION rows.
+    # {new_history} / {old_history} are the election_history views, or indexed
+    # TEMP copies for databases with an unindexed election_history table.
+    """
+    INSERT INTO history_diff
+    SELECT c.CountyCode, c.VoterId, 0, 'NEW_ELECTION',
+           h_new.ElectionDate, h_new.ElectionDescription, h_new.VotingMethod,
+           NULL, NULL, NULL
+    FROM common_voters c
+    CROSS JOIN {new_history} h_new ON h_new.VoterId = c.VoterId
+    WHERE c.NewDigest IS NOT c.OldDigest
+      AND NOT EXISTS (
+          SELECT 1 FROM {old_history} h_old
+          WHERE h_old.VoterId = c.VoterId
+            AND h_old.ElectionDate = h_new.ElectionDate
+            AND h_old.ElectionDescription = h_new.ElectionDescription
+            AND h_old.VotingMethod = h_new.VotingMethod
+      )
+    """,
+    """
+    INSERT INTO history_diff
+    SELECT v.CountyCode, o.VoterId, 1, 'MISSING_IN_NEW',
+           NULL, NULL, NULL,
+           o.ElectionDate, o.ElectionDescription, o.VotingMethod
+    FROM db_old.voters v
+    JOIN db_old.election_history o ON o.VoterId = v.VoterId
+    WHERE v.CountyCode IN ({codes})
+      AND NOT EXISTS (SELECT 1 FROM common_voters c WHERE c.VoterId = v.VoterId)
+    """,
+    "CREATE INDEX temp.idx_history_diff_county ON history_diff(CountyCode, VoterId)",
+
+    # Common voters with the same name and a changed address, with both addresses
+    f"""
+    CREATE TEMP TABLE moved_voters AS
+    SELECT n.CountyCode AS CountyCode,
+           n.VoterId AS VoterId,
+           n.FirstName || ' ' || COALESCE(n.MiddleName, '') || ' ' || n.LastName AS FullName,
+           {ADDRESS_SQL.format(t='n')} AS Address_new,
+           {ADDRESS_SQL.format(t='o')} AS Address_old
+    FROM voters n
+    JOIN db_old.voters o ON n.VoterId = o.VoterId
+    WHERE n.CountyCode IN ({{codes}}) AND o.CountyCode = n.CountyCode
+      AND (n.HouseNumber <> o.HouseNumber
+        OR n.StreetName <> o.StreetName
+        OR COALESCE(n.UnitType,'') <> COALESCE(o.UnitType,'')
+        OR COALESCE(n.UnitNumber,'') <> COALESCE(o.UnitNumber,'')
+        OR n.City <> o.City
+        OR n.ZipCode <> o.ZipCode)
+      AND n.FirstName || COALESCE(n.MiddleName,'') || n.LastName
+        = o.FirstName || COALESCE(o.MiddleName,'') || o.LastName
+    ORDER BY n.VoterId
+    """,
+    "CREATE INDEX temp.idx_moved_voters_county ON moved_voters(CountyCode)",
+]
 
-    new_db = sys.argv[1]
-    old_db = sys.argv[2]
+# Turnout per county and election in the new DB (temp.election_turnout, dropped
+# with the diff tables), from the importer's aggregates (see turnout.py) ...
+STORED_TURNOUT_SQL = f"""
+    CREATE TEMP TABLE election_turnout AS
+    SELECT t.CountyCode AS CountyCode,
+           e.ElectionDate AS ElectionDate,
+           e.ElectionDescription AS ElectionDescription,
+           SUM(t.Voters) AS VotersWhoVoted
+    FROM {turnout.turnout_table('county')} t
+    JOIN elections e ON e.ElectionId = t.ElectionId
+    WHERE t.CountyCode IN ({{codes}})
+    GROUP BY t.CountyCode, t.ElectionId
+    """
+
+# ... or, for databases imported before they existed, from the history itself
+SCANNED_TURNOUT_SQL = """
+    CREATE TEMP TABLE election_turnout AS
+    SELECT v.CountyCode AS CountyCode,
+           h.ElectionDate AS ElectionDate,
+           h.ElectionDescription AS ElectionDescription,
+           COUNT(DISTINCT h.VoterId) AS VotersWhoVoted
+    FROM voters v
+    JOIN election_history h ON h.VoterId = v.VoterId
+    WHERE v.CountyCode IN ({codes})
+    GROUP BY v.CountyCode, h.ElectionDate, h.ElectionDescription
+    """
+
+COUNTY_TOTALS_SQL = "SELECT CountyCode, COUNT(*) FROM {table} WHERE CountyCode IN ({codes}) GROUP BY CountyCode"
+
+# voters removed: old-only voters with history; histories changed: DIFFERENT rows
+COUNTY_STATS_SQL = """
+SELECT CountyCode,
+       COUNT(DISTINCT CASE WHEN OldOnly THEN VoterId END),
+       COUNT(DISTINCT CASE WHEN diff_type = 'DIFFERENT' THEN VoterId END)
+FROM history_diff
+GROUP BY CountyCode
+"""
+
+# Most recent first; same-day elections by description
+LAST_5_SQL = """
+SELECT ElectionDate, ElectionDescription, VotersWhoVoted
+FROM election_turnout
+WHERE CountyCode = ?
+ORDER BY ElectionDate DESC, ElectionDescription
+LIMIT 5
+"""
+
+# Rows for one voter are ordered by the new election (date, description, method),
+# then the old one, so old-only rows come out by date whatever the old DB's row
+# order; rowid only breaks ties between identical records.
+CSV_HISTORY_SQL = """
+SELECT
+    ? AS CountyCode,
+    ? AS CountyName,
+    d.VoterId,
+    v.FirstName || ' ' || COALESCE(v.MiddleName, '') || ' ' || v.LastName AS FullName,
+    d.diff_type,
+    d.ElectionDate_new,
+    d.ElectionDescription_new,
+    d.VotingMethod_new,
+    d.ElectionDate_old,
+    d.ElectionDescription_old,
+    d.VotingMethod_old,
+    NULL AS Address_new,
+    NULL AS Address_old
+FROM history_diff d
+JOIN voters v ON v.VoterId = d.VoterId
+WHERE d.CountyCode = ?
+ORDER BY d.VoterId, COALESCE(d.ElectionDate_new, '9999-99-99'), d.ElectionDate_old,
+         d.ElectionDescription_new, d.VotingMethod_new,
+         d.ElectionDescription_old, d.VotingMethod_old, d.rowid
+"""
+
+# MOVED rows in the same shape as the history rows
+MOVED_SQL = """
+SELECT
+    ? AS CountyCode,
+    ? AS CountyName,
+    VoterId,
+    FullName,
+    'MOVED' AS diff_type,
+    NULL AS ElectionDate_new,
+    NULL AS ElectionDescription_new,
+    NULL AS VotingMethod_new,
+    NULL AS ElectionDate_old,
+    NULL AS ElectionDescription_old,
+    NULL AS VotingMethod_old,
+    Address_new,
+    Address_old
+FROM moved_voters
+WHERE CountyCode = ?
+ORDER BY VoterId
+"""
+
+def digest_table(conn, schema, temp_table, codes):
+    """
+    The stored history digests of `schema`, or (for databases imported before
+    they existed) digests of the given counties' voters built into a TEMP table.
+    """
+    if history_digest.has_history_digests(conn, schema):
+        return f"{schema}.{history_digest.DIGEST_TABLE}"
+    history_digest.build_history_digests(
+        conn, schema, f"temp.{temp_table}",
+        voters_sql=f"SELECT VoterId FROM {schema}.voters WHERE CountyCode IN ({','.join('?' * len(codes))})",
+        params=codes)
+    return f"temp.{temp_table}"
+
+def has_legacy_history(conn, schema):
+    """Whether `schema` still has election_history as a table (imported before the normalized layout)."""
+    return conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'election_history'"
+                        ).fetchone() is not None
+
+def history_table(conn, schema, temp_table, codes):
+    """
+    The election_history of `schema`, or for a legacy table (no index to probe
+    by voter) the given counties' records copied into an indexed TEMP table.
+    """
+    if not has_legacy_history(conn, schema):
+        return f"{schema}.election_history"
+    conn.execute(f"DROP TABLE IF EXISTS temp.{temp_table}")
+    conn.execute(f"""
+        CREATE TEMP TABLE {temp_table} AS
+        SELECT h.VoterId, h.ElectionDate, h.ElectionDescription, h.VotingMethod
+        FROM {schema}.voters v
+        JOIN {schema}.election_history h ON h.VoterId = v.VoterId
+        WHERE v.CountyCode IN ({','.join('?' * len(codes))})
+    """, codes)
+    conn.execute(f"CREATE INDEX temp.idx_{temp_table} ON {temp_table}"
+                 "(VoterId, ElectionDate, ElectionDescription, VotingMethod)")
+    return f"temp.{temp_table}"
+
+def build_diff_tables(conn, codes):
+    """Materialize the comparison for the given county codes into the TEMP tables."""
+    names = {
+        'codes': ','.join('?' * len(codes)),
+        'new_digests': digest_table(conn, "main", "new_history_digests", codes),
+        'old_digests': digest_table(conn, "db_old", "old_history_digests", codes),
+        'new_history': history_table(conn, "main", "new_history", codes),
+        'old_history': history_table(conn, "db_old", "old_history", codes),
+    }
+    for sql in DIFF_TABLES_SQL:
+        conn.execute(sql.format(**names), codes if '{codes}' in sql else ())
+    turnout_sql = STORED_TURNOUT_SQL if turnout.has_turnout(conn) else SCANNED_TURNOUT_SQL
+    conn.execute(turnout_sql.format(codes=names['codes']), codes)
+    conn.execute("CREATE INDEX temp.idx_election_turnout_county ON election_turnout(CountyCode)")
+
+def county_totals(conn, table, codes):
+    sql = COUNTY_TOTALS_SQL.format(table=table, codes=','.join('?' * len(codes)))
+    return dict(conn.execute(sql, codes).fetchall())
+
+def compare_counties(conn, counties, compress=False):
+    """
+    Compare the given (code, name) counties: build the diff tables once, then
+    write each county's files. Returns (summary, log) per county, in order.
+    """
+    codes = [code for code, _ in counties]
+    with section("diff tables"):
+        build_diff_tables(conn, codes)
+    with section("county totals"):
+        totals_new = county_totals(conn, "voters", codes)
+        totals_old = county_totals(conn, "db_old.voters", codes)
+        county_stats = {code: (removed, changed) for code, removed, changed in conn.execute(COUNTY_STATS_SQL)}
+
+    results = []
+    for code, county_name in counties:
+        removed_count, history_changed_count = county_stats.get(code, (0, 0))
+        results.append(compare_county(conn, code, county_name, totals_new.get(code, 0), totals_old.get(code, 0),
+                                      removed_count, history_changed_count, compress))
+    return results
+
+# Each --jobs worker process opens its own connections once and reuses them
+_worker_conn = None
+
+def init_worker(new_db, old_db, trace=False):
+    global _worker_conn, _trace
+    _trace = instrumentation.QueryTrace() if trace else None
+    _worker_conn = open_databases(new_db, old_db)
+
+def compare_counties_in_worker(counties, compress):
+    """compare_counties() for a shard, and the worker's trace of it (or None) for the parent to merge."""
+    results = compare_counties(_worker_conn, counties, compress)
+    return results, (_trace.take() if _trace else None)
+
+def compare_county(conn, code, county_name, total_new, total_old, removed_count, history_changed_count,
+                   compress=False):
+    """
+    Write diff_XX_COUNTY.csv and summary_XX_COUNTY.md for one county from the
+    diff tables. Returns its master summary row and the progress lines to print.
+    """
+    # -------------------------------------------------
+    # 1. Last 5 Elections (by date) — NEW
+    # -------------------------------------------------
+    with section("1. last 5 elections"):
+        last_5_elections = pd.read_sql_query(LAST_5_SQL, conn, params=(code,))
+
+    # -------------------------------------------------
+    # 2. CSV rows (history rows, then MOVED rows with both addresses)
+    # -------------------------------------------------
+    csv_sources = [
+        query_batches(conn, CSV_HISTORY_SQL, (code, county_name, code)),
+        query_batches(conn, MOVED_SQL, (code, county_name, code)),
+    ]
+    return write_county(code, county_name, total_new, total_old, removed_count, history_changed_count,
+                        last_5_elections, csv_sources, compress)
+
+def write_county(code, county_name, total_new, total_old, removed_count, history_changed_count,
+                 last_5_elections, csv_sources, compress=False):
+    """Write one county's CSV and MD; returns its master summary row and progress lines."""
+    log = []
+
+    # The CSV row queries of section 2 run as the file is written
+    csv_name = f"diff_{code}_{county_name.replace(' ', '_')}.csv" + (".gz" if compress else "")
+    with section("2. CSV rows"):
+        _, moved_voters = write_csv(csv_name, csv_sources, compress)
+
+    # -------------------------------------------------
+    # 3. Summary
+    # -------------------------------------------------
+    stats = {
+        'voters_removed': removed_count,
+        'histories_changed': history_changed_count,
+        'voters_who_moved': moved_voters
+    }
+
+    log.append(f"  voters removed: {removed_count}")
+    log.append(f"  histories changed: {history_changed_count}")
+    log.append(f"  voters who moved: {moved_voters}")
+    log.append(f"  → {csv_name}")
+
+    with section("3. summary"):
+        md_path = write_county_md(code, county_name, stats, total_new, last_5_elections)
+    log.append(f"  → {md_path}")
+
+    summary = {
+        'CountyCode': code,
+        'CountyName': county_name,
+        'total_old': total_old,
+        'total_new': total_new,
+        'net_change': total_new - total_old,
+        'voters_removed': removed_count,
+        'histories_changed': history_changed_count,
+        'voters_who_moved': moved_voters
+    }
+    return summary, log
+
+# -------------------------------------------------
+# --columnar: the same comparison from two export_columnar.py exports,
+# computed with pyarrow (see columnar_diff.py) instead of SQL
+def compare_counties_columnar(new_dir, old_dir, counties, compress=False):
+    import columnar_diff
+
+    data = columnar_diff.open_exports(new_dir, old_dir)
+    results = []
+    for code, county_name in counties:
+        diff = columnar_diff.county_diff(data, code)
+        csv_sources = [table_batches(diff[rows], prefix=(code, county_name)) for rows in ('history', 'moved')]
+        results.append(write_county(code, county_name, diff['total_new'], diff['total_old'], diff['removed'],
+                                    diff['changed'], diff['last_5'], csv_sources, compress))
+    return results
+
+# -------------------------------------------------
+def compare(args):
+    """Write the per-county and master files for the parsed command line."""
+
+    new_db = args.new_db
+    old_db = args.old_db
 
     if not Path(new_db).exists() or not Path(old_db).exists():
         print("Error: One or both DB files not found.")
@@ -139,252 +582,106 @@ def main():
 
     print(f"Comparing:\n  New DB: {new_db}\n  Old DB: {old_db}\n")
 
-    conn = sqlite3.connect(new_db)
-    conn.execute(f"ATTACH DATABASE '{old_db}' AS db_old")
+    if args.columnar:
+        try:
+            import columnar_diff  # noqa: F401
+        except ImportError:
+            print("Error: --columnar needs pyarrow (pip install pyarrow).")
+            sys.exit(1)
+    else:
+        conn = open_databases(new_db, old_db)
+        for db_name, schema in ((new_db, "main"), (old_db, "db_old")):
+            if has_legacy_history(conn, schema):
+                print(f"Note: {db_name} has the old unindexed election_history table, building digests and an "
+                      f"indexed copy of its history for this run (import_to_sqlite3.py --migrate, then "
+                      f"--digests-only, updates it).")
+            elif not history_digest.has_history_digests(conn, schema):
+                print(f"Note: {db_name} has no stored history digests, building them for this run "
+                      f"(import_to_sqlite3.py --digests-only stores them).")
+        if not turnout.has_turnout(conn):
+            print(f"Note: {new_db} has no stored turnout aggregates, counting turnout from its history "
+                  f"(import_to_sqlite3.py --turnout-only stores them).")
+        close_databases(conn)
 
     master_summary = []
 
-    for idx, (code, county_name) in enumerate(COUNTY_LIST, 1):
+    if args.jobs > 1:
+        # Each worker builds the diff tables for its share of the counties;
+        # results are put back in COUNTY_LIST order, so the output and the
+        # master summary are the same as a sequential run.
+        shards = [COUNTY_LIST[i::args.jobs] for i in range(args.jobs)]
+        print(f"Building diff tables in {args.jobs} worker processes...")
+        by_code = {}
+        if args.columnar:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                shard_results = pool.map(compare_counties_columnar, [new_db] * len(shards), [old_db] * len(shards),
+                                         shards, [args.gzip] * len(shards))
+                for shard, results in zip(shards, shard_results):
+                    by_code.update(zip((code for code, _ in shard), results))
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                                     initargs=(new_db, old_db, _trace is not None)) as pool:
+                shard_results = pool.map(compare_counties_in_worker, shards, [args.gzip] * len(shards))
+                for shard, (results, trace) in zip(shards, shard_results):
+                    by_code.update(zip((code for code, _ in shard), results))
+                    if trace:
+                        _trace.merge(trace)
+        results = [by_code[code] for code, _ in COUNTY_LIST]
+    elif args.columnar:
+        print("Comparing Parquet exports...")
+        results = compare_counties_columnar(new_db, old_db, COUNTY_LIST, args.gzip)
+    else:
+        print("Building diff tables...")
+        conn = open_databases(new_db, old_db)
+        results = compare_counties(conn, COUNTY_LIST, args.gzip)
+        close_databases(conn)
+
+    for idx, ((code, county_name), (summary, log)) in enumerate(zip(COUNTY_LIST, results), 1):
         print(f"[{idx:02d}/87] Processing County {code}: {county_name}...")
-
-        # Total voters
-        total_new = pd.read_sql_query("SELECT COUNT(*) FROM voters WHERE CountyCode = ?", conn, params=(code,)).iloc[0, 0]
-        total_old = pd.read_sql_query("SELECT COUNT(*) FROM db_old.voters WHERE CountyCode = ?", conn, params=(code,)).iloc[0, 0]
-
-        # -------------------------------------------------
-        # 1. Last 5 Elections (by date) — NEW
-        # -------------------------------------------------
-        last_5_sql = """
-        SELECT 
-            ElectionDate,
-            ElectionDescription,
-            COUNT(DISTINCT VoterId) AS VotersWhoVoted
-        FROM election_history
-        WHERE VoterId IN (SELECT VoterId FROM voters WHERE CountyCode = ?)
-        GROUP BY ElectionDate, ElectionDescription
-        ORDER BY ElectionDate DESC
-        LIMIT 5;
-        """
-        last_5_elections = pd.read_sql_query(last_5_sql, conn, params=(code,))
-
-        # -------------------------------------------------
-        # 2. Election history differences (for history_changed)
-        # -------------------------------------------------
-        diff_sql = f"""
-        WITH common_voters AS (
-            SELECT n.VoterId AS new_id, o.VoterId AS old_id
-            FROM voters n
-            JOIN db_old.voters o ON n.VoterId = o.VoterId
-            WHERE n.CountyCode = ? AND o.CountyCode = ?
-        ),
-        matched_history AS (
-            SELECT
-                c.new_id AS VoterId,
-                h_new.ElectionDate AS ElectionDate_new,
-                h_new.ElectionDescription AS ElectionDescription_new,
-                h_new.VotingMethod AS VotingMethod_new,
-                h_old.ElectionDate AS ElectionDate_old,
-                h_old.ElectionDescription AS ElectionDescription_old,
-                h_old.VotingMethod AS VotingMethod_old
-            FROM common_voters c
-            LEFT JOIN election_history h_new ON h_new.VoterId = c.new_id
-            LEFT JOIN db_old.election_history h_old
-                ON h_old.VoterId = c.old_id
-               AND h_old.ElectionDate = h_new.ElectionDate
-               AND h_old.ElectionDescription = h_new.ElectionDescription
-               AND h_old.VotingMethod = h_new.VotingMethod
-        ),
-        diff_rows AS (
-            SELECT VoterId,
-                   CASE
-                       WHEN ElectionDate_new IS NOT NULL AND ElectionDate_old IS NULL THEN 'NEW_ELECTION'
-                       WHEN ElectionDate_new IS NULL AND ElectionDate_old IS NOT NULL THEN 'MISSING_IN_NEW'
-                       WHEN ElectionDate_new != ElectionDate_old
-                         OR ElectionDescription_new != ElectionDescription_old
-                         OR VotingMethod_new != VotingMethod_old
-                         THEN 'DIFFERENT'
-                       ELSE 'MATCH'
-                   END AS diff_type
-            FROM matched_history
-            UNION ALL
-            SELECT o.VoterId, 'MISSING_IN_NEW'
-            FROM db_old.election_history o
-            JOIN db_old.voters v ON v.VoterId = o.VoterId
-            WHERE v.CountyCode = ?
-              AND NOT EXISTS (SELECT 1 FROM common_voters c WHERE c.old_id = o.VoterId)
-        )
-        SELECT VoterId, diff_type
-        FROM diff_rows
-        WHERE diff_type != 'MATCH';
-        """
-        diff_df = pd.read_sql_query(diff_sql, conn, params=(code, code, code))
-
-        # Classify
-        voter_groups = diff_df.groupby('VoterId')['diff_type'].apply(set)
-        removed_voters = voter_groups[voter_groups.apply(lambda x: 'MISSING_IN_NEW' in x)].index
-        history_changed = voter_groups[voter_groups.apply(lambda x: 'DIFFERENT' in x)].index
-
-        # -------------------------------------------------
-        # 3. Address changes
-        # -------------------------------------------------
-        address_sql = f"""
-        SELECT n.VoterId
-        FROM voters n
-        JOIN db_old.voters o ON n.VoterId = o.VoterId
-        WHERE n.CountyCode = ? AND o.CountyCode = ?
-          AND (n.HouseNumber <> o.HouseNumber
-            OR n.StreetName <> o.StreetName
-            OR COALESCE(n.UnitType,'') <> COALESCE(o.UnitType,'')
-            OR COALESCE(n.UnitNumber,'') <> COALESCE(o.UnitNumber,'')
-            OR n.City <> o.City
-            OR n.ZipCode <> o.ZipCode)
-          AND n.FirstName || COALESCE(n.MiddleName,'') || n.LastName
-            = o.FirstName || COALESCE(o.MiddleName,'') || o.LastName;
-        """
-        moved_df = pd.read_sql_query(address_sql, conn, params=(code, code))
-        moved_voters = len(moved_df)
-
-        # -------------------------------------------------
-        # 4. Build CSV (history + moves)
-        # -------------------------------------------------
-        csv_history_sql = f"""
-        WITH common_voters AS (
-            SELECT n.VoterId AS new_id, o.VoterId AS old_id
-            FROM voters n
-            JOIN db_old.voters o ON n.VoterId = o.VoterId
-            WHERE n.CountyCode = ? AND o.CountyCode = ?
-        ),
-        matched_history AS (
-            SELECT
-                c.new_id AS VoterId,
-                h_new.ElectionDate AS ElectionDate_new,
-                h_new.ElectionDescription AS ElectionDescription_new,
-                h_new.VotingMethod AS VotingMethod_new,
-                h_old.ElectionDate AS ElectionDate_old,
-                h_old.ElectionDescription AS ElectionDescription_old,
-                h_old.VotingMethod AS VotingMethod_old,
-                CASE
-                    WHEN h_new.VoterId IS NULL THEN 'MISSING_IN_NEW'
-                    WHEN h_old.VoterId IS NULL THEN 'NEW_ELECTION'
-                    WHEN h_new.ElectionDate != h_old.ElectionDate
-                      OR h_new.ElectionDescription != h_old.ElectionDescription
-                      OR h_new.VotingMethod != h_old.VotingMethod
-                      THEN 'DIFFERENT'
-                    ELSE 'MATCH'
-                END AS diff_type
-            FROM common_voters c
-            LEFT JOIN election_history h_new ON h_new.VoterId = c.new_id
-            LEFT JOIN db_old.election_history h_old
-                ON h_old.VoterId = c.old_id
-               AND h_old.ElectionDate = h_new.ElectionDate
-               AND h_old.ElectionDescription = h_new.ElectionDescription
-               AND h_old.VotingMethod = h_new.VotingMethod
-            UNION ALL
-            SELECT o.VoterId, NULL, NULL, NULL,
-                   o.ElectionDate, o.ElectionDescription, o.VotingMethod,
-                   'MISSING_IN_NEW'
-            FROM db_old.election_history o
-            JOIN db_old.voters v ON v.VoterId = o.VoterId
-            WHERE v.CountyCode = ?
-              AND NOT EXISTS (SELECT 1 FROM common_voters c WHERE c.old_id = o.VoterId)
-        )
-        SELECT
-            '{code}' AS CountyCode,
-            '{county_name}' AS CountyName,
-            mh.VoterId,
-            v.FirstName || ' ' || COALESCE(v.MiddleName, '') || ' ' || v.LastName AS FullName,
-            diff_type,
-            ElectionDate_new,
-            ElectionDescription_new,
-            VotingMethod_new,
-            ElectionDate_old,
-            ElectionDescription_old,
-            VotingMethod_old
-        FROM matched_history mh
-        JOIN voters v ON v.VoterId = mh.VoterId
-        WHERE diff_type != 'MATCH'
-        ORDER BY mh.VoterId, COALESCE(ElectionDate_new, '9999-99-99');
-        """
-        history_out = pd.read_sql_query(csv_history_sql, conn, params=(code, code, code))
-
-        # Move rows
-        move_names = []
-        for voter_id in moved_df['VoterId']:
-            voter_name = pd.read_sql_query(
-                "SELECT FirstName || ' ' || COALESCE(MiddleName,'') || ' ' || LastName FROM voters WHERE VoterId = ?",
-                conn, params=(voter_id,)
-            ).iloc[0, 0]
-            move_names.append(voter_name)
-
-        move_out = pd.DataFrame({
-            'CountyCode': [code] * moved_voters,
-            'CountyName': [county_name] * moved_voters,
-            'VoterId': moved_df['VoterId'],
-            'FullName': move_names,
-            'diff_type': ['MOVED'] * moved_voters,
-            'ElectionDate_new': [None] * moved_voters,
-            'ElectionDescription_new': [None] * moved_voters,
-            'VotingMethod_new': [None] * moved_voters,
-            'ElectionDate_old': [None] * moved_voters,
-            'ElectionDescription_old': [None] * moved_voters,
-            'VotingMethod_old': [None] * moved_voters
-        })
-
-        full_df = pd.concat([history_out, move_out], ignore_index=True)
-        csv_name = f"diff_{code}_{county_name.replace(' ', '_')}.csv"
-        full_df.to_csv(csv_name, index=False)
-
-        # -------------------------------------------------
-        # 5. Summary
-        # -------------------------------------------------
-        removed_count = len(removed_voters)
-        history_changed_count = len(history_changed)
-
-        stats = {
-            'voters_removed': removed_count,
-            'histories_changed': history_changed_count,
-            'voters_who_moved': moved_voters
-        }
-
-        print(f"  voters removed: {removed_count}")
-        print(f"  histories changed: {history_changed_count}")
-        print(f"  voters who moved: {moved_voters}")
-        print(f"  → {csv_name}")
-
-        write_county_md(code, county_name, stats, total_new, last_5_elections)
-
-        master_summary.append({
-            'CountyCode': code,
-            'CountyName': county_name,
-            'total_old': total_old,
-            'total_new': total_new,
-            'net_change': total_new - total_old,
-            'voters_removed': removed_count,
-            'histories_changed': history_changed_count,
-            'voters_who_moved': moved_voters
-        })
+        print("\n".join(log))
+        master_summary.append(summary)
 
     # -------------------------------------------------
-    # 6. Master files
+    # 4. Master files
     # -------------------------------------------------
-    summary_df = pd.DataFrame(master_summary)
-    summary_df.to_csv('summary_all_counties.csv', index=False)
-
-    with open('summary_all_counties.md', 'w') as f:
-        f.write("# Voter Change Summary: All Counties\n\n")
-        f.write(f"**Generated:** {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        f.write("## Summary Table\n\n")
-        f.write("| Code | County | Old | New | Net | Removed | History | Moved |\n")
-        f.write("|------|--------|-----|-----|-----|---------|---------|-------|\n")
-        for _, row in summary_df.iterrows():
-            f.write(f"| {row['CountyCode']} | {row['CountyName']} | {row['total_old']:,} | {row['total_new']:,} "
-                    f"| {row['net_change']:+,} | {row['voters_removed']:,} | {row['histories_changed']:,} | {row['voters_who_moved']:,} |\n")
+    with section("4. master files"):
+        summary_df = pd.DataFrame(master_summary)
+        summary_df.to_csv('summary_all_counties.csv', index=False)
+
+        with open('summary_all_counties.md', 'w') as f:
+            f.write("# Voter Change Summary: All Counties\n\n")
+            f.write(f"**Generated:** {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            f.write("## Summary Table\n\n")
+            f.write("| Code | County | Old | New | Net | Removed | History | Moved |\n")
+            f.write("|------|--------|-----|-----|-----|---------|---------|-------|\n")
+            for _, row in summary_df.iterrows():
+                f.write(f"| {row['CountyCode']} | {row['CountyName']} | {row['total_old']:,} | {row['total_new']:,} "
+                        f"| {row['net_change']:+,} | {row['voters_removed']:,} | {row['histories_changed']:,} | {row['voters_who_moved']:,} |\n")
 
-    conn.close()
     print("\nAll done! 87 counties processed.")
     print("→ Per-county: diff_XX_COUNTY.csv + summary_XX_COUNTY.md")
     print("→ Master: summary_all_counties.csv + summary_all_counties.md")
 
+def main():
+    parser = argparse.ArgumentParser(description="Compare two voter databases county by county.")
+    parser.add_argument("new_db", help="Newer voters database (export directory with --columnar)")
+    parser.add_argument("old_db", help="Older voters database (export directory with --columnar)")
+    parser.add_argument("--gzip", action="store_true", help="Write the per-county diffs as diff_XX_COUNTY.csv.gz")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes, each comparing a share of the counties (default: 1)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Compare two export_columnar.py Parquet exports with pyarrow instead of two databases")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    # --trace times the SQL of each section, in the --jobs workers too; with
+    # --columnar there is no SQL and only the sections run here are timed
+    global _trace
+    _trace = instrumentation.trace_from_args(args)
+    with instrumentation.profiled(args.profile):
+        compare(args)
+    instrumentation.write_report(_trace, args)
+
 
 if __name__ == '__main__':
     main()
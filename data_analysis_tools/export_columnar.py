@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+export_columnar.py
+Exports a voters database to partitioned Parquet files for analytics:
+
+    <out_dir>/voters/CountyCode=27/part-0.parquet
+    <out_dir>/election_history/CountyCode=27/part-0.parquet
+
+Both tables are partitioned by CountyCode (history rows by their voter's
+county), text columns are dictionary-encoded and rows are in VoterId order
+(each voter's history in database order). Read them back with
+    dataset(out_dir, "voters").to_table(filter=pyarrow.dataset.field("CountyCode") == "27")
+or pandas.read_parquet(f"{out_dir}/voters", filters=[("CountyCode", "=", "27")]).
+
+compare_voters_history.py --columnar diffs two such exports.
+
+Requires pyarrow (pip install pyarrow).
+Usage:
+    python3 export_columnar.py ems251109.db ems251109_parquet
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = ds = None
+
+BATCH_ROWS = 100000          # rows fetched from SQLite per record batch
+MIN_ROWS_PER_GROUP = 65536   # buffer partitions into row groups at least this big
+
+HISTORY_COLUMNS = ["VoterId", "ElectionDate", "ElectionDescription", "VotingMethod"]
+
+# table -> query; CountyCode is the partition column
+EXPORT_SQL = {
+    "voters": "SELECT {columns} FROM voters ORDER BY VoterId",
+    # CROSS JOIN keeps voters as the outer loop, so each voter's records come
+    # out together along the election_votes primary key
+    "election_history": """
+        SELECT v.CountyCode, h.VoterId, h.ElectionDate, h.ElectionDescription, h.VotingMethod
+        FROM voters v
+        CROSS JOIN election_history h ON h.VoterId = v.VoterId
+        ORDER BY v.VoterId
+    """,
+}
+
+def require_pyarrow():
+    if pa is None:
+        print("Error: the columnar export needs pyarrow (pip install pyarrow).")
+        sys.exit(1)
+
+def partitioning():
+    """Hive-style CountyCode=XX directories; CountyCode stays a string ('01', not 1)."""
+    return ds.partitioning(pa.schema([("CountyCode", pa.string())]), flavor="hive")
+
+def arrow_type(declared_type):
+    if declared_type.upper() == "INTEGER":
+        return pa.int64()
+    return pa.dictionary(pa.int32(), pa.string())
+
+def table_schema(conn, table, columns):
+    declared = {name: col_type for _, name, col_type, *_ in conn.execute(f"PRAGMA table_info({table})")}
+    return pa.schema([(name, arrow_type(declared.get(name, "TEXT"))) for name in columns])
+
+def column_array(values, arrow_type):
+    if pa.types.is_dictionary(arrow_type):
+        return pa.array(values, type=arrow_type.value_type).dictionary_encode()
+    return pa.array(values, type=arrow_type)
+
+def record_batches(cur, schema, batch_rows=BATCH_ROWS):
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield pa.RecordBatch.from_arrays([column_array(values, field.type)
+                                          for field, values in zip(schema, zip(*rows))], schema=schema)
+
+def dataset(out_dir, table):
+    """Open one exported table as a pyarrow dataset."""
+    require_pyarrow()
+    return ds.dataset(Path(out_dir) / table, format="parquet", partitioning=partitioning())
+
+def export_table(conn, out_dir, table):
+    if table == "voters":
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(voters)")]
+        sql = EXPORT_SQL[table].format(columns=", ".join(columns))
+        schema = table_schema(conn, "voters", columns)
+    else:
+        sql = EXPORT_SQL[table]
+        schema = pa.schema([("CountyCode", pa.dictionary(pa.int32(), pa.string()))] +
+                           list(table_schema(conn, "voters", ["VoterId"])) +
+                           [(name, pa.dictionary(pa.int32(), pa.string())) for name in HISTORY_COLUMNS[1:]])
+
+    rows = 0
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield batch
+
+    ds.write_dataset(counted(record_batches(conn.execute(sql), schema)), Path(out_dir) / table,
+                     schema=schema, format="parquet", partitioning=partitioning(),
+                     existing_data_behavior="delete_matching", preserve_order=True,
+                     min_rows_per_group=MIN_ROWS_PER_GROUP)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export voters and election_history to partitioned Parquet.")
+    parser.add_argument("db_name", help="Voters database")
+    parser.add_argument("out_dir", help="Output directory (voters/ and election_history/ are replaced)")
+    args = parser.parse_args()
+
+    require_pyarrow()
+    if not Path(args.db_name).exists():
+        print(f"Error: {args.db_name} not found.")
+        sys.exit(1)
+
+    # write_dataset() pulls the record batches from one of its own threads
+    conn = sqlite3.connect(Path(args.db_name).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+    print(f"Exporting {args.db_name} → {args.out_dir}/")
+    for table in EXPORT_SQL:
+        started = time.perf_counter()
+        rows = export_table(conn, args.out_dir, table)
+        print(f"   {table}: {rows:,} rows ({time.perf_counter() - started:.1f}s)")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+find_duplicate_voters.py
+Finds voters who are likely registered more than once and writes the pairs,
+with the reasons they match, to duplicate_voters.csv.
+
+Rather than comparing every voter with every other one, voters are grouped
+into blocks by a key that duplicates share, and only voters in the same block
+are compared:
+
+  name_dob_zip   same zip code and DOB year, and the Soundex of the last
+                 name and first initial or the other way round (catches
+                 either name misspelt)
+  address        same zip code, house number, street and Soundex of the last
+                 name (catches missing or mistyped DOB years and nicknames)
+  name_dob       same first name, last name and DOB year anywhere in the state
+                 (catches voters registered again after moving)
+
+The zip code blocks are read one zip code at a time through idx_zip and
+split over --jobs worker processes; the statewide block is one SQL query.
+A pair is reported when the names are similar enough and the DOB year or the
+address agree, and nothing (DOB year, middle initial, suffix) contradicts it.
+
+Usage:
+    python3 find_duplicate_voters.py ems251109.db [--jobs 4] [--out duplicate_voters.csv]
+"""
+
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from connection_pool import read_only_uri  # noqa: E402
+from name_search import name_parts, similarity, soundex  # noqa: E402
+
+NAME_THRESHOLD = 0.85   # name similarity (0..1) a likely duplicate needs at least
+MAX_BLOCK_SIZE = 200    # larger blocks (very common names) are skipped and counted
+ZIP_SHARDS = 64         # tasks the zip codes are split into; more than --jobs so workers finish together
+CACHE_SIZE = 65536      # names, name parts and streets repeat, so their keys are memoized
+
+VOTER_COLUMNS = ["VoterId", "CountyCode", "FirstName", "MiddleName", "LastName", "NameSuffix",
+                 "HouseNumber", "StreetName", "UnitType", "UnitNumber", "City", "ZipCode",
+                 "DOBYear", "RegistrationDate"]
+
+ZIP_CODES_SQL = "SELECT DISTINCT ZipCode FROM voters WHERE ZipCode IS NOT NULL AND ZipCode <> '' ORDER BY ZipCode"
+
+ZIP_VOTERS_SQL = f"SELECT {', '.join(VOTER_COLUMNS)} FROM voters WHERE ZipCode = ?"
+
+# Voters sharing first name, last name and DOB year with someone in another
+# zip code, one block after another
+STATEWIDE_SQL = f"""
+SELECT {', '.join(VOTER_COLUMNS)}
+FROM (
+    SELECT {', '.join(VOTER_COLUMNS)},
+           UPPER(TRIM(LastName)) AS LastKey, UPPER(TRIM(FirstName)) AS FirstKey,
+           MIN(ZipCode) OVER block AS MinZip, MAX(ZipCode) OVER block AS MaxZip
+    FROM voters
+    WHERE DOBYear IS NOT NULL AND LastName <> '' AND FirstName <> ''
+    WINDOW block AS (PARTITION BY UPPER(TRIM(LastName)), UPPER(TRIM(FirstName)), DOBYear)
+)
+WHERE MinZip <> MaxZip
+ORDER BY LastKey, FirstKey, DOBYear
+"""
+
+CSV_COLUMNS = ["VoterId_1", "VoterId_2", "NameScore", "Reasons", "FoundBy",
+               "FullName_1", "FullName_2", "DOBYear_1", "DOBYear_2",
+               "Address_1", "Address_2", "CountyCode_1", "CountyCode_2",
+               "RegistrationDate_1", "RegistrationDate_2"]
+
+# -------------------------------------------------
+def value(voter, name):
+    """Stripped, upper-cased field; '' for NULL."""
+    field = voter[name]
+    return "" if field is None else str(field).strip().upper()
+
+def full_name(voter):
+    return " ".join(part for part in (value(voter, "FirstName"), value(voter, "MiddleName"),
+                                      value(voter, "LastName"), value(voter, "NameSuffix")) if part)
+
+def address(voter):
+    street = " ".join(part for part in (value(voter, name) for name in
+                                        ("HouseNumber", "StreetName", "UnitType", "UnitNumber")) if part)
+    return f"{street}, {value(voter, 'City')}, {value(voter, 'ZipCode')}"
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalized_text(text):
+    return " ".join(re.findall(r"[A-Z0-9]+", text.upper()))
+
+def normalized(voter, name):
+    """Letter and digit runs of a field: "N. Main  St" -> "N MAIN ST"."""
+    return normalized_text(voter[name] or "")
+
+parts_of = lru_cache(maxsize=CACHE_SIZE)(name_parts)
+soundex_of = lru_cache(maxsize=CACHE_SIZE)(soundex)
+
+def address_key(voter):
+    return tuple(normalized(voter, name) for name in ("HouseNumber", "StreetName", "UnitNumber", "ZipCode"))
+
+def zip_block_keys(voter):
+    """(pass, key) of the zip code blocks a voter is in."""
+    keys = []
+    first, last = parts_of(voter["FirstName"]), parts_of(voter["LastName"])
+    if not last:
+        return keys
+    last_code = soundex_of(last[-1])
+    if first and voter["DOBYear"]:
+        keys.append(("name_dob_zip", ("L", last_code, first[0][0], voter["DOBYear"])))
+        keys.append(("name_dob_zip", ("F", soundex_of(first[0]), last[-1][0], voter["DOBYear"])))
+    house, street = normalized(voter, "HouseNumber"), normalized(voter, "StreetName")
+    if house and street:
+        keys.append(("address", (house, street, last_code)))
+    return keys
+
+# -------------------------------------------------
+def conflicts(x, y):
+    return bool(x and y and x != y)
+
+def name_similarity(a, b, name):
+    # Same name (as in every statewide block) without running difflib
+    return 1.0 if value(a, name) == value(b, name) else similarity(a[name], b[name])
+
+def assess(a, b):
+    """(name score, reasons) if `a` and `b` are likely the same person, else None."""
+    # JR and SR, two different middle initials or DOB years: different people
+    if (conflicts(value(a, "NameSuffix"), value(b, "NameSuffix"))
+            or conflicts(value(a, "MiddleName")[:1], value(b, "MiddleName")[:1])
+            or conflicts(a["DOBYear"], b["DOBYear"])):
+        return None
+
+    score = round(0.6 * name_similarity(a, b, "LastName") + 0.4 * name_similarity(a, b, "FirstName"), 3)
+    if score < NAME_THRESHOLD:
+        return None
+
+    same_dob = bool(a["DOBYear"]) and a["DOBYear"] == b["DOBYear"]
+    same_address = address_key(a) == address_key(b)
+    if not (same_dob or same_address):
+        return None
+
+    reasons = ["same name" if score == 1 else f"similar name ({score:.2f})"]
+    if same_dob:
+        reasons.append("same DOB year")
+    if same_address:
+        reasons.append("same address")
+    elif value(a, "ZipCode") == value(b, "ZipCode"):
+        reasons.append("same zip code")
+    if a["RegistrationDate"] and a["RegistrationDate"] == b["RegistrationDate"]:
+        reasons.append("same registration date")
+    return score, "; ".join(reasons)
+
+def compare_block(voters, found_by, pairs):
+    for a, b in combinations(sorted(voters, key=lambda v: v["VoterId"]), 2):
+        match = assess(a, b)
+        if match:
+            score, reasons = match
+            pairs.append([a["VoterId"], b["VoterId"], score, reasons, found_by,
+                          full_name(a), full_name(b), a["DOBYear"], b["DOBYear"],
+                          address(a), address(b), a["CountyCode"], b["CountyCode"],
+                          a["RegistrationDate"], b["RegistrationDate"]])
+
+def compare_blocks(blocks, found_by, pairs):
+    """Compare inside each block of {key: [voter]}; returns the number of blocks too big to compare."""
+    skipped = 0
+    for voters in blocks.values():
+        if len(voters) > MAX_BLOCK_SIZE:
+            skipped += 1
+        elif len(voters) > 1:
+            compare_block(voters, found_by, pairs)
+    return skipped
+
+# -------------------------------------------------
+# Each --jobs worker process opens its own read-only connection once
+_worker_conn = None
+
+def init_worker(db_name):
+    global _worker_conn
+    _worker_conn = sqlite3.connect(read_only_uri(db_name), uri=True)
+    _worker_conn.row_factory = sqlite3.Row
+
+def find_in_zip_codes(zip_codes):
+    """Pairs in the zip code blocks of `zip_codes`: (pairs, voters read, blocks skipped)."""
+    pairs, voters_read, skipped = [], 0, 0
+    for zip_code in zip_codes:
+        blocks = defaultdict(lambda: defaultdict(list))
+        for voter in _worker_conn.execute(ZIP_VOTERS_SQL, (zip_code,)):
+            voters_read += 1
+            for found_by, key in zip_block_keys(voter):
+                blocks[found_by][key].append(voter)
+        for found_by, by_key in blocks.items():
+            skipped += compare_blocks(by_key, found_by, pairs)
+    return pairs, voters_read, skipped
+
+def find_statewide():
+    """Pairs in the statewide name_dob blocks: (pairs, voters read, blocks skipped)."""
+    blocks = defaultdict(list)
+    for voter in _worker_conn.execute(STATEWIDE_SQL):
+        blocks[(value(voter, "LastName"), value(voter, "FirstName"), voter["DOBYear"])].append(voter)
+    pairs = []
+    skipped = compare_blocks(blocks, "name_dob", pairs)
+    return pairs, sum(len(voters) for voters in blocks.values()), skipped
+
+def run_task(task):
+    return find_statewide() if task is None else find_in_zip_codes(task)
+
+# -------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Find voters who are likely registered more than once.")
+    parser.add_argument("db_name", help="Voters database")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument("--out", default="duplicate_voters.csv", help="Output CSV (default: duplicate_voters.csv)")
+    args = parser.parse_args()
+
+    if not Path(args.db_name).exists():
+        print(f"Error: {args.db_name} not found.")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(read_only_uri(args.db_name), uri=True)
+    zip_codes = [zip_code for zip_code, in conn.execute(ZIP_CODES_SQL)]
+    conn.close()
+
+    # The statewide block (None) first, as it is the longest task. The shards
+    # don't depend on --jobs, so neither does the output.
+    tasks = [None] + [zip_codes[i::ZIP_SHARDS] for i in range(ZIP_SHARDS) if zip_codes[i::ZIP_SHARDS]]
+    print(f"Looking for duplicates among {len(zip_codes):,} zip codes in {args.db_name} "
+          f"({args.jobs} job{'s' if args.jobs > 1 else ''})...")
+
+    seen = set()
+    voters_read = skipped = 0
+    with open(args.out, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+
+        def write(results):
+            nonlocal voters_read, skipped
+            for pairs, read, too_big in results:
+                voters_read += read
+                skipped += too_big
+                # A pair found by more than one block is written once
+                for row in pairs:
+                    if (row[0], row[1]) not in seen:
+                        seen.add((row[0], row[1]))
+                        writer.writerow(row)
+
+        if args.jobs > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                                     initargs=(args.db_name,)) as pool:
+                write(pool.map(run_task, tasks))
+        else:
+            init_worker(args.db_name)
+            write(map(run_task, tasks))
+
+    print(f"Read {voters_read:,} voter rows in {time.perf_counter() - started:.1f}s")
+    if skipped:
+        print(f"Skipped {skipped:,} blocks of more than {MAX_BLOCK_SIZE} voters")
+    print(f"→ {args.out} ({len(seen):,} likely duplicate pairs)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+turnout_report.py
+Turnout by county, precinct, legislative or congressional district, split by
+voting method, for the most recent elections (or those on one date).
+
+Reads the turnout aggregates the importer stores (see ../turnout.py), so it
+never scans election_history; for a database imported before they existed,
+store them once with:
+    python3 ../import_to_sqlite3.py --db-name ems251109.db --turnout-only
+
+Writes turnout_<level>.csv: one row per area and election with a column per
+voting method and a Total (distinct voters who voted).
+
+Usage:
+    python3 turnout_report.py ems251109.db --by precinct --county 27 --last 3
+    python3 turnout_report.py ems251109.db --by congressional --election 2024-11-05
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import turnout  # noqa: E402
+from connection_pool import read_only_uri  # noqa: E402
+
+# Most recent first; same-day elections by description
+ELECTIONS_SQL = """
+SELECT e.ElectionId, e.ElectionDate, e.ElectionDescription
+FROM elections e
+WHERE e.ElectionId IN (SELECT DISTINCT ElectionId FROM {table})
+  AND (? IS NULL OR e.ElectionDate = ?)
+ORDER BY e.ElectionDate DESC, e.ElectionDescription
+"""
+
+TURNOUT_SQL = """
+SELECT {columns}, t.ElectionId, m.VotingMethod, t.Voters
+FROM {table} t
+JOIN voting_methods m ON m.MethodId = t.MethodId
+WHERE t.ElectionId IN ({ids}) {county_filter}
+"""
+
+def recent_elections(conn, level, last=None, election_date=None):
+    rows = conn.execute(ELECTIONS_SQL.format(table=turnout.turnout_table(level)),
+                        (election_date, election_date)).fetchall()
+    return rows[:last] if last else rows
+
+def turnout_frame(conn, level, elections, county=None):
+    """One row per area and election: area columns, ElectionDate, ElectionDescription, methods..., Total."""
+    columns = turnout.TURNOUT_LEVELS[level]
+    ids = [election_id for election_id, _, _ in elections]
+    sql = TURNOUT_SQL.format(columns=", ".join(f"t.{name}" for name in columns), table=turnout.turnout_table(level),
+                             ids=",".join("?" * len(ids)), county_filter="AND t.CountyCode = ?" if county else "")
+    counts = pd.read_sql_query(sql, conn, params=ids + ([county] if county else []))
+    if counts.empty:
+        return counts
+
+    table = counts.pivot_table(index=columns + ["ElectionId"], columns="VotingMethod", values="Voters",
+                               aggfunc="sum", fill_value=0)
+    methods = sorted(table.columns)
+    table = table[methods]
+    table["Total"] = table.sum(axis=1)
+    table = table.reset_index()
+
+    names = pd.DataFrame(elections, columns=["ElectionId", "ElectionDate", "ElectionDescription"])
+    names["order"] = range(len(names))
+    table = table.merge(names, on="ElectionId").sort_values(["order"] + columns)
+    return table[columns + ["ElectionDate", "ElectionDescription"] + methods + ["Total"]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Turnout by area and voting method from the stored aggregates.")
+    parser.add_argument("db_name", help="Voters database")
+    parser.add_argument("--by", choices=list(turnout.TURNOUT_LEVELS), default="county",
+                        help="Area to report turnout by (default: county)")
+    parser.add_argument("--county", help="Only this county code, e.g. 27 (county and precinct reports)")
+    parser.add_argument("--last", type=int, default=5, help="Most recent elections to include (default: 5)")
+    parser.add_argument("--election", metavar="YYYY-MM-DD", help="Only the elections held on this date")
+    parser.add_argument("--out", help="Output CSV (default: turnout_<by>.csv)")
+    args = parser.parse_args()
+
+    if not Path(args.db_name).exists():
+        print(f"Error: {args.db_name} not found.")
+        sys.exit(1)
+    if args.county and "CountyCode" not in turnout.TURNOUT_LEVELS[args.by]:
+        print("Error: --county only applies to --by county or --by precinct.")
+        sys.exit(1)
+
+    conn = sqlite3.connect(read_only_uri(args.db_name), uri=True)
+    if not turnout.has_turnout(conn):
+        print(f"Error: {args.db_name} has no turnout aggregates; build them with "
+              f"import_to_sqlite3.py --db-name {args.db_name} --turnout-only")
+        sys.exit(1)
+
+    elections = recent_elections(conn, args.by, None if args.election else args.last, args.election)
+    if not elections:
+        print("No elections found.")
+        sys.exit(1)
+    report = turnout_frame(conn, args.by, elections, args.county)
+    conn.close()
+
+    out = args.out or f"turnout_{args.by}.csv"
+    report.to_csv(out, index=False)
+
+    print(f"Turnout by {args.by}" + (f" in county {args.county}" if args.county else "") + ":")
+    for _, date, description in elections:
+        rows = report[(report["ElectionDate"] == date) & (report["ElectionDescription"] == description)]
+        print(f"   {date}  {description}: {rows['Total'].sum():,} voters in {len(rows):,} areas")
+    print(f"→ {out} ({len(report):,} rows)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Date normalization shared by the importer and the report scripts.
+
+MN SOS files only use a few thousand distinct date strings, so parse_date()
+checks the two common layouts (MM/DD/YYYY and YYYY-MM-DD) by slicing the
+string directly and memoizes recent results. Anything else goes through
+parse_date_strptime(), the original implementation, so the output is the same.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+DATE_FORMATS = ('%m/%d/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f')
+CACHE_SIZE = 8192
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def parse_date_strptime(date_str):
+    """Reference implementation: try each format with datetime.strptime()."""
+    if not date_str or not date_str.strip():
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str.strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+def _is_valid_day(year, month, day):
+    if not 1 <= month <= 12 or day < 1:
+        return False
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return day <= 29
+    return day <= _DAYS_IN_MONTH[month - 1]
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(date_str):
+    """Normalize a date string to YYYY-MM-DD, or None if it can't be parsed."""
+    if not date_str:
+        return None
+    s = date_str.strip()
+    if len(s) == 10 and s.isascii():
+        if s[2] == '/' and s[5] == '/':
+            month, day, year = s[0:2], s[3:5], s[6:10]
+        elif s[4] == '-' and s[7] == '-':
+            year, month, day = s[0:4], s[5:7], s[8:10]
+        else:
+            year = None
+        # strftime('%Y') doesn't zero-pad years before 1000, leave those to strptime
+        if year and (year + month + day).isdigit() and year >= '1000' \
+                and _is_valid_day(int(year), int(month), int(day)):
+            return f"{year}-{month}-{day}"
+    return parse_date_strptime(date_str)
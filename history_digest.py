@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-voter election history digests, shared by the importer and the compare tool.
+
+A voter's digest is the sum of a 48-bit content hash of each of their
+(ElectionDate, ElectionDescription, VotingMethod) records. It doesn't depend on
+record order or on the ElectionIds a database happened to assign, so two
+snapshots can be compared voter by voter with one integer comparison and only
+the voters whose digest differs need a record-level diff. Voters without
+election history have no digest row.
+
+The importer stores the digests in DIGEST_TABLE; for databases without it they
+can be built on demand (into a TEMP table for read-only connections):
+
+    build_history_digests(conn, "db_old", "temp.old_history_digests")
+
+Changing record_digest() means bumping DIGEST_VERSION, which renames the
+table so digests of different versions are never compared.
+"""
+
+import hashlib
+
+DIGEST_VERSION = 1
+DIGEST_TABLE = f"history_digests_v{DIGEST_VERSION}"
+DIGEST_DDL = "CREATE TABLE IF NOT EXISTS {table} (VoterId INTEGER PRIMARY KEY, Digest INTEGER NOT NULL)"
+
+# 48-bit record hashes leave room to sum 2**15 records in a signed 64-bit integer
+RECORD_DIGEST_BYTES = 6
+
+def record_digest(date, description, method):
+    """Content hash of one election record; registered as the SQL function record_digest()."""
+    digest = hashlib.blake2b(repr((date, description, method)).encode('utf-8'),
+                             digest_size=RECORD_DIGEST_BYTES).digest()
+    return int.from_bytes(digest, 'big')
+
+def has_table(conn, schema, table):
+    return conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type IN ('table', 'view') AND name = ?",
+                        (table,)).fetchone() is not None
+
+def has_history_digests(conn, schema="main"):
+    return has_table(conn, schema, DIGEST_TABLE)
+
+def build_history_digests(conn, schema="main", table=DIGEST_TABLE, voters_sql=None, params=()):
+    """
+    (Re)build the digests of the voters in `schema` into `table`, created if
+    missing. `voters_sql` optionally limits this to the VoterIds it selects;
+    other rows of `table` are left alone.
+    """
+    conn.create_function("record_digest", 3, record_digest, deterministic=True)
+    conn.execute(DIGEST_DDL.format(table=table))
+    voter_filter = f"VoterId IN ({voters_sql})" if voters_sql else "1"
+    conn.execute(f"DELETE FROM {table} WHERE {voter_filter}", params)
+
+    if has_table(conn, schema, "election_votes"):
+        # Normalized layout: hash each (election, method) pair once and sum the
+        # pair digests along the election_votes primary key (already in VoterId order).
+        conn.execute("DROP TABLE IF EXISTS temp.record_digests")
+        conn.execute("""
+            CREATE TEMP TABLE record_digests (
+                ElectionId INTEGER, MethodId INTEGER, Digest INTEGER,
+                PRIMARY KEY (ElectionId, MethodId)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"""
+            INSERT INTO temp.record_digests
+            SELECT e.ElectionId, m.MethodId, record_digest(e.ElectionDate, e.ElectionDescription, m.VotingMethod)
+            FROM {schema}.elections e CROSS JOIN {schema}.voting_methods m
+        """)
+        conn.execute(f"""
+            INSERT INTO {table}
+            SELECT ev.VoterId, SUM(r.Digest)
+            FROM {schema}.election_votes ev
+            CROSS JOIN temp.record_digests r ON r.ElectionId = ev.ElectionId AND r.MethodId = ev.MethodId
+            WHERE {voter_filter}
+            GROUP BY ev.VoterId
+        """, params)
+        conn.execute("DROP TABLE temp.record_digests")
+    else:
+        conn.execute(f"""
+            INSERT INTO {table}
+            SELECT VoterId, SUM(record_digest(ElectionDate, ElectionDescription, VotingMethod))
+            FROM {schema}.election_history
+            WHERE VoterId IS NOT NULL AND {voter_filter}
+            GROUP BY VoterId
+        """, params)
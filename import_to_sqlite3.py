@@ -5,189 +5,635 @@ import sqlite3
 import csv
 import chardet
 import os
-from datetime import datetime
+import time
+import io
+import codecs
+import hashlib
+import argparse
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+
+from date_utils import parse_date
+import instrumentation
+from history_digest import DIGEST_DDL, DIGEST_TABLE, build_history_digests
+from name_search import (NO_TRIGRAM_NOTE, add_names, build_name_search, create_name_search, has_name_search,
+                         has_name_tables, remove_names)
+from turnout import TURNOUT_DDL, add_turnout, build_turnout, remove_turnout, turnout_table
 
 # Force UTF-8 for the entire process (essential on macOS Python 3.9)
 import locale
 locale.setlocale(locale.LC_ALL, 'C.UTF-8')
 
-def detect_encoding(file_path):
-    with open(file_path, 'rb') as f:
-        raw = f.read(100000)
-    result = chardet.detect(raw)
-    return result['encoding'] or 'utf-8'
+# Bulk-load tuning
+BATCH_SIZE = 50000        # rows handed to executemany() at once
+COMMIT_EVERY = 1000000    # rows per transaction (0 = one transaction for the whole import)
+CACHE_MB = 512            # page cache used while loading
+CHUNK_MB = 8              # size of the byte ranges handed to parser workers
+SCAN_BLOCK_BYTES = 4 * 1024 * 1024  # read size of the encoding/row-count scan
+CHARDET_SAMPLE_BYTES = 100000
+PROGRESS_EVERY = 100000   # rows between progress lines
 
-def parse_date(date_str):
-    if not date_str or not date_str.strip():
-        return None
-    for fmt in ('%m/%d/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f'):
+VOTER_COLUMNS = [
+    "VoterId", "CountyCode", "FirstName", "MiddleName", "LastName", "NameSuffix",
+    "HouseNumber", "StreetName", "UnitType", "UnitNumber", "Address2",
+    "City", "State", "ZipCode", "MailAddress", "MailCity", "MailState", "MailZipCode",
+    "PhoneNumber", "RegistrationDate", "DOBYear", "StateMcdCode", "McdName",
+    "PrecinctCode", "PrecinctName", "WardCode", "School", "SchSub", "Judicial",
+    "Legislative", "StateSen", "Congressional", "Commissioner", "Park",
+    "SoilWater", "Hospital", "LegacyId", "PermanentAbsentee"
+]
+
+VOTERS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        VoterId INTEGER PRIMARY KEY,
+        CountyCode TEXT, FirstName TEXT, MiddleName TEXT, LastName TEXT, NameSuffix TEXT,
+        HouseNumber TEXT, StreetName TEXT, UnitType TEXT, UnitNumber TEXT, Address2 TEXT,
+        City TEXT, State TEXT, ZipCode TEXT,
+        MailAddress TEXT, MailCity TEXT, MailState TEXT, MailZipCode TEXT,
+        PhoneNumber TEXT, RegistrationDate TEXT, DOBYear INTEGER,
+        StateMcdCode TEXT, McdName TEXT, PrecinctCode TEXT, PrecinctName TEXT,
+        WardCode TEXT, School TEXT, SchSub TEXT, Judicial TEXT, Legislative TEXT,
+        StateSen TEXT, Congressional TEXT, Commissioner TEXT, Park TEXT,
+        SoilWater TEXT, Hospital TEXT, LegacyId TEXT, PermanentAbsentee TEXT
+    )
+'''
+
+# Election history is stored as small integer facts: each distinct election and
+# voting method is interned once in a lookup table (see ElectionInterner).
+ELECTION_LOOKUP_DDL = [
+    '''CREATE TABLE IF NOT EXISTS elections (
+        ElectionId INTEGER PRIMARY KEY,
+        ElectionDate TEXT NOT NULL,
+        ElectionDescription TEXT NOT NULL,
+        UNIQUE (ElectionDate, ElectionDescription)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS voting_methods (
+        MethodId INTEGER PRIMARY KEY,
+        VotingMethod TEXT NOT NULL UNIQUE
+    )''',
+]
+
+# Keyed on the natural key (VoterId + election) and clustered by VoterId, so one
+# voter's history sits in adjacent pages. Records missing a key part are rejected
+# (and ignored on insert).
+ELECTION_VOTES_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        VoterId INTEGER,
+        ElectionId INTEGER,
+        MethodId INTEGER,
+        PRIMARY KEY (VoterId, ElectionId),
+        FOREIGN KEY (VoterId) REFERENCES voters(VoterId),
+        FOREIGN KEY (ElectionId) REFERENCES elections(ElectionId),
+        FOREIGN KEY (MethodId) REFERENCES voting_methods(MethodId)
+    ) WITHOUT ROWID
+'''
+
+# Keeps the original election_history shape for the report and compare scripts.
+# CROSS JOIN pins election_votes as the outer loop, so a VoterId filter becomes a
+# primary key range scan instead of one probe per election.
+ELECTION_HISTORY_VIEW = '''
+    CREATE VIEW IF NOT EXISTS election_history AS
+    SELECT ev.VoterId, e.ElectionDate, e.ElectionDescription, m.VotingMethod
+    FROM election_votes ev
+    CROSS JOIN elections e ON e.ElectionId = ev.ElectionId
+    CROSS JOIN voting_methods m ON m.MethodId = ev.MethodId
+'''
+
+# Bookkeeping for delta imports (see delta_import)
+TRACKING_DDL = [
+    '''CREATE TABLE IF NOT EXISTS import_runs (
+        RunId INTEGER PRIMARY KEY,
+        Mode TEXT, StartedAt TEXT, FinishedAt TEXT,
+        VoterRows INTEGER, ElectionRows INTEGER,
+        Inserted INTEGER, Updated INTEGER, Deleted INTEGER
+    )''',
+    '''CREATE TABLE IF NOT EXISTS changelog (
+        RunId INTEGER, TableName TEXT, ChangeType TEXT,
+        VoterId INTEGER, ElectionDate TEXT, ElectionDescription TEXT
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_changelog_run ON changelog(RunId, TableName, ChangeType)",
+    "CREATE TABLE IF NOT EXISTS voter_hashes (VoterId INTEGER PRIMARY KEY, RowHash INTEGER)",
+    '''CREATE TABLE IF NOT EXISTS election_hashes (
+        VoterId INTEGER, ElectionId INTEGER, RowHash INTEGER,
+        PRIMARY KEY (VoterId, ElectionId)
+    ) WITHOUT ROWID''',
+]
+
+INSERT_SQL = {
+    "voters": f"INSERT OR IGNORE INTO {{table}} VALUES ({','.join('?' * len(VOTER_COLUMNS))})",
+    "elections": "INSERT OR IGNORE INTO {table} VALUES (?,?,?)",
+}
+
+# Built after the data is loaded (see build_indexes), in this order.
+# election_votes needs none: its primary key starts with VoterId.
+INDEXES = {
+    "idx_fn": "CREATE INDEX IF NOT EXISTS idx_fn ON voters(FirstName)",
+    "idx_ln": "CREATE INDEX IF NOT EXISTS idx_ln ON voters(LastName)",
+    "idx_zip": "CREATE INDEX IF NOT EXISTS idx_zip ON voters(ZipCode)",
+    "idx_county": "CREATE INDEX IF NOT EXISTS idx_county ON voters(CountyCode)",
+    # Serves the case-insensitive name + zip lookup in voter_election_report
+    # (`LastName = ? COLLATE NOCASE AND FirstName = ? COLLATE NOCASE AND ZipCode = ?`).
+    "idx_name_nocase": "CREATE INDEX IF NOT EXISTS idx_name_nocase ON voters("
+                       "LastName COLLATE NOCASE, FirstName COLLATE NOCASE, ZipCode)",
+}
+
+# Indexes from earlier versions that no lookup uses anymore; dropped by build_indexes()
+RETIRED_INDEXES = ["idx_name_zip"]
+
+def voter_row(row):
+    """Convert a 38-column Voter file record into a tuple in `voters` column order."""
+    return (
+        int(row[0]) if row[0].strip() else None,
+        *row[1:19],
+        parse_date(row[19]),
+        int(row[20]) if row[20].strip() else None,
+        *row[21:38]
+    )
+
+def election_row(row):
+    """Convert a 4-column Election file record into a (VoterId, date, description, method) tuple."""
+    return (int(row[0]) if row[0].strip() else None, parse_date(row[1]), row[2], row[3])
+
+def apply_bulk_pragmas(conn, cache_mb=CACHE_MB, durable=False):
+    if durable:
+        # A delta import updates the live database in place: keep its journal
+        # (rollback or WAL, whichever it uses) so a crash can't corrupt it.
+        conn.execute("PRAGMA synchronous = NORMAL")
+    else:
+        # A full import is rebuilt from the source files if it dies half way,
+        # so durability is traded for speed while loading.
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(f"PRAGMA cache_size = -{cache_mb * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+def drop_indexes(conn, names):
+    for name in names:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+def build_indexes(conn, skip=(), rebuild=()):
+    """
+    Create every index in INDEXES except those in `skip`, then ANALYZE.
+    Indexes named in `rebuild` are dropped first so they are built from scratch.
+    """
+    print("Building indexes...\n")
+    drop_indexes(conn, RETIRED_INDEXES)
+    drop_indexes(conn, [name for name in rebuild if name not in skip])
+    for name, sql in INDEXES.items():
+        if name in skip:
+            print(f"   {name} skipped")
+            continue
+        started = time.perf_counter()
+        conn.execute(sql)
+        print(f"   {name} ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    conn.execute("ANALYZE")
+    conn.commit()
+    print(f"   ANALYZE ({time.perf_counter() - started:.1f}s)\n")
+
+# ==================== PARSING ====================
+# Each input file is split into newline-aligned byte ranges which are parsed
+# independently (optionally in a process pool) and written by a single writer.
+# Records must not contain embedded newlines, which holds for the MN SOS files.
+
+FileScan = namedtuple("FileScan", "encoding rows chunks")
+ChunkJob = namedtuple("ChunkJob", "kind fname path encoding file_rows start end is_first is_last")
+
+# kind -> (column count, row converter)
+SOURCES = {
+    "voters": (len(VOTER_COLUMNS), voter_row),
+    "elections": (4, election_row),
+}
+
+def scan_file(path, chunk_bytes=CHUNK_MB * 1024 * 1024):
+    """
+    Read a file once in large binary blocks to detect its encoding, count its
+    data rows and split it into (start, end) byte ranges ending on a newline;
+    the workers then read their own ranges to parse them.
+
+    Files that are entirely ASCII or valid UTF-8 are recognised without chardet;
+    otherwise chardet looks at the start of the file and at the bytes around
+    the first one that is not UTF-8.
+    Returns a FileScan.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    ascii_only = utf8_ok = True
+    sample = b''
+    newlines = 0
+    offset = 0
+    last_byte = b''
+    bounds = [0]
+
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(SCAN_BLOCK_BYTES)
+            if not block:
+                break
+            if len(sample) < CHARDET_SAMPLE_BYTES:
+                sample += block[:CHARDET_SAMPLE_BYTES - len(sample)]
+            if utf8_ok and not (ascii_only and block.isascii()):
+                ascii_only = False
+                try:
+                    decoder.decode(block)
+                except UnicodeDecodeError as e:
+                    utf8_ok = False
+                    # The bytes around the error, after those already in the sample
+                    start = max(e.start - CHARDET_SAMPLE_BYTES // 2, len(sample) - offset, 0)
+                    sample += block[start:e.start + CHARDET_SAMPLE_BYTES // 2]
+
+            newlines += block.count(b'\n')
+            while bounds[-1] + chunk_bytes < offset + len(block):
+                nl = block.find(b'\n', max(0, bounds[-1] + chunk_bytes - offset))
+                if nl < 0:
+                    break
+                bounds.append(offset + nl + 1)
+            offset += len(block)
+            last_byte = block[-1:]
+
+    if utf8_ok:
         try:
-            return datetime.strptime(date_str.strip(), fmt).strftime('%Y-%m-%d')
-        except ValueError:
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            utf8_ok = False
+
+    if ascii_only:
+        encoding = 'ascii'
+    elif utf8_ok:
+        encoding = 'utf-8-sig' if sample.startswith(codecs.BOM_UTF8) else 'utf-8'
+    else:
+        encoding = chardet.detect(sample)['encoding'] or 'utf-8'
+
+    if bounds[-1] < offset:
+        bounds.append(offset)
+    if b"\n".decode(encoding, errors="replace") != "\n":
+        # Not ASCII-compatible (e.g. UTF-16): the newline scan above doesn't apply
+        bounds = [0, offset]
+
+    records = newlines + (1 if last_byte not in (b'', b'\n') else 0)
+    return FileScan(encoding, max(records - 1, 0), list(zip(bounds, bounds[1:])))
+
+def parse_chunk(job):
+    """
+    Parse one byte range of an input file.
+    Returns (rows, bad_rows, record_count, seconds) where bad_rows holds
+    (record index within the chunk, message) pairs and seconds is
+    {"read": ..., "decode": ..., "parse": ...}.
+    """
+    started = time.perf_counter()
+    num_columns, convert = SOURCES[job.kind]
+
+    with open(job.path, 'rb') as f:
+        f.seek(job.start)
+        data = f.read(job.end - job.start)
+    read_done = time.perf_counter()
+    text = data.decode(job.encoding, errors='replace')
+    decode_done = time.perf_counter()
+    reader = csv.reader(io.StringIO(text, newline=None), quotechar='"', skipinitialspace=True)
+    if job.is_first:
+        next(reader, None)  # skip header
+
+    rows = []
+    bad_rows = []
+    records = 0
+    for records, row in enumerate(reader, start=1):
+        if len(row) != num_columns:
+            if job.kind == "voters":
+                bad_rows.append((records, f"wrong column count ({len(row)})"))
+            else:
+                bad_rows.append((records, "bad columns"))
             continue
-    return None
+        try:
+            rows.append(convert(row))
+        except Exception as e:
+            bad_rows.append((records, str(e)))
 
-def create_database(db_name="voters.db"):
-    conn = sqlite3.connect(db_name)
+    if job.kind == "elections":
+        # Insert in primary key order for page locality; the sort is stable so the
+        # first record for a duplicate key still wins.
+        rows.sort(key=lambda r: (r[0] or 0, r[1] or '', r[2] or ''))
+
+    seconds = {"read": read_done - started, "decode": decode_done - read_done,
+               "parse": time.perf_counter() - decode_done}
+    return rows, bad_rows, records, seconds
+
+def parse_results(jobs, workers=1):
+    """Yield (job, parse_chunk(job)) in job order, parsing up to 2 * workers chunks ahead."""
+    if workers <= 1:
+        for job in jobs:
+            yield job, parse_chunk(job)
+        return
+
+    jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = deque((job, pool.submit(parse_chunk, job)) for job in islice(jobs, workers * 2))
+        while window:
+            job, future = window.popleft()
+            for next_job in islice(jobs, 1):
+                window.append((next_job, pool.submit(parse_chunk, next_job)))
+            yield job, future.result()
+
+def bulk_insert(conn, sql, rows, batch_size=BATCH_SIZE, commit_every=COMMIT_EVERY, pending=0, timings=None):
+    """
+    Stream `rows` into `sql` with executemany() in chunks of `batch_size`.
+    Commits whenever `commit_every` rows have accumulated since the last commit.
+    Returns (rows_inserted, rows_pending_commit, rows_ignored) where rows_ignored
+    counts rows skipped by INSERT OR IGNORE (duplicate or missing keys).
+    """
+    timings = {} if timings is None else timings
     cur = conn.cursor()
+    rows = iter(rows)
+    inserted = ignored = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        started = time.perf_counter()
+        cur.executemany(sql, batch)
+        timings["insert"] = timings.get("insert", 0.0) + time.perf_counter() - started
+        inserted += cur.rowcount
+        ignored += len(batch) - cur.rowcount
+        pending += len(batch)
 
-    # Tables
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS voters (
-            VoterId INTEGER PRIMARY KEY,
-            CountyCode TEXT, FirstName TEXT, MiddleName TEXT, LastName TEXT, NameSuffix TEXT,
-            HouseNumber TEXT, StreetName TEXT, UnitType TEXT, UnitNumber TEXT, Address2 TEXT,
-            City TEXT, State TEXT, ZipCode TEXT,
-            MailAddress TEXT, MailCity TEXT, MailState TEXT, MailZipCode TEXT,
-            PhoneNumber TEXT, RegistrationDate TEXT, DOBYear INTEGER,
-            StateMcdCode TEXT, McdName TEXT, PrecinctCode TEXT, PrecinctName TEXT,
-            WardCode TEXT, School TEXT, SchSub TEXT, Judicial TEXT, Legislative TEXT,
-            StateSen TEXT, Congressional TEXT, Commissioner TEXT, Park TEXT,
-            SoilWater TEXT, Hospital TEXT, LegacyId TEXT, PermanentAbsentee TEXT
-        )
-    ''')
-
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS election_history (
-            VoterId INTEGER,
-            ElectionDate TEXT,
-            ElectionDescription TEXT,
-            VotingMethod TEXT,
-            FOREIGN KEY (VoterId) REFERENCES voters(VoterId)
-        )
-    ''')
+        if commit_every and pending >= commit_every:
+            started = time.perf_counter()
+            conn.commit()
+            timings["commit"] = timings.get("commit", 0.0) + time.perf_counter() - started
+            pending = 0
+    return inserted, pending, ignored
 
-    # Indexes (only once)
-    for sql in [
-        "CREATE INDEX IF NOT EXISTS idx_fn ON voters(FirstName);",
-        "CREATE INDEX IF NOT EXISTS idx_ln ON voters(LastName);",
-        "CREATE INDEX IF NOT EXISTS idx_zip ON voters(ZipCode);"
+def format_rate(rows, seconds):
+    return f"{rows / seconds:,.0f} rows/sec" if seconds > 0 else "- rows/sec"
+
+def plan_jobs(kind, files, chunk_bytes, timings):
+    jobs = []
+    for fname in files:
+        path = os.path.join(os.getcwd(), fname)
+        if not os.path.exists(path):
+            print(f"Warning: {fname} missing")
+            continue
+
+        started = time.perf_counter()
+        scan = scan_file(path, chunk_bytes)
+        timings["scan"] = timings.get("scan", 0.0) + time.perf_counter() - started
+
+        for i, (start, end) in enumerate(scan.chunks):
+            jobs.append(ChunkJob(kind, fname, path, scan.encoding, scan.rows, start, end,
+                                 i == 0, i == len(scan.chunks) - 1))
+    return jobs
+
+class Progress:
+    """Prints rows/sec and an ETA every PROGRESS_EVERY rows of the current file."""
+
+    def __init__(self, total_rows, every=PROGRESS_EVERY):
+        self.total_rows = total_rows
+        self.every = every
+        self.done = 0
+        self.started = time.perf_counter()
+        self.start_file(0)
+
+    def start_file(self, file_rows):
+        self.file_rows = file_rows
+        self.file_done = 0
+        self.file_started = time.perf_counter()
+
+    def advance(self, rows):
+        previous = self.file_done
+        self.file_done += rows
+        self.done += rows
+        if self.file_done // self.every == previous // self.every:
+            return
+
+        now = time.perf_counter()
+        file_rate = self.file_done / max(now - self.file_started, 1e-9)
+        rate = self.done / max(now - self.started, 1e-9)
+        pct = self.file_done / self.file_rows * 100 if self.file_rows else 100.0
+        file_eta = timedelta(seconds=int(max(self.file_rows - self.file_done, 0) / file_rate))
+        import_eta = timedelta(seconds=int(max(self.total_rows - self.done, 0) / rate))
+        print(f"   {self.file_done:,} of {self.file_rows:,} rows ({pct:.0f}%), {file_rate:,.0f} rows/sec, "
+              f"ETA {file_eta} (import ETA {import_eta})")
+
+def print_timings(timings, total):
+    print("Stage timings:")
+    for label, key in [
+        ("scan (enc, rows)", "scan"),
+        ("read (parsers)", "read"),
+        ("decode (parsers)", "decode"),
+        ("parse (parsers)", "parse"),
+        ("waiting on parsers", "wait"),
+        ("insert", "insert"),
+        ("commit", "commit"),
+        ("index build", "index"),
+        ("history digests", "digest"),
+        ("name search", "names"),
+        ("turnout", "turnout"),
+        ("delta compare", "compare"),
+        ("delta apply", "apply"),
     ]:
+        print(f"   {label:<20}: {timings.get(key, 0.0):8.1f}s")
+    print(f"   {'total (wall)':<20}: {total:8.1f}s")
+
+def migrate_election_history(conn):
+    """
+    Move an election_history table from an older layout into the normalized
+    elections/voting_methods/election_votes tables behind the election_history
+    view. Duplicate records keep their first occurrence; records missing a key
+    part are dropped. Returns the number of rows dropped, or None if there was
+    no election_history table to migrate.
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'election_history'").fetchone()
+    if row is None:
+        return None
+
+    print("Migrating election_history to the normalized election tables...")
+    started = time.perf_counter()
+    order_by = "" if "WITHOUT ROWID" in row[0].upper() else "ORDER BY h.rowid"
+    before = conn.execute("SELECT COUNT(*) FROM election_history").fetchone()[0]
+    conn.execute("DROP TABLE IF EXISTS election_history_old")
+    conn.execute("ALTER TABLE election_history RENAME TO election_history_old")
+    for sql in ELECTION_LOOKUP_DDL:
+        conn.execute(sql)
+    conn.execute(ELECTION_VOTES_DDL.format(table="election_votes"))
+    conn.execute(ELECTION_HISTORY_VIEW)
+    conn.execute("""
+        INSERT OR IGNORE INTO elections (ElectionDate, ElectionDescription)
+        SELECT DISTINCT ElectionDate, ElectionDescription FROM election_history_old
+        WHERE ElectionDate IS NOT NULL AND ElectionDescription IS NOT NULL
+        ORDER BY ElectionDate, ElectionDescription
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO voting_methods (VotingMethod)
+        SELECT DISTINCT VotingMethod FROM election_history_old WHERE VotingMethod IS NOT NULL ORDER BY VotingMethod
+    """)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO election_votes
+        SELECT h.VoterId, e.ElectionId, m.MethodId
+        FROM election_history_old h
+        JOIN elections e ON e.ElectionDate = h.ElectionDate AND e.ElectionDescription = h.ElectionDescription
+        JOIN voting_methods m ON m.VotingMethod = h.VotingMethod
+        {order_by}
+    """)
+    after = conn.execute("SELECT COUNT(*) FROM election_votes").fetchone()[0]
+    conn.execute("DROP TABLE election_history_old")
+    # Election hashes from the old layout are keyed differently; the next delta rebuilds them
+    conn.execute("DROP TABLE IF EXISTS election_hashes")
+    conn.commit()
+    print(f"   {before:,} rows → {after:,} rows ({before - after:,} duplicate/keyless rows dropped, "
+          f"{time.perf_counter() - started:.1f}s)\n")
+    return before - after
+
+class ElectionInterner:
+    """
+    Maps (ElectionDate, ElectionDescription) pairs and VotingMethod strings to the
+    integer ids in `elections` / `voting_methods`, adding unseen values as it goes.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.elections = {(date, description): election_id for election_id, date, description
+                          in conn.execute("SELECT ElectionId, ElectionDate, ElectionDescription FROM elections")}
+        self.methods = {method: method_id for method_id, method
+                        in conn.execute("SELECT MethodId, VotingMethod FROM voting_methods")}
+
+    def election_id(self, date, description):
+        if date is None or description is None:
+            return None
+        key = (date, description)
+        election_id = self.elections.get(key)
+        if election_id is None:
+            election_id = self.conn.execute(
+                "INSERT INTO elections (ElectionDate, ElectionDescription) VALUES (?, ?)", key).lastrowid
+            self.elections[key] = election_id
+        return election_id
+
+    def method_id(self, method):
+        if method is None:
+            return None
+        method_id = self.methods.get(method)
+        if method_id is None:
+            method_id = self.conn.execute("INSERT INTO voting_methods (VotingMethod) VALUES (?)", (method,)).lastrowid
+            self.methods[method] = method_id
+        return method_id
+
+    def encode(self, rows):
+        """Turn (VoterId, date, description, method) tuples into (VoterId, ElectionId, MethodId)."""
+        return [(voter_id, self.election_id(date, description), self.method_id(method))
+                for voter_id, date, description, method in rows]
+
+def create_tables(cur):
+    migrate_election_history(cur.connection)
+    cur.execute(VOTERS_DDL.format(table="voters"))
+    for sql in ELECTION_LOOKUP_DDL:
         cur.execute(sql)
+    cur.execute(ELECTION_VOTES_DDL.format(table="election_votes"))
+    cur.execute(ELECTION_HISTORY_VIEW)
+    # Per-voter history digests for the compare tool (see history_digest.py)
+    cur.execute(DIGEST_DDL.format(table=DIGEST_TABLE))
+    # Phonetic keys and trigram index for fuzzy name lookups (see name_search.py),
+    # if this SQLite has the trigram tokenizer
+    create_name_search(cur.connection)
+    # Turnout by county, precinct and district (see turnout.py)
+    for sql in TURNOUT_DDL:
+        cur.execute(sql)
+    for sql in TRACKING_DDL:
+        cur.execute(sql)
+
+def row_hash(*values):
+    """64-bit content hash of a row; registered as the SQL function row_hash()."""
+    digest = hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def start_run(conn, mode):
+    cur = conn.execute("INSERT INTO import_runs (Mode, StartedAt) VALUES (?, ?)",
+                       (mode, datetime.now().isoformat(timespec='seconds')))
+    return cur.lastrowid
 
+def finish_run(conn, run_id, totals, changes=None):
+    changes = changes or {}
+    conn.execute(
+        "UPDATE import_runs SET FinishedAt = ?, VoterRows = ?, ElectionRows = ?, "
+        "Inserted = ?, Updated = ?, Deleted = ? WHERE RunId = ?",
+        (datetime.now().isoformat(timespec='seconds'), totals["voters"], totals["elections"],
+         changes.get("INSERT"), changes.get("UPDATE"), changes.get("DELETE"), run_id)
+    )
+
+def load_snapshot(conn, tables, workers=1, chunk_mb=CHUNK_MB, batch_size=BATCH_SIZE,
+                  commit_every=COMMIT_EVERY, timings=None):
+    """
+    Parse the Voter/Election files in the current directory and insert them into
+    tables["voters"] / tables["elections"]. Returns (totals, errors); totals also
+    holds the number of duplicate/keyless rows dropped per kind under "<kind>_dropped".
+    """
+    timings = {} if timings is None else timings
     voter_files = [f"Voter{i:02d}.txt" for i in range(1, 9)]
     election_files = [f"Election{i:02d}.txt" for i in range(1, 9)]
 
-    total_voters = 0
-    total_elections = 0
+    totals = {"voters": 0, "elections": 0, "voters_dropped": 0, "elections_dropped": 0}
+    interner = ElectionInterner(conn)
+    pending = 0
     errors = []
 
-    print("Starting voter import...\n")
+    chunk_bytes = max(1, int(chunk_mb * 1024 * 1024))
+    jobs = plan_jobs("voters", voter_files, chunk_bytes, timings) + \
+        plan_jobs("elections", election_files, chunk_bytes, timings)
 
-    # ==================== VOTER FILES ====================
-    for fname in voter_files:
-        path = os.path.join(os.getcwd(), fname)
-        if not os.path.exists(path):
-            print(f"Warning: {fname} missing")
-            continue
+    total_rows = sum(job.file_rows for job in jobs if job.is_first)
+    progress = Progress(total_rows)
+    print(f"Starting voter import: {total_rows:,} rows in {sum(job.is_first for job in jobs)} files "
+          f"({workers} parser worker{'s' if workers != 1 else ''})...\n")
 
-        enc = detect_encoding(path)
-        print(f"→ {fname} (encoding: {enc})")
+    current_kind = "voters"
+    file_records = file_rows = 0
+    file_started = time.perf_counter()
+    results = parse_results(jobs, workers)
+    while True:
+        started = time.perf_counter()
+        job, (rows, bad_rows, records, parse_seconds) = next(results, (None, (None, None, None, None)))
+        timings["wait"] = timings.get("wait", 0.0) + time.perf_counter() - started
+        if job is None:
+            break
+        for key, seconds in parse_seconds.items():
+            timings[key] = timings.get(key, 0.0) + seconds
 
-        # Optional row count (safe)
-        try:
-            with open(path, 'r', encoding=enc, errors='replace') as f:
-                rows = sum(1 for _ in csv.reader(f, quotechar='"', skipinitialspace=True))
-                row_count = next(rows)  # header
-                row_count = sum(rows)
-            print(f"   {row_count:,} rows to import")
-        except:
-            row_count = "?"
-
-        # Actual import
-        with open(path, 'r', encoding=enc, errors='replace') as f:
-            reader = csv.reader(f, quotechar='"', skipinitialspace=True)
-            next(reader, None)  # skip header
-
-            imported_this_file = 0
-            for line_num, row in enumerate(reader, start=2):
-                if len(row) != 38:
-                    errors.append(f"{fname}:{line_num} wrong column count ({len(row)})")
-                    continue
+        if job.is_first:
+            if job.kind != current_kind and job.kind == "elections":
+                print("Processing election history files...\n")
+            current_kind = job.kind
+            print(f"→ {job.fname} (encoding: {job.encoding})")
+            print(f"   {job.file_rows:,} rows to import")
+            progress.start_file(job.file_rows)
+            file_records = file_rows = 0
+            file_started = time.perf_counter()
 
-                try:
-                    data = {
-                        "VoterId": int(row[0]) if row[0].strip() else None,
-                        "CountyCode": row[1], "FirstName": row[2], "MiddleName": row[3],
-                        "LastName": row[4], "NameSuffix": row[5], "HouseNumber": row[6],
-                        "StreetName": row[7], "UnitType": row[8], "UnitNumber": row[9],
-                        "Address2": row[10], "City": row[11], "State": row[12], "ZipCode": row[13],
-                        "MailAddress": row[14], "MailCity": row[15], "MailState": row[16],
-                        "MailZipCode": row[17], "PhoneNumber": row[18],
-                        "RegistrationDate": parse_date(row[19]),
-                        "DOBYear": int(row[20]) if row[20].strip() else None,
-                        "StateMcdCode": row[21], "McdName": row[22], "PrecinctCode": row[23],
-                        "PrecinctName": row[24], "WardCode": row[25], "School": row[26],
-                        "SchSub": row[27], "Judicial": row[28], "Legislative": row[29],
-                        "StateSen": row[30], "Congressional": row[31], "Commissioner": row[32],
-                        "Park": row[33], "SoilWater": row[34], "Hospital": row[35],
-                        "LegacyId": row[36], "PermanentAbsentee": row[37]
-                    }
-
-                    cur.execute('''
-                        INSERT OR IGNORE INTO voters VALUES (
-                            :VoterId,:CountyCode,:FirstName,:MiddleName,:LastName,:NameSuffix,
-                            :HouseNumber,:StreetName,:UnitType,:UnitNumber,:Address2,
-                            :City,:State,:ZipCode,:MailAddress,:MailCity,:MailState,:MailZipCode,
-                            :PhoneNumber,:RegistrationDate,:DOBYear,:StateMcdCode,:McdName,
-                            :PrecinctCode,:PrecinctName,:WardCode,:School,:SchSub,:Judicial,
-                            :Legislative,:StateSen,:Congressional,:Commissioner,:Park,
-                            :SoilWater,:Hospital,:LegacyId,:PermanentAbsentee
-                        )
-                    ''', data)
-
-                    imported_this_file += 1
-                    total_voters += 1
-
-                    if imported_this_file % 100000 == 0:
-                        print(f"   {imported_this_file:,} rows so far...")
-
-                except Exception as e:
-                    errors.append(f"{fname}:{line_num} {e}")
-
-            print(f"Finished {fname} → {imported_this_file:,} voters added\n")
-
-    # ==================== ELECTION FILES ====================
-    print("Processing election history files...\n")
-    for fname in election_files:
-        path = os.path.join(os.getcwd(), fname)
-        if not os.path.exists(path):
-            print(f"Warning: {fname} missing")
-            continue
-
-        enc = detect_encoding(path)
-        print(f"→ {fname} (encoding: {enc})")
+        for index, message in bad_rows:
+            errors.append(f"{job.fname}:{file_records + index + 1} {message}")
 
-        with open(path, 'r', encoding=enc, errors='replace') as f:
-            reader = csv.reader(f, quotechar='"', skipinitialspace=True)
-            next(reader, None)  # header
+        sql = INSERT_SQL[job.kind].format(table=tables[job.kind])
+        if job.kind == "elections":
+            rows = interner.encode(rows)
+        inserted, pending, ignored = bulk_insert(conn, sql, rows, batch_size, commit_every, pending, timings)
+        progress.advance(records)
+        file_records += records
+        file_rows += inserted
+        totals[job.kind] += inserted
+        totals[job.kind + "_dropped"] += ignored
 
-            cnt = 0
-            for line_num, row in enumerate(reader, start=2):
-                if len(row) != 4:
-                    errors.append(f"{fname}:{line_num} bad columns")
-                    continue
-                try:
-                    cur.execute(
-                        "INSERT OR IGNORE INTO election_history VALUES (?,?,?,?)",
-                        (int(row[0]) if row[0].strip() else None,
-                         parse_date(row[1]),
-                         row[2], row[3])
-                    )
-                    cnt += 1
-                    total_elections += 1
-                except Exception as e:
-                    errors.append(f"{fname}:{line_num} {e}")
-
-            print(f"   {cnt:,} election records imported\n")
+        if job.is_last:
+            elapsed = time.perf_counter() - file_started
+            if job.kind == "voters":
+                print(f"Finished {job.fname} → {file_rows:,} voters added "
+                      f"({elapsed:.1f}s, {format_rate(file_rows, elapsed)})\n")
+            else:
+                print(f"   {file_rows:,} election records imported ({elapsed:.1f}s, {format_rate(file_rows, elapsed)})\n")
 
+    started = time.perf_counter()
     conn.commit()
-    conn.close()
+    timings["commit"] = timings.get("commit", 0.0) + time.perf_counter() - started
+    return totals, errors
 
-    print("="*60)
-    print("IMPORT COMPLETED SUCCESSFULLY")
-    print(f"Total voters imported     : {total_voters:,}")
-    print(f"Total election records    : {total_elections:,}")
+def print_errors(errors):
     if errors:
         print(f"Warnings/Errors           : {len(errors)} (first 10)")
         for e in errors[:10]:
@@ -195,5 +641,337 @@ def create_database(db_name="voters.db"):
     else:
         print("No errors!")
 
+def create_database(db_name="voters.db", batch_size=BATCH_SIZE, commit_every=COMMIT_EVERY, cache_mb=CACHE_MB,
+                    skip_indexes=(), workers=1, chunk_mb=CHUNK_MB, trace=None):
+    """
+    Full import of the snapshot in the current directory. With an
+    instrumentation.QueryTrace, the statements of the stages after the bulk
+    load are traced. Returns the stage timings.
+    """
+    conn = sqlite3.connect(db_name)
+    apply_bulk_pragmas(conn, cache_mb)
+    create_tables(conn.cursor())
+    run_id = start_run(conn, "full")
+
+    # Row hashes are (re)built from the tables by the next delta import
+    conn.execute("DELETE FROM voter_hashes")
+    conn.execute("DELETE FROM election_hashes")
+
+    # Indexes are built once the data is in; drop any left over from an earlier
+    # run so the inserts below don't have to maintain them row by row.
+    drop_indexes(conn, [name for name in INDEXES if name not in skip_indexes])
+
+    timings = {}
+    import_start = time.perf_counter()
+    totals, errors = load_snapshot(conn, {"voters": "voters", "elections": "election_votes"},
+                                   workers, chunk_mb, batch_size, commit_every, timings)
+
+    # Not before: the trace callback would run for every executemany() row
+    if trace:
+        trace.attach(conn)
+    with instrumentation.stage(timings, "index", trace):
+        build_indexes(conn, skip=skip_indexes)
+
+    with instrumentation.stage(timings, "digest", trace):
+        build_history_digests(conn)
+        conn.commit()
+
+    with instrumentation.stage(timings, "names", trace):
+        if not build_name_search(conn):
+            print(NO_TRIGRAM_NOTE)
+        conn.commit()
+
+    with instrumentation.stage(timings, "turnout", trace):
+        build_turnout(conn)
+        conn.commit()
+    finish_run(conn, run_id, totals)
+    conn.commit()
+    if trace:
+        trace.detach(conn)
+    conn.close()
+    import_elapsed = time.perf_counter() - import_start
+
+    print("="*60)
+    print("IMPORT COMPLETED SUCCESSFULLY")
+    print(f"Total voters imported     : {totals['voters']:,}")
+    print(f"Total election records    : {totals['elections']:,}")
+    print(f"Duplicates dropped        : {totals['voters_dropped']:,} voters, "
+          f"{totals['elections_dropped']:,} election records")
+    print(f"Elapsed                   : {import_elapsed:.1f}s "
+          f"({format_rate(sum(totals.values()), import_elapsed)})")
+    print_errors(errors)
+    print()
+    print_timings(timings, import_elapsed)
+    return timings
+
+# ==================== DELTA IMPORT ====================
+# A delta import loads the new snapshot into staging tables, compares per-row
+# content hashes against the ones stored for the current data, and applies
+# only the inserted/updated/deleted rows. Every change is logged in `changelog`.
+
+VOTER_HASH_SQL = f"row_hash({', '.join(VOTER_COLUMNS)})"
+ELECTION_KEY = "VoterId, ElectionId"
+ELECTION_HASH_SQL = "row_hash(VoterId, ElectionId, MethodId)"
+
+def bootstrap_hashes(conn):
+    """Hash the current tables if no delta import has run since the last full import."""
+    if conn.execute("SELECT 1 FROM voter_hashes LIMIT 1").fetchone() is None:
+        conn.execute(f"INSERT INTO voter_hashes SELECT VoterId, {VOTER_HASH_SQL} FROM voters")
+    if conn.execute("SELECT 1 FROM election_hashes LIMIT 1").fetchone() is None:
+        conn.execute(f"INSERT INTO election_hashes SELECT {ELECTION_KEY}, {ELECTION_HASH_SQL} FROM election_votes")
+    # Databases imported before history digests existed
+    if conn.execute(f"SELECT 1 FROM {DIGEST_TABLE} LIMIT 1").fetchone() is None:
+        build_history_digests(conn)
+    # ... or the name search indexes
+    if not has_name_search(conn) and not build_name_search(conn):
+        print(NO_TRIGRAM_NOTE)
+    # ... or the turnout aggregates
+    if conn.execute(f"SELECT 1 FROM {turnout_table('county')} LIMIT 1").fetchone() is None:
+        build_turnout(conn)
+
+def log_changes(conn, run_id):
+    """Record the differences between the staged snapshot and the current data."""
+    conn.execute("""
+        INSERT INTO changelog (RunId, TableName, ChangeType, VoterId)
+        SELECT ?, 'voters', CASE WHEN h.VoterId IS NULL THEN 'INSERT' ELSE 'UPDATE' END, s.VoterId
+        FROM stage_voter_hashes s
+        LEFT JOIN voter_hashes h ON h.VoterId = s.VoterId
+        WHERE h.RowHash IS NOT s.RowHash
+    """, (run_id,))
+    conn.execute("""
+        INSERT INTO changelog (RunId, TableName, ChangeType, VoterId)
+        SELECT ?, 'voters', 'DELETE', h.VoterId
+        FROM voter_hashes h
+        WHERE NOT EXISTS (SELECT 1 FROM stage_voter_hashes s WHERE s.VoterId = h.VoterId)
+    """, (run_id,))
+    # Election changes are logged with the readable key rather than the ElectionId
+    conn.execute(f"""
+        INSERT INTO changelog (RunId, TableName, ChangeType, VoterId, ElectionDate, ElectionDescription)
+        SELECT ?, 'election_history', CASE WHEN h.VoterId IS NULL THEN 'INSERT' ELSE 'UPDATE' END,
+               s.VoterId, e.ElectionDate, e.ElectionDescription
+        FROM stage_election_hashes s
+        JOIN elections e ON e.ElectionId = s.ElectionId
+        LEFT JOIN election_hashes h USING ({ELECTION_KEY})
+        WHERE h.RowHash IS NOT s.RowHash
+    """, (run_id,))
+    conn.execute("""
+        INSERT INTO changelog (RunId, TableName, ChangeType, VoterId, ElectionDate, ElectionDescription)
+        SELECT ?, 'election_history', 'DELETE', h.VoterId, e.ElectionDate, e.ElectionDescription
+        FROM election_hashes h
+        JOIN elections e ON e.ElectionId = h.ElectionId
+        WHERE NOT EXISTS (
+            SELECT 1 FROM stage_election_hashes s WHERE s.VoterId = h.VoterId AND s.ElectionId = h.ElectionId
+        )
+    """, (run_id,))
+
+def apply_changes(conn, run_id):
+    """Apply the changes logged for `run_id` to the data and hash tables."""
+    def changed(table, types):
+        placeholders = ",".join("?" * len(types))
+        if table == "voters":
+            return (f"SELECT VoterId FROM changelog WHERE RunId = ? AND TableName = 'voters' "
+                    f"AND ChangeType IN ({placeholders})", (run_id, *types))
+        return (f"""
+            SELECT c.VoterId, e.ElectionId FROM changelog c
+            JOIN elections e ON e.ElectionDate = c.ElectionDate AND e.ElectionDescription = c.ElectionDescription
+            WHERE c.RunId = ? AND c.TableName = 'election_history' AND c.ChangeType IN ({placeholders})
+        """, (run_id, *types))
+
+    # The name search indexes (where this SQLite has them) are given the old names
+    # before the rows change, and every voter with a change is taken out of the
+    # turnout aggregates
+    names = has_name_tables(conn)
+    sql, params = changed("voters", ("DELETE", "UPDATE"))
+    if names:
+        remove_names(conn, sql, params)
+    changed_voters = ("SELECT VoterId FROM changelog WHERE RunId = ?", (run_id,))
+    remove_turnout(conn, *changed_voters)
+
+    sql, params = changed("voters", ("DELETE",))
+    conn.execute(f"DELETE FROM voters WHERE VoterId IN ({sql})", params)
+    conn.execute(f"DELETE FROM voter_hashes WHERE VoterId IN ({sql})", params)
+
+    sql, params = changed("voters", ("INSERT", "UPDATE"))
+    conn.execute(f"INSERT OR REPLACE INTO voters SELECT * FROM stage_voters WHERE VoterId IN ({sql})", params)
+    conn.execute(f"INSERT OR REPLACE INTO voter_hashes SELECT * FROM stage_voter_hashes WHERE VoterId IN ({sql})",
+                 params)
+    if names:
+        add_names(conn, sql, params)
+
+    sql, params = changed("election_history", ("DELETE",))
+    conn.execute(f"DELETE FROM election_votes WHERE ({ELECTION_KEY}) IN ({sql})", params)
+    conn.execute(f"DELETE FROM election_hashes WHERE ({ELECTION_KEY}) IN ({sql})", params)
+
+    sql, params = changed("election_history", ("INSERT", "UPDATE"))
+    conn.execute(f"INSERT OR REPLACE INTO election_votes SELECT * FROM stage_election_votes WHERE ({ELECTION_KEY}) IN ({sql})",
+                 params)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO election_hashes
+        SELECT {ELECTION_KEY}, RowHash FROM stage_election_hashes
+        WHERE ({ELECTION_KEY}) IN ({sql})
+    """, params)
+
+    # Only voters with election changes need a new history digest
+    build_history_digests(conn, voters_sql="SELECT VoterId FROM changelog WHERE RunId = ? "
+                                           "AND TableName = 'election_history'", params=(run_id,))
+    # ... and the changed voters are counted again with their new records and areas
+    add_turnout(conn, *changed_voters)
+
+def drop_staging(conn):
+    for table in ("stage_voters", "stage_election_votes", "stage_voter_hashes", "stage_election_hashes"):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+def delta_import(db_name="voters.db", batch_size=BATCH_SIZE, commit_every=COMMIT_EVERY, cache_mb=CACHE_MB,
+                 workers=1, chunk_mb=CHUNK_MB, trace=None):
+    """
+    Bring an existing database up to date with the snapshot in the current
+    directory. Traces like create_database() and returns the stage timings.
+    """
+    conn = sqlite3.connect(db_name)
+    apply_bulk_pragmas(conn, cache_mb, durable=True)
+    # Staging holds a whole snapshot, keep it on disk rather than in memory
+    conn.execute("PRAGMA temp_store = FILE")
+    conn.create_function("row_hash", -1, row_hash, deterministic=True)
+    cur = conn.cursor()
+    create_tables(cur)
+    drop_staging(conn)
+    cur.execute(VOTERS_DDL.format(table="stage_voters"))
+    cur.execute(ELECTION_VOTES_DDL.format(table="stage_election_votes"))
+    run_id = start_run(conn, "delta")
+
+    timings = {}
+    import_start = time.perf_counter()
+    totals, errors = load_snapshot(conn, {"voters": "stage_voters", "elections": "stage_election_votes"},
+                                   workers, chunk_mb, batch_size, commit_every, timings)
+
+    print("Comparing against current data...\n")
+    if trace:
+        trace.attach(conn)
+    with instrumentation.stage(timings, "compare", trace):
+        bootstrap_hashes(conn)
+        cur.execute("CREATE TABLE stage_voter_hashes (VoterId INTEGER PRIMARY KEY, RowHash INTEGER)")
+        cur.execute(f"INSERT INTO stage_voter_hashes SELECT VoterId, {VOTER_HASH_SQL} FROM stage_voters")
+        cur.execute(f"""
+            CREATE TABLE stage_election_hashes (
+                VoterId INTEGER, ElectionId INTEGER, RowHash INTEGER,
+                PRIMARY KEY ({ELECTION_KEY})
+            ) WITHOUT ROWID
+        """)
+        cur.execute(f"INSERT INTO stage_election_hashes SELECT {ELECTION_KEY}, {ELECTION_HASH_SQL} FROM stage_election_votes")
+        log_changes(conn, run_id)
+
+    with instrumentation.stage(timings, "apply", trace):
+        apply_changes(conn, run_id)
+        drop_staging(conn)
+        changes = {"INSERT": 0, "UPDATE": 0, "DELETE": 0}
+        summary = cur.execute(
+            "SELECT TableName, ChangeType, COUNT(*) FROM changelog WHERE RunId = ? GROUP BY TableName, ChangeType",
+            (run_id,)
+        ).fetchall()
+        for _, change_type, count in summary:
+            changes[change_type] += count
+        finish_run(conn, run_id, totals, changes)
+        conn.commit()
+
+    conn.execute("PRAGMA optimize")
+    if trace:
+        trace.detach(conn)
+    conn.close()
+    import_elapsed = time.perf_counter() - import_start
+
+    print("="*60)
+    print("DELTA IMPORT COMPLETED SUCCESSFULLY")
+    print(f"Snapshot voters           : {totals['voters']:,}")
+    print(f"Snapshot election records : {totals['elections']:,}")
+    counts = {(table, change_type): count for table, change_type, count in summary}
+    for table in ("voters", "election_history"):
+        print(f"{table + ' changes':<26}: " + ", ".join(
+            f"{counts.get((table, change_type), 0):,} {label}"
+            for change_type, label in (("INSERT", "inserted"), ("UPDATE", "updated"), ("DELETE", "deleted"))))
+    print(f"Changelog run id          : {run_id}")
+    print(f"Elapsed                   : {import_elapsed:.1f}s")
+    print_errors(errors)
+    print()
+    print_timings(timings, import_elapsed)
+    return timings
+
 if __name__ == "__main__":
-    create_database()
+    parser = argparse.ArgumentParser(description="Import MN SOS Voter/Election files into a SQLite database.")
+    parser.add_argument("--db-name", default="voters.db", help="Database name (default: voters.db)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Parser processes; 1 parses in the writer process (default: 1)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_MB,
+                        help=f"Size of the file ranges handed to each parser (default: {CHUNK_MB})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Rows per executemany() batch (default: {BATCH_SIZE})")
+    parser.add_argument("--commit-every", type=int, default=COMMIT_EVERY,
+                        help=f"Rows per transaction, 0 for a single transaction (default: {COMMIT_EVERY})")
+    parser.add_argument("--cache-mb", type=int, default=CACHE_MB,
+                        help=f"SQLite page cache size in MB while loading (default: {CACHE_MB})")
+    parser.add_argument("--skip-index", action="append", default=[], choices=list(INDEXES), metavar="NAME",
+                        help="Do not build this index (repeatable). Choices: " + ", ".join(INDEXES))
+    parser.add_argument("--rebuild-index", action="append", default=[], choices=list(INDEXES), metavar="NAME",
+                        help="With --indexes-only, drop and rebuild this index (repeatable)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Apply only the rows that changed since the snapshot already in --db-name")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Only migrate an existing database's election_history to the normalized layout")
+    parser.add_argument("--indexes-only", action="store_true",
+                        help="Skip the import and only build missing/rebuilt indexes on an existing database")
+    parser.add_argument("--digests-only", action="store_true",
+                        help="Skip the import and only (re)build the per-voter history digests of an existing database")
+    parser.add_argument("--name-search-only", action="store_true",
+                        help="Skip the import and only (re)build the fuzzy name search indexes of an existing database")
+    parser.add_argument("--turnout-only", action="store_true",
+                        help="Skip the import and only (re)build the turnout aggregates of an existing database")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    # --trace covers full and delta imports
+    trace = instrumentation.trace_from_args(args)
+
+    with instrumentation.profiled(args.profile):
+        if args.migrate:
+            conn = sqlite3.connect(args.db_name)
+            if migrate_election_history(conn) is None:
+                print("election_history is already normalized, nothing to migrate.")
+            else:
+                # Give the space of the old table back to the filesystem
+                conn.execute("VACUUM")
+            conn.close()
+        elif args.indexes_only:
+            conn = sqlite3.connect(args.db_name)
+            build_indexes(conn, skip=args.skip_index, rebuild=args.rebuild_index)
+            conn.close()
+        elif args.digests_only:
+            conn = sqlite3.connect(args.db_name)
+            started = time.perf_counter()
+            build_history_digests(conn)
+            conn.commit()
+            count = conn.execute(f"SELECT COUNT(*) FROM {DIGEST_TABLE}").fetchone()[0]
+            print(f"Built history digests for {count:,} voters ({time.perf_counter() - started:.1f}s)")
+            conn.close()
+        elif args.name_search_only:
+            conn = sqlite3.connect(args.db_name)
+            started = time.perf_counter()
+            if build_name_search(conn):
+                conn.commit()
+                print(f"Built name search indexes ({time.perf_counter() - started:.1f}s)")
+            else:
+                print(NO_TRIGRAM_NOTE)
+            conn.close()
+        elif args.turnout_only:
+            conn = sqlite3.connect(args.db_name)
+            started = time.perf_counter()
+            build_turnout(conn)
+            conn.commit()
+            print(f"Built turnout aggregates ({time.perf_counter() - started:.1f}s)")
+            conn.close()
+        elif args.delta:
+            timings = delta_import(args.db_name, args.batch_size, args.commit_every, args.cache_mb,
+                                   workers=args.workers, chunk_mb=args.chunk_mb, trace=trace)
+            instrumentation.write_report(trace, args, timings)
+        else:
+            timings = create_database(args.db_name, args.batch_size, args.commit_every, args.cache_mb,
+                                      skip_indexes=args.skip_index, workers=args.workers, chunk_mb=args.chunk_mb,
+                                      trace=trace)
+            instrumentation.write_report(trace, args, timings)
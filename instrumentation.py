@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optional instrumentation shared by the importer, the lookups and the compare
+tool, to see where a run's time goes:
+
+  stage(timings, key, trace)  adds a block's wall time to timings[key]
+  QueryTrace                  per-statement SQL timings from SQLite's trace and
+                              progress callbacks, grouped into named sections
+  profiled(path)              runs a block under cProfile and dumps the stats
+
+Statement tracing is only installed when asked for: --trace / --trace-json on
+the command line tools, VOTERS_TRACE=1 for lookups served by app.py and
+async_server.py (reported at /trace/stats). Otherwise every hook is a None
+check, and no callback is set on any connection.
+
+A statement is timed from when SQLite starts it (trace callback) until the
+next statement on the same thread starts or its section ends, so fetching its
+rows counts towards it. The progress callback counts SQLite VM instructions
+per statement, in units of PROGRESS_STEPS, which tells SQLite's own work
+apart from Python handling the rows. The trace callback sees statements with
+their parameters expanded, so they are grouped with the literals as '?'.
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+
+TRACE_ENV = "VOTERS_TRACE"   # "1" traces the lookups of app.py / async_server.py
+PROGRESS_STEPS = 1000        # VM instructions between progress callbacks
+TOP_STATEMENTS = 5           # slowest statements printed per section
+NO_SECTION = "(no section)"
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+ROW_LISTS = re.compile(r"\(\?(?:, \.\.\.)?\)(?:\s*,\s*\(\?(?:, \.\.\.)?\))+")
+SPACES = re.compile(r"\s+")
+
+# Shared do-nothing context for untraced blocks
+NOT_TRACED = contextlib.nullcontext()
+
+def statement_key(sql):
+    """`sql` with its literals as ? and whitespace collapsed: "... IN (?, ...)"."""
+    sql = LITERALS.sub("?", sql)
+    sql = PLACEHOLDER_LISTS.sub("?, ...", sql)
+    sql = ROW_LISTS.sub("(?, ...), ...", sql)
+    return SPACES.sub(" ", sql).strip()
+
+class QueryTrace:
+    """
+    SQL statement timings of the connections attached to it, by section.
+    Connections may be used from several threads; each thread has its own
+    current section and statement.
+    """
+
+    def __init__(self):
+        self.sections = {}     # section -> [entries, seconds]
+        self.statements = {}   # (section, statement key) -> [executions, seconds, progress calls]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, conn):
+        conn.set_trace_callback(self._statement_started)
+        conn.set_progress_handler(self._progress, PROGRESS_STEPS)
+
+    def detach(self, conn):
+        self._statement_finished()
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(None, PROGRESS_STEPS)
+
+    def _statement_started(self, sql):
+        # Trigger bodies are reported as "-- TRIGGER name"; they belong to the statement that fired them
+        if sql.startswith("--"):
+            return
+        now = time.perf_counter()
+        self._statement_finished(now)
+        self._local.statement = [sql, now, 0]
+
+    def _progress(self):
+        statement = getattr(self._local, "statement", None)
+        if statement is not None:
+            statement[2] += 1
+        return 0
+
+    def _statement_finished(self, now=None):
+        statement = getattr(self._local, "statement", None)
+        if statement is None:
+            return
+        self._local.statement = None
+        sql, started, steps = statement
+        elapsed = (now or time.perf_counter()) - started
+        key = (getattr(self._local, "section", None) or NO_SECTION, statement_key(sql))
+        with self._lock:
+            totals = self.statements.setdefault(key, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] += steps
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """Count the block's statements and wall time under `name`; sections accumulate over entries."""
+        self._statement_finished()
+        outer = getattr(self._local, "section", None)
+        self._local.section = name
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self._statement_finished()
+            elapsed = time.perf_counter() - started
+            self._local.section = outer
+            with self._lock:
+                totals = self.sections.setdefault(name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += elapsed
+
+    # ==================== RESULTS ====================
+
+    def to_dict(self):
+        with self._lock:
+            sections = {name: {"entries": entries, "seconds": round(seconds, 6)}
+                        for name, (entries, seconds) in self.sections.items()}
+            statements = [{"section": section, "sql": sql, "executions": executions,
+                           "seconds": round(seconds, 6), "vm_steps": steps * PROGRESS_STEPS}
+                          for (section, sql), (executions, seconds, steps) in self.statements.items()]
+        statements.sort(key=lambda s: -s["seconds"])
+        return {"sections": sections, "statements": statements}
+
+    def take(self):
+        """to_dict(), and start over; for worker processes handing their share to the parent."""
+        data = self.to_dict()
+        with self._lock:
+            self.sections.clear()
+            self.statements.clear()
+        return data
+
+    def merge(self, data):
+        """Add a to_dict() from another process."""
+        with self._lock:
+            for name, section in data["sections"].items():
+                totals = self.sections.setdefault(name, [0, 0.0])
+                totals[0] += section["entries"]
+                totals[1] += section["seconds"]
+            for s in data["statements"]:
+                totals = self.statements.setdefault((s["section"], s["sql"]), [0, 0.0, 0])
+                totals[0] += s["executions"]
+                totals[1] += s["seconds"]
+                totals[2] += s["vm_steps"] // PROGRESS_STEPS
+
+    def report(self, top=TOP_STATEMENTS):
+        """Lines of a printed report: sections by time, each with its slowest statements."""
+        data = self.to_dict()
+        by_section = {}
+        for s in data["statements"]:
+            by_section.setdefault(s["section"], []).append(s)
+        sections = dict(data["sections"])
+        for name, statements in by_section.items():
+            sections.setdefault(name, {"entries": 0, "seconds": sum(s["seconds"] for s in statements)})
+
+        lines = []
+        for name, section in sorted(sections.items(), key=lambda item: -item[1]["seconds"]):
+            entries = f" ({section['entries']:,}x)" if section["entries"] > 1 else ""
+            lines.append(f"   {name:<28}: {section['seconds']:9.3f}s{entries}")
+            for s in by_section.get(name, [])[:top]:
+                sql = s["sql"] if len(s["sql"]) <= 80 else s["sql"][:77] + "..."
+                lines.append(f"      {s['seconds']:9.3f}s {s['executions']:>7,}x {s['vm_steps']:>14,} steps  {sql}")
+        return lines
+
+# -------------------------------------------------
+@contextlib.contextmanager
+def stage(timings, key, trace=None):
+    """Add the block's wall time to timings[key]; with a trace, it is also section `key`."""
+    started = time.perf_counter()
+    try:
+        with (trace.section(key) if trace else NOT_TRACED):
+            yield
+    finally:
+        timings[key] = timings.get(key, 0.0) + time.perf_counter() - started
+
+@contextlib.contextmanager
+def _traced(trace, conn, section):
+    trace.attach(conn)
+    try:
+        with trace.section(section):
+            yield
+    finally:
+        trace.detach(conn)
+
+def traced(trace, conn, section):
+    """Trace `conn` into `section` for a block (pooled connections are detached after it); a no-op without a trace."""
+    return NOT_TRACED if trace is None else _traced(trace, conn, section)
+
+def trace_from_env():
+    return QueryTrace() if os.environ.get(TRACE_ENV) == "1" else None
+
+# ==================== COMMAND LINE ====================
+
+def add_arguments(parser):
+    parser.add_argument("--trace", action="store_true",
+                        help="Print SQL statement timings by section at the end")
+    parser.add_argument("--trace-json", metavar="FILE",
+                        help="Also write the stage and statement timings to FILE as JSON (implies --trace)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Run under cProfile (this process only) and write the stats to FILE")
+
+def trace_from_args(args):
+    return QueryTrace() if args.trace or args.trace_json else None
+
+def write_report(trace, args, timings=None):
+    """Print the trace, and write it with `timings` to --trace-json; nothing without a trace."""
+    if trace is None:
+        return
+    print("\nSQL by section (slowest statements first):")
+    for line in trace.report():
+        print(line)
+    if args.trace_json:
+        with open(args.trace_json, "w") as f:
+            json.dump({"timings": {key: round(seconds, 6) for key, seconds in (timings or {}).items()},
+                       **trace.to_dict()}, f, indent=2)
+        print(f"→ {args.trace_json}")
+
+@contextlib.contextmanager
+def profiled(path):
+    """Run the block under cProfile and dump the stats to `path` (python3 -m pstats reads them)."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"→ {path} (cProfile stats: python3 -m pstats {path})")
@@ -0,0 +1,71 @@
+"""
+Request handling shared by the JSON APIs of app.py (Flask) and async_server.py.
+
+Lookup parameters are first_name, last_name and zip_code, as in the HTML form.
+With fuzzy=1, /api/lookup returns ranked candidates for similar names instead
+(zip_code optional); see voter_fuzzy_report().
+
+A batch is answered from the cache where possible; only the misses go to the
+database, as one voter_election_reports() call:
+
+    reports, missed = cached_batch(cache, db_name, lookups)
+    if missed:
+        store_batch(cache, db_name, lookups, reports, missed,
+                    voter_election_reports(conn, [lookups[i] for i in missed]))
+"""
+
+from http import HTTPStatus
+
+from lookup_cache import lookup_key
+from voter_election_report import FUZZY_MISSING_PARAMS_ERROR, NO_NAME_SEARCH_ERROR
+
+MAX_BATCH_SIZE = 500
+
+BATCH_BODY_ERROR = ('Expected a JSON body like {"lookups": [{"first_name": ..., '
+                    '"last_name": ..., "zip_code": ...}, ...]}.')
+
+def lookup_params(data):
+    values = [data.get(name) for name in ("first_name", "last_name", "zip_code")]
+    return tuple(None if v is None else str(v) for v in values)
+
+def is_fuzzy(data):
+    return str(data.get("fuzzy", "")).lower() in ("1", "true", "yes")
+
+def fuzzy_status(report):
+    if "results" in report:
+        return HTTPStatus.OK
+    return {FUZZY_MISSING_PARAMS_ERROR: HTTPStatus.BAD_REQUEST,
+            NO_NAME_SEARCH_ERROR: HTTPStatus.NOT_IMPLEMENTED}.get(report["error"], HTTPStatus.NOT_FOUND)
+
+def batch_lookups(body):
+    """
+    (lookups, None) for a {"lookups": [...]} body, one (first, last, zip) per
+    item; (None, (status, error payload)) if it is not one.
+    """
+    items = body.get("lookups") if isinstance(body, dict) else None
+    if not isinstance(items, list):
+        return None, (HTTPStatus.BAD_REQUEST, {"error": BATCH_BODY_ERROR})
+    if len(items) > MAX_BATCH_SIZE:
+        return None, (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                      {"error": f"At most {MAX_BATCH_SIZE} lookups per batch, got {len(items)}."})
+    return [lookup_params(item) if isinstance(item, dict) else (None, None, None) for item in items], None
+
+def cached_batch(cache, db_name, lookups):
+    """The cached report of each lookup or None, and the indexes of the misses."""
+    reports = [None] * len(lookups)
+    missed = []
+    for i, (first_name, last_name, zip_code) in enumerate(lookups):
+        if all([first_name, last_name, zip_code]):
+            reports[i] = cache.get(lookup_key(db_name, first_name, last_name, zip_code))
+        if reports[i] is None:
+            missed.append(i)
+    return reports, missed
+
+def store_batch(cache, db_name, lookups, reports, missed, fresh):
+    """Fill in the `fresh` reports of the `missed` lookups, caching those that found someone."""
+    for i, report in zip(missed, fresh):
+        # "No voters found" errors echo the input as typed, and are cheap anyway
+        if "results" in report:
+            cache.put(lookup_key(db_name, *lookups[i]), report)
+        reports[i] = report
+    return reports
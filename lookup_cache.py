@@ -0,0 +1,110 @@
+"""
+Bounded LRU + TTL cache for voter lookups.
+
+The database only changes when it is re-imported, and the web form sees the
+same lookups over and over (people re-checking themselves, a few common
+names). Reports are cached under the normalized (first, last, zip) plus a
+fingerprint of the database file, so the first lookup after an import misses
+and old entries simply age out of the LRU.
+
+    cache = LookupCache(maxsize=4096, ttl=3600)
+    key = lookup_key("voters.db", first_name, last_name, zip_code)
+    report = cache.get(key)
+    if report is None:
+        report = voter_election_report(...)
+        cache.put(key, report)
+
+Cached values are shared between callers and must not be modified.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = 4096
+CACHE_TTL = 3600
+
+# The lookup matches names with COLLATE NOCASE, which folds ASCII letters only,
+# so the key must not fold anything else (str.lower() would merge 'É' and 'é').
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# The file is stat()ed at most this often (seconds) per database, so a busy
+# server doesn't pay a syscall per lookup; a re-import is noticed this late.
+FINGERPRINT_INTERVAL = 1.0
+
+_fingerprints = {}
+
+def db_fingerprint(db_name):
+    """(mtime_ns, size) of the database file; changes whenever an import writes it."""
+    now = time.monotonic()
+    checked = _fingerprints.get(db_name)
+    if checked is not None and now - checked[0] < FINGERPRINT_INTERVAL:
+        return checked[1]
+    try:
+        st = os.stat(db_name)
+        fingerprint = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        fingerprint = None
+    _fingerprints[db_name] = (now, fingerprint)
+    return fingerprint
+
+def lookup_key(db_name, first_name, last_name, zip_code):
+    return (first_name.translate(ASCII_LOWER), last_name.translate(ASCII_LOWER), zip_code, db_fingerprint(db_name))
+
+class LookupCache:
+    """
+    Thread-safe LRU mapping with an optional per-entry time to live (`ttl`
+    seconds, 0 for none). Counts hits, misses, LRU evictions and expirations.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for `key`, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
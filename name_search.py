@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fuzzy voter name search, shared by the importer and voter_election_report.
+
+The importer builds two indexes next to `voters`:
+
+  voter_name_keys   Soundex code of each part of the first name with the
+                    initial of the last name, and the other way round:
+                    JOHN SMITH gets 'FJ500S' and 'LS530J', as do JON SMITH
+                    and JOHN SMYTHE. Either name can be misspelt and the
+                    voter still shares a key with the typed name; voters
+                    sharing both keys sound alike on both names.
+  voter_names_fts   FTS5 trigram index over FirstName and LastName, with
+                    `voters` as its content table. It finds names containing
+                    what was typed ("JON" in "JONATHAN", "SMITH" in
+                    "SMITH-JONES") and answers LIKE '%...%' on those columns
+                    without scanning voters.
+
+fuzzy_candidates() looks candidates up in both and ranks them by name
+similarity, so a lookup is a handful of index searches whatever the size of
+the table.
+"""
+
+import re
+import sqlite3
+import unicodedata
+from difflib import SequenceMatcher
+
+NAME_KEYS_TABLE = "voter_name_keys"
+NAME_FTS_TABLE = "voter_names_fts"
+NAME_KEYS_DDL = f'''CREATE TABLE IF NOT EXISTS {NAME_KEYS_TABLE} (
+    NameKey TEXT NOT NULL,
+    VoterId INTEGER NOT NULL,
+    PRIMARY KEY (NameKey, VoterId)
+) WITHOUT ROWID'''
+NAME_FTS_DDL = f'''CREATE VIRTUAL TABLE IF NOT EXISTS {NAME_FTS_TABLE} USING fts5(
+    FirstName, LastName, content='voters', content_rowid='VoterId', tokenize='trigram'
+)'''
+
+NO_TRIGRAM_NOTE = (f"Note: SQLite {sqlite3.sqlite_version} has no FTS5 trigram tokenizer (needs 3.34+ with FTS5), "
+                   f"skipping the fuzzy name search indexes.")
+
+# Candidates looked up per source, and results returned, per fuzzy lookup
+CANDIDATE_LIMIT = 2000
+FUZZY_LIMIT = 20
+
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ["AEIOUY", "BFPV", "CGJKQSXZ", "DT", "L", "MN", "R"]) for letter in letters}
+
+def name_parts(name):
+    """The letter runs of a name, accents removed and upper-cased: "O'Brien-Smith" -> ['O', 'BRIEN', 'SMITH']."""
+    if not name:
+        return []
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.findall(r"[A-Z]+", folded.upper())
+
+def soundex(word):
+    """American Soundex of an upper-case A-Z word ("ROBERT" -> "R163")."""
+    digits = []
+    previous = SOUNDEX_CODES.get(word[0])
+    for letter in word[1:]:
+        if letter in "HW":
+            continue
+        code = SOUNDEX_CODES.get(letter)
+        if code != "0" and code != previous:
+            digits.append(code)
+        previous = code
+    return (word[0] + "".join(digits) + "000")[:4]
+
+def name_keys(first_name, last_name):
+    """Index keys of a name: "JOHN", "SMITH-JONES" -> ['FJ500J', 'FJ500S', 'LJ520J', 'LS530J']."""
+    first_parts, last_parts = name_parts(first_name), name_parts(last_name)
+    return sorted({"F" + soundex(f) + l[0] for f in first_parts for l in last_parts} |
+                  {"L" + soundex(l) + f[0] for f in first_parts for l in last_parts})
+
+def has_name_tables(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (NAME_FTS_TABLE,)).fetchone() is not None
+
+def has_name_search(conn):
+    """Whether the database has name search indexes (imports before they existed don't)."""
+    if not has_name_tables(conn):
+        return False
+    return conn.execute(f"SELECT 1 FROM {NAME_KEYS_TABLE} LIMIT 1").fetchone() is not None
+
+# ==================== BUILDING ====================
+
+def create_name_search(conn):
+    """
+    Create both index tables if missing. Returns False, creating neither, if
+    this SQLite can't create the FTS5 trigram table.
+    """
+    try:
+        conn.execute(NAME_FTS_DDL)
+    except sqlite3.OperationalError:
+        # "no such module: fts5" or "no such tokenizer: trigram" (before SQLite 3.34)
+        return False
+    conn.execute(NAME_KEYS_DDL)
+    return True
+
+def build_name_search(conn):
+    """(Re)build both indexes from `voters`; False if this SQLite can't (see create_name_search())."""
+    if not create_name_search(conn):
+        return False
+    conn.execute(f"DELETE FROM {NAME_KEYS_TABLE}")
+
+    # Soundex each distinct name once, then pair first and last name codes in SQL
+    # (CROSS JOIN keeps voters as the outer loop rather than pairing every code)
+    conn.execute("DROP TABLE IF EXISTS temp.name_part_codes")
+    conn.execute("CREATE TEMP TABLE name_part_codes (Kind TEXT, Name TEXT, Code TEXT, "
+                 "PRIMARY KEY (Kind, Name, Code)) WITHOUT ROWID")
+    for kind, column in (("F", "FirstName"), ("L", "LastName")):
+        names = conn.execute(f"SELECT DISTINCT {column} FROM voters WHERE {column} IS NOT NULL").fetchall()
+        conn.executemany("INSERT OR IGNORE INTO temp.name_part_codes VALUES (?, ?, ?)",
+                         ((kind, name, soundex(part)) for name, in names for part in name_parts(name)))
+    for key in ("'F' || f.Code || substr(l.Code, 1, 1)", "'L' || l.Code || substr(f.Code, 1, 1)"):
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {NAME_KEYS_TABLE}
+            SELECT {key}, v.VoterId
+            FROM voters v
+            CROSS JOIN temp.name_part_codes f ON f.Kind = 'F' AND f.Name = v.FirstName
+            CROSS JOIN temp.name_part_codes l ON l.Kind = 'L' AND l.Name = v.LastName
+            ORDER BY 1, 2
+        """)
+    conn.execute("DROP TABLE temp.name_part_codes")
+
+    conn.execute(f"INSERT INTO {NAME_FTS_TABLE}({NAME_FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+def voter_key_rows(rows):
+    return [(key, voter_id) for voter_id, first_name, last_name in rows
+            for key in name_keys(first_name, last_name)]
+
+def remove_names(conn, voters_sql, params=()):
+    """Take the voters selected by `voters_sql` out of both indexes; run before they change."""
+    rows = conn.execute(f"SELECT VoterId, FirstName, LastName FROM voters WHERE VoterId IN ({voters_sql})",
+                        params).fetchall()
+    conn.executemany(f"DELETE FROM {NAME_KEYS_TABLE} WHERE NameKey = ? AND VoterId = ?", voter_key_rows(rows))
+    # An external content FTS table must be given the exact indexed values to delete
+    conn.executemany(f"INSERT INTO {NAME_FTS_TABLE}({NAME_FTS_TABLE}, rowid, FirstName, LastName) "
+                     f"VALUES ('delete', ?, ?, ?)", rows)
+
+def add_names(conn, voters_sql, params=()):
+    """Index the voters selected by `voters_sql`; run after they are inserted or updated."""
+    rows = conn.execute(f"SELECT VoterId, FirstName, LastName FROM voters WHERE VoterId IN ({voters_sql})",
+                        params).fetchall()
+    conn.executemany(f"INSERT OR IGNORE INTO {NAME_KEYS_TABLE} VALUES (?, ?)", voter_key_rows(rows))
+    conn.executemany(f"INSERT INTO {NAME_FTS_TABLE}(rowid, FirstName, LastName) VALUES (?, ?, ?)", rows)
+
+# ==================== LOOKUP ====================
+
+def fts_query(column, name):
+    """FTS5 query for `column` containing every part of `name` (trigrams need at least 3 letters), or None."""
+    parts = [part for part in name_parts(name) if len(part) >= 3]
+    if not parts:
+        return None
+    return f"{column} : (" + " AND ".join(f'"{part}"' for part in parts) + ")"
+
+def similarity(typed, name):
+    """0..1 similarity of a typed name to a stored one; a multi-part name also matches on its best part."""
+    typed = " ".join(name_parts(typed))
+    parts = name_parts(name)
+    if not typed or not parts:
+        return 0.0
+    best = SequenceMatcher(None, typed, " ".join(parts)).ratio()
+    if len(parts) > 1:
+        best = max(best, 0.9 * max(SequenceMatcher(None, typed, part).ratio() for part in parts))
+    return best
+
+def fuzzy_candidates(conn, first_name, last_name, zip_code=None, limit=FUZZY_LIMIT):
+    """
+    [(score, VoterId)] of the voters whose name is close to the given one,
+    best first (ties by VoterId). With a `zip_code` only voters in it are
+    considered. Score is 0..1, 1 being the same name.
+    """
+    zip_join = "JOIN voters v ON v.VoterId = c.VoterId AND v.ZipCode = ?" if zip_code else \
+               "JOIN voters v ON v.VoterId = c.VoterId"
+    zip_params = [zip_code] if zip_code else []
+    candidates = {}
+
+    # A shared Soundex key; voters sharing the most keys first
+    keys = name_keys(first_name, last_name)
+    if keys:
+        rows = conn.execute(f"""
+            SELECT v.VoterId, v.FirstName, v.LastName
+            FROM (
+                SELECT VoterId, COUNT(*) AS Shared
+                FROM {NAME_KEYS_TABLE}
+                WHERE NameKey IN ({','.join('?' * len(keys))})
+                GROUP BY VoterId
+            ) c
+            {zip_join}
+            ORDER BY c.Shared DESC, c.VoterId
+            LIMIT ?
+        """, [*keys, *zip_params, CANDIDATE_LIMIT])
+        candidates.update((voter_id, (first, last)) for voter_id, first, last in rows)
+
+    # Names containing what was typed
+    match = fts_query("LastName", last_name)
+    if match:
+        first_match = fts_query("FirstName", first_name)
+        if first_match:
+            match += " AND " + first_match
+        rows = conn.execute(f"""
+            SELECT v.VoterId, v.FirstName, v.LastName
+            FROM (SELECT rowid AS VoterId FROM {NAME_FTS_TABLE} WHERE {NAME_FTS_TABLE} MATCH ?) c
+            {zip_join}
+            LIMIT ?
+        """, [match, *zip_params, CANDIDATE_LIMIT])
+        candidates.update((voter_id, (first, last)) for voter_id, first, last in rows)
+
+    ranked = sorted(((round(0.6 * similarity(last_name, last) + 0.4 * similarity(first_name, first), 3), voter_id)
+                     for voter_id, (first, last) in candidates.items()),
+                    key=lambda scored: (-scored[0], scored[1]))
+    return ranked[:limit]
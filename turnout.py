@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Turnout aggregates, built by the importer and read by the compare tool and
+data_analysis_tools/turnout_report.py.
+
+For each level in TURNOUT_LEVELS, turnout_by_<level> holds the number of
+voters who voted in each election by each voting method:
+
+    turnout_by_county         (CountyCode, ElectionId, MethodId, Voters)
+    turnout_by_precinct       (CountyCode, PrecinctCode, ElectionId, MethodId, Voters)
+    turnout_by_legislative    (Legislative, ElectionId, MethodId, Voters)
+    turnout_by_congressional  (Congressional, ElectionId, MethodId, Voters)
+
+A voter has at most one record per election, so summing Voters over the
+methods gives the number of distinct voters in an election. Areas are those of
+the voters' current registration; a missing code is stored as ''.
+
+The aggregates are computed in one pass over election_votes at the finest
+grain and rolled up into each level, so reports never rescan the history.
+"""
+
+TURNOUT_LEVELS = {
+    "county": ["CountyCode"],
+    "precinct": ["CountyCode", "PrecinctCode"],
+    "legislative": ["Legislative"],
+    "congressional": ["Congressional"],
+}
+
+# Finest grain every level is rolled up from
+BASE_COLUMNS = ["CountyCode", "PrecinctCode", "Legislative", "Congressional"]
+
+def turnout_table(level):
+    return f"turnout_by_{level}"
+
+def turnout_ddl(level):
+    columns = TURNOUT_LEVELS[level]
+    return f'''CREATE TABLE IF NOT EXISTS {turnout_table(level)} (
+        {", ".join(f"{name} TEXT NOT NULL" for name in columns)},
+        ElectionId INTEGER NOT NULL,
+        MethodId INTEGER NOT NULL,
+        Voters INTEGER NOT NULL,
+        PRIMARY KEY ({", ".join(columns)}, ElectionId, MethodId)
+    ) WITHOUT ROWID'''
+
+TURNOUT_DDL = [turnout_ddl(level) for level in TURNOUT_LEVELS]
+
+def has_turnout(conn, schema="main"):
+    """Whether `schema` has the turnout aggregates (imports before they existed don't)."""
+    tables = [turnout_table(level) for level in TURNOUT_LEVELS]
+    found = conn.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master WHERE type = 'table' "
+                         f"AND name IN ({','.join('?' * len(tables))})", tables).fetchone()[0]
+    return found == len(tables)
+
+def add_turnout(conn, voters_sql=None, params=(), sign=1):
+    """
+    Add the election records of the voters selected by `voters_sql` (all
+    voters by default) to the aggregates, or with sign=-1 take them out.
+    Counts that drop to zero are deleted.
+    """
+    voter_filter = f"ev.VoterId IN ({voters_sql})" if voters_sql else "1"
+    conn.execute("DROP TABLE IF EXISTS temp.turnout_base")
+    # CROSS JOIN keeps election_votes as the outer loop, read in primary key order
+    conn.execute(f"""
+        CREATE TEMP TABLE turnout_base AS
+        SELECT {", ".join(f"COALESCE(v.{name}, '') AS {name}" for name in BASE_COLUMNS)},
+               ev.ElectionId AS ElectionId, ev.MethodId AS MethodId, ? * COUNT(*) AS Voters
+        FROM election_votes ev
+        CROSS JOIN voters v ON v.VoterId = ev.VoterId
+        WHERE {voter_filter}
+        GROUP BY {", ".join(f"COALESCE(v.{name}, '')" for name in BASE_COLUMNS)}, ev.ElectionId, ev.MethodId
+    """, (sign, *params))
+
+    for level, columns in TURNOUT_LEVELS.items():
+        table = turnout_table(level)
+        keys = ", ".join(columns + ["ElectionId", "MethodId"])
+        # WHERE 1 resolves the parsing ambiguity of INSERT ... SELECT ... ON CONFLICT
+        conn.execute(f"""
+            INSERT INTO {table} ({keys}, Voters)
+            SELECT {keys}, SUM(Voters)
+            FROM temp.turnout_base
+            WHERE 1
+            GROUP BY {keys}
+            ON CONFLICT ({keys}) DO UPDATE SET Voters = Voters + excluded.Voters
+        """)
+        if sign < 0:
+            conn.execute(f"DELETE FROM {table} WHERE Voters = 0")
+    conn.execute("DROP TABLE temp.turnout_base")
+
+def remove_turnout(conn, voters_sql, params=()):
+    """Take the voters selected by `voters_sql` out of the aggregates; run before they change."""
+    add_turnout(conn, voters_sql, params, sign=-1)
+
+def build_turnout(conn):
+    """(Re)build every level from election_votes and voters."""
+    for sql in TURNOUT_DDL:
+        conn.execute(sql)
+    for level in TURNOUT_LEVELS:
+        conn.execute(f"DELETE FROM {turnout_table(level)}")
+    add_turnout(conn)
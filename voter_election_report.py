@@ -1,99 +1,264 @@
-import sqlite3
-from datetime import datetime
-
-def parse_date(date_str):
-    """Parse date string with flexible formats."""
-    if not date_str:
-        return None
-    for fmt in ('%m/%d/%Y', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
-        try:
-            return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    return None
+import instrumentation
+from connection_pool import connection
+from name_search import FUZZY_LIMIT, fuzzy_candidates, has_name_search
 
-def voter_election_report(db_name="voters.db", first_name=None, last_name=None, zip_code=None):
-    # Connect to the database
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
+# Predicate shared by both queries below; parameters are (last_name, first_name, zip_code)
+MATCH_WHERE = '''
+    v.LastName = ? COLLATE NOCASE
+    AND v.FirstName = ? COLLATE NOCASE
+    AND v.ZipCode = ?
+'''
 
-    # Validate input parameters
-    if not all([first_name, last_name, zip_code]):
-        conn.close()
-        return {"error": "FirstName, LastName, and ZipCode are required parameters."}
-
-    # Get all matching VoterIds
-    cursor.execute('''
-        SELECT DISTINCT v.VoterId
-        FROM voters v
-        WHERE 
-            LOWER(v.FirstName) = LOWER(?)
-            AND LOWER(v.LastName) = LOWER(?)
-            AND v.ZipCode = ?
-    ''', (first_name, last_name, zip_code))
-    voter_ids = cursor.fetchall()
-
-    if not voter_ids:
-        conn.close()
-        return {"error": f"No voters found with FirstName='{first_name}', LastName='{last_name}', ZipCode='{zip_code}'."}
+VOTER_COLUMNS_SQL = '''
+        VoterId, CountyCode, FirstName, MiddleName, LastName, NameSuffix, 
+        HouseNumber, StreetName, UnitType, UnitNumber, Address2, City, 
+        State, ZipCode, MailAddress, MailCity, MailState, MailZipCode, 
+        PhoneNumber, RegistrationDate, DOBYear, StateMcdCode, McdName, 
+        PrecinctCode, PrecinctName, WardCode, School, SchSub, Judicial, 
+        Legislative, StateSen, Congressional, Commissioner, Park, 
+        SoilWater, Hospital, LegacyId, PermanentAbsentee
+'''
 
-    results = []
-    # Process each VoterId
-    for voter_id in voter_ids:
-        voter_id = voter_id[0]
-
-        # Query all voter data
-        cursor.execute('''
-            SELECT 
-                VoterId, CountyCode, FirstName, MiddleName, LastName, NameSuffix, 
-                HouseNumber, StreetName, UnitType, UnitNumber, Address2, City, 
-                State, ZipCode, MailAddress, MailCity, MailState, MailZipCode, 
-                PhoneNumber, RegistrationDate, DOBYear, StateMcdCode, McdName, 
-                PrecinctCode, PrecinctName, WardCode, School, SchSub, Judicial, 
-                Legislative, StateSen, Congressional, Commissioner, Park, 
-                SoilWater, Hospital, LegacyId, PermanentAbsentee
-            FROM 
-                voters
-            WHERE 
-                VoterId = ?
-        ''', (voter_id,))
-        voter_data = cursor.fetchone()
-        all_headers = [description[0] for description in cursor.description]
-        voter_dict = dict(zip(all_headers, voter_data)) if voter_data else {}
+HISTORY_COLUMNS_SQL = '''
+        VoterId AS "Voter ID",
+        ElectionDate AS "Election Date",
+        ElectionDescription AS "Election Description",
+        VotingMethod AS "Voting Method"
+'''
+
+VOTERS_SQL = f'''
+    SELECT {VOTER_COLUMNS_SQL}
+    FROM 
+        voters v
+    WHERE {MATCH_WHERE}
+    ORDER BY 
+        VoterId
+'''
+
+HISTORY_SQL = f'''
+    SELECT {HISTORY_COLUMNS_SQL}
+    FROM 
+        election_history
+    WHERE 
+        VoterId IN (SELECT v.VoterId FROM voters v WHERE {MATCH_WHERE})
+    ORDER BY 
+        VoterId, ElectionDate DESC
+'''
+
+# Fuzzy lookups fetch the ranked candidates by VoterId; {ids} is a placeholder list
+VOTERS_BY_ID_SQL = f'''
+    SELECT {VOTER_COLUMNS_SQL}
+    FROM 
+        voters v
+    WHERE 
+        VoterId IN ({{ids}})
+'''
+
+HISTORY_BY_ID_SQL = f'''
+    SELECT {HISTORY_COLUMNS_SQL}
+    FROM 
+        election_history
+    WHERE 
+        VoterId IN ({{ids}})
+    ORDER BY 
+        VoterId, ElectionDate DESC
+'''
+
+# Batch lookups: the (first, last, zip) triples are joined in as a VALUES list.
+# CROSS JOIN keeps `wanted` as the outer loop so every triple is an index search.
+BATCH_WANTED_CTE = '''
+    WITH wanted(idx, WantedLast, WantedFirst, WantedZip) AS (VALUES {values})
+'''
 
-        # Define primary fields (current key info)
-        primary_fields = [
-            "VoterId", "FirstName", "MiddleName", "LastName", "ZipCode", 
-            "RegistrationDate", "DOBYear", "City", "State"
-        ]
-        primary_info = {k: voter_dict[k] for k in primary_fields if k in voter_dict}
+BATCH_MATCH_SQL = '''
+    FROM 
+        wanted w CROSS JOIN voters v
+        ON v.LastName = w.WantedLast COLLATE NOCASE
+        AND v.FirstName = w.WantedFirst COLLATE NOCASE
+        AND v.ZipCode = w.WantedZip
+'''
+
+BATCH_VOTERS_SQL = BATCH_WANTED_CTE + f'''
+    SELECT w.idx, {VOTER_COLUMNS_SQL}
+    {BATCH_MATCH_SQL}
+    ORDER BY 
+        w.idx, v.VoterId
+'''
+
+BATCH_HISTORY_SQL = BATCH_WANTED_CTE + f'''
+    SELECT {HISTORY_COLUMNS_SQL}
+    FROM 
+        election_history
+    WHERE 
+        VoterId IN (SELECT v.VoterId {BATCH_MATCH_SQL})
+    ORDER BY 
+        VoterId, ElectionDate DESC
+'''
+
+# Triples per batch statement; 3 parameters each stays under SQLite's historical
+# 999 bound-parameter limit.
+BATCH_CHUNK = 300
+
+MISSING_PARAMS_ERROR = "FirstName, LastName, and ZipCode are required parameters."
+FUZZY_MISSING_PARAMS_ERROR = "FirstName and LastName are required parameters."
+NO_NAME_SEARCH_ERROR = ("Fuzzy lookups need the name search indexes; "
+                        "build them with import_to_sqlite3.py --name-search-only.")
+TRACE_OFF_ERROR = "Lookup tracing is off; start the server with VOTERS_TRACE=1 to turn it on."
+
+PRIMARY_FIELDS = [
+    "VoterId", "FirstName", "MiddleName", "LastName", "ZipCode", 
+    "RegistrationDate", "DOBYear", "City", "State"
+]
+PRIMARY_FIELD_SET = frozenset(PRIMARY_FIELDS)
+
+# Per-statement timings of every lookup in this process when VOTERS_TRACE=1
+# (see instrumentation.py); None, and free, otherwise
+LOOKUP_TRACE = instrumentation.trace_from_env()
+
+def not_found_error(first_name, last_name, zip_code):
+    return f"No voters found with FirstName='{first_name}', LastName='{last_name}', ZipCode='{zip_code}'."
+
+def group_history(cursor):
+    """Group election history rows (VoterId first) into dicts per VoterId."""
+    election_headers = [description[0] for description in cursor.description]
+    histories = {}
+    for row in cursor.fetchall():
+        histories.setdefault(row[0], []).append(dict(zip(election_headers, row)))
+    return histories
+
+def build_results(voters, histories):
+    results = []
+    for voter_dict in voters:
+        # Primary fields (current key info)
+        primary_info = {k: voter_dict[k] for k in PRIMARY_FIELDS if k in voter_dict}
 
         # Additional details (all other fields)
-        additional_details = {k: v for k, v in voter_dict.items() if k not in primary_fields}
-
-        # Query election history
-        cursor.execute('''
-            SELECT 
-                VoterId AS "Voter ID",
-                ElectionDate AS "Election Date",
-                ElectionDescription AS "Election Description",
-                VotingMethod AS "Voting Method"
-            FROM 
-                election_history
-            WHERE 
-                VoterId = ?
-            ORDER BY 
-                ElectionDate DESC
-        ''', (voter_id,))
-        election_data = cursor.fetchall()
-        election_headers = [description[0] for description in cursor.description]
-        election_list = [dict(zip(election_headers, row)) for row in election_data] if election_data else []
+        additional_details = {k: v for k, v in voter_dict.items() if k not in PRIMARY_FIELD_SET}
 
         results.append({
             "voter_info": primary_info,
             "additional_details": additional_details,
-            "election_history": election_list
+            "election_history": histories.get(voter_dict["VoterId"], [])
         })
+    return results
 
-    conn.close()
-    return {"results": results}
\ No newline at end of file
+def voter_election_report(db_name="voters.db", first_name=None, last_name=None, zip_code=None, fuzzy=False):
+    """
+    `db_name` may be a database filename (opened and closed for this call), an
+    open sqlite3.Connection or a connection_pool.ReadOnlyConnectionPool.
+    With `fuzzy`, see voter_fuzzy_report().
+    """
+    if fuzzy:
+        return voter_fuzzy_report(db_name, first_name, last_name, zip_code)
+
+    # Validate input parameters
+    if not all([first_name, last_name, zip_code]):
+        return {"error": MISSING_PARAMS_ERROR}
+
+    with connection(db_name) as conn, instrumentation.traced(LOOKUP_TRACE, conn, "lookup"):
+        cursor = conn.cursor()
+
+        # Matching voters and all of their election history are fetched with one
+        # query each (instead of two per matched voter) and grouped here by VoterId.
+        # COLLATE NOCASE folds ASCII case like LOWER() did, but lets SQLite search
+        # idx_name_nocase instead of scanning.
+        cursor.execute(VOTERS_SQL, (last_name, first_name, zip_code))
+        all_headers = [description[0] for description in cursor.description]
+        voters = [dict(zip(all_headers, row)) for row in cursor.fetchall()]
+
+        if not voters:
+            return {"error": not_found_error(first_name, last_name, zip_code)}
+
+        cursor.execute(HISTORY_SQL, (last_name, first_name, zip_code))
+        histories = group_history(cursor)
+        cursor.close()
+
+    return {"results": build_results(voters, histories)}
+
+def voter_fuzzy_report(db_name="voters.db", first_name=None, last_name=None, zip_code=None, limit=FUZZY_LIMIT):
+    """
+    Up to `limit` voters with names like the given ones ("Jon" finds JOHN and
+    JONATHAN, "Smith" finds SMITH-JONES), in the zip code if one is given.
+    Shaped like voter_election_report()'s results, best match first, each with
+    a "match_score" from 0 to 1 (1 for the same name).
+    """
+    if not all([first_name, last_name]):
+        return {"error": FUZZY_MISSING_PARAMS_ERROR}
+
+    with connection(db_name) as conn, instrumentation.traced(LOOKUP_TRACE, conn, "fuzzy lookup"):
+        if not has_name_search(conn):
+            return {"error": NO_NAME_SEARCH_ERROR}
+        ranked = fuzzy_candidates(conn, first_name, last_name, zip_code, limit)
+        if not ranked:
+            return {"error": not_found_error(first_name, last_name, zip_code or "")}
+
+        ids = ",".join("?" * len(ranked))
+        voter_ids = [voter_id for _, voter_id in ranked]
+        cursor = conn.cursor()
+        cursor.execute(VOTERS_BY_ID_SQL.format(ids=ids), voter_ids)
+        all_headers = [description[0] for description in cursor.description]
+        voters = {row[0]: dict(zip(all_headers, row)) for row in cursor.fetchall()}
+        cursor.execute(HISTORY_BY_ID_SQL.format(ids=ids), voter_ids)
+        histories = group_history(cursor)
+        cursor.close()
+
+    ranked = [(score, voter_id) for score, voter_id in ranked if voter_id in voters]
+    results = build_results([voters[voter_id] for _, voter_id in ranked], histories)
+    for result, (score, _) in zip(results, ranked):
+        result["match_score"] = score
+    return {"results": results}
+
+def voter_election_reports(db_name, lookups):
+    """
+    Reports for many (first_name, last_name, zip_code) triples at once, in the
+    same order and each shaped like voter_election_report()'s return value.
+    The voters and histories of up to BATCH_CHUNK triples are fetched with one
+    query each, all inside a single read transaction; a connection passed in
+    that is already in a transaction is read within it and left as it was.
+    """
+    lookups = list(lookups)
+    wanted = {}
+    for first_name, last_name, zip_code in lookups:
+        if all([first_name, last_name, zip_code]):
+            wanted.setdefault((first_name, last_name, zip_code), len(wanted))
+    keys = list(wanted)
+    voters = [[] for _ in keys]
+    histories = {}
+
+    if keys:
+        with connection(db_name) as conn, instrumentation.traced(LOOKUP_TRACE, conn, "batch lookup"):
+            cursor = conn.cursor()
+            # Only a transaction started here is ours to end
+            own_transaction = not conn.in_transaction
+            if own_transaction:
+                cursor.execute("BEGIN")
+            try:
+                for start in range(0, len(keys), BATCH_CHUNK):
+                    chunk = keys[start:start + BATCH_CHUNK]
+                    values = ", ".join(["(?, ?, ?, ?)"] * len(chunk))
+                    params = [p for i, (first_name, last_name, zip_code) in enumerate(chunk, start)
+                              for p in (i, last_name, first_name, zip_code)]
+
+                    cursor.execute(BATCH_VOTERS_SQL.format(values=values), params)
+                    all_headers = [description[0] for description in cursor.description][1:]
+                    for row in cursor.fetchall():
+                        voters[row[0]].append(dict(zip(all_headers, row[1:])))
+
+                    cursor.execute(BATCH_HISTORY_SQL.format(values=values), params)
+                    histories.update(group_history(cursor))
+            finally:
+                if own_transaction:
+                    conn.rollback()
+                cursor.close()
+
+    reports = []
+    for first_name, last_name, zip_code in lookups:
+        if not all([first_name, last_name, zip_code]):
+            reports.append({"error": MISSING_PARAMS_ERROR})
+            continue
+        matched = voters[wanted[(first_name, last_name, zip_code)]]
+        if matched:
+            reports.append({"results": build_results(matched, histories)})
+        else:
+            reports.append({"error": not_found_error(first_name, last_name, zip_code)})
+    return reports
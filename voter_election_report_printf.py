@@ -4,21 +4,9 @@
 
 import sqlite3
 import sys
-from datetime import datetime
 import argparse
 from tabulate import tabulate
 
-def parse_date(date_str):
-    """Parse date string with flexible formats."""
-    if not date_str:
-        return None
-    for fmt in ('%m/%d/%Y', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
-        try:
-            return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-        except ValueError:
-            continue
-    return None
-
 def voter_election_report(db_name="voters.db", first_name=None, last_name=None, zip_code=None):
     # Connect to the database
     conn = sqlite3.connect(db_name)
@@ -30,15 +18,16 @@ def voter_election_report(db_name="voters.db", first_name=None, last_name=None,
         conn.close()
         return
 
-    # Get all matching VoterIds
+    # Get all matching VoterIds. COLLATE NOCASE folds ASCII case like LOWER() did,
+    # but lets SQLite search idx_name_nocase instead of scanning.
     cursor.execute('''
         SELECT DISTINCT v.VoterId
         FROM voters v
         WHERE 
-            LOWER(v.FirstName) = LOWER(?)
-            AND LOWER(v.LastName) = LOWER(?)
+            v.LastName = ? COLLATE NOCASE
+            AND v.FirstName = ? COLLATE NOCASE
             AND v.ZipCode = ?
-    ''', (first_name, last_name, zip_code))
+    ''', (last_name, first_name, zip_code))
     voter_ids = cursor.fetchall()
 
     if not voter_ids: